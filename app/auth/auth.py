@@ -1,22 +1,36 @@
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from jose import JWTError, jwt
+from starlette.requests import HTTPConnection
 
-from app.database import get_db
+from config import Settings, settings
+from app.auth.hashing import PasswordHasher, PasswordHasherBusy, crypt_context
+from app.cache import TTLCache
+from app.response_cache import ResponseCache, app_response_cache
+from app.database import AnySession, app_database, get_db, open_session, run_db
 from app.models import User
-from app.schemas import UserCreate, UserResponse, Token, TokenData
+from app.schemas import PasswordChange, UserCreate, UserResponse, Token
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 SECRET_KEY = "your-secret-key-here"  # Change this in production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing - using sha256_crypt to avoid bcrypt compatibility issues
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+
+# Password hashing - sha256_crypt by default to avoid bcrypt compatibility
+# issues. Request handlers hash through app.auth.hashing instead, off the
+# threadpool; this context is for scripts and other sync callers, and built
+# (with passlib imported) on first use.
+def password_context():
+    return crypt_context(tuple(settings.password_schemes), settings.password_rounds)
+
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -24,12 +38,57 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 router = APIRouter()
 
 
+class AuthCaches:
+    """An app's caches of verified token claims and of principals."""
+
+    def __init__(self, config: Settings):
+        self.ttl = config.auth_cache_ttl_seconds
+        # token -> (user id, token version), kept no longer than the token is valid
+        self.tokens = TTLCache(config.auth_cache_size, self.ttl)
+        # user id -> Principal
+        self.principals = TTLCache(config.auth_cache_size, self.ttl)
+
+    def clear(self) -> None:
+        self.tokens.clear()
+        self.principals.clear()
+
+
+def auth_caches(connection: HTTPConnection) -> AuthCaches:
+    """The AuthCaches of the app serving ``connection``."""
+    return connection.app.state.auth_caches
+
+
+def password_hasher(connection: HTTPConnection) -> PasswordHasher:
+    """The PasswordHasher of the app serving ``connection``."""
+    return connection.app.state.password_hasher
+
+
+class Principal:
+    """The authenticated user as seen by request handlers.
+
+    Built from the users row once and then served from the app's
+    AuthCaches, so authenticated requests do not query the database.
+    """
+
+    __slots__ = ("id", "email", "created_at", "token_version")
+
+    def __init__(self, id: int, email: str, created_at: datetime, token_version: int):
+        self.id = id
+        self.email = email
+        self.created_at = created_at
+        self.token_version = token_version
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.email, user.created_at, user.token_version)
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 
 def get_user_by_email(db: Session, email: str):
@@ -63,62 +122,248 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def create_user_token(user: User) -> str:
+    """Access token carrying the user id and current token version."""
+    return create_access_token(
+        data={"sub": user.email, "uid": user.id, "ver": user.token_version},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
     )
+
+
+def revoke_user_tokens(db: Session, user_id: int):
+    """Invalidate every token issued to the user so far and commit.
+
+    Callers drop the cached principal once this returns, after the commit,
+    so it cannot be reloaded with the old version; cached token claims need
+    no invalidation as they no longer match.
+    """
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+    )
+    db.commit()
+
+
+def _decode_claims(token: str, caches: AuthCaches):
+    """Verify the token signature and expiry and return (user id, version)."""
+    claims = caches.tokens.get(token)
+    if claims is not None:
+        return claims
     try:
-        print(f"DEBUG: Attempting to decode token: {token[:20]}...")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"DEBUG: Token payload: {payload}")
-        email: str = payload.get("sub")
-        if email is None:
-            print(f"DEBUG: No 'sub' found in token payload")
-            raise credentials_exception
-        token_data = TokenData(email=email)
-        print(f"DEBUG: Token validated for email: {email}")
     except JWTError as e:
-        print(f"DEBUG: JWT decode error: {e}")
-        raise credentials_exception
-
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
-        print(f"DEBUG: User not found in database for email: {token_data.email}")
-        raise credentials_exception
-    print(f"DEBUG: User found: {user.email}")
-    return user
+        logger.debug("token rejected", extra={"reason": "decode", "error": str(e)})
+        return None
+    user_id, version = payload.get("uid"), payload.get("ver")
+    if user_id is None or version is None:
+        logger.debug("token rejected", extra={"reason": "missing uid/ver claims"})
+        return None
+    claims = (user_id, version)
+    remaining = payload["exp"] - datetime.now(timezone.utc).timestamp()
+    caches.tokens.set(token, claims, ttl=min(remaining, caches.ttl))
+    return claims
 
 
-@router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
+def token_user_id(token: str, caches: AuthCaches) -> Optional[int]:
+    """The user id a token carries if its signature and expiry verify, with
+    no database access (revocation is not checked)."""
+    claims = _decode_claims(token, caches)
+    return None if claims is None else claims[0]
+
+
+async def principal_for_token(
+    token: str, db: AnySession, caches: AuthCaches
+) -> Optional[Principal]:
+    """The Principal a bearer token authenticates, or None if it is invalid,
+    expired, revoked or its user is gone."""
+    claims = _decode_claims(token, caches)
+    if claims is None:
+        return None
+    user_id, version = claims
+
+    principal = caches.principals.get(user_id)
+    # A token newer than the cached principal was issued after a revocation,
+    # possibly by another worker: reload the user rather than reject it
+    if principal is None or version > principal.token_version:
+        user = await run_db(db, Session.get, User, user_id)
+        if user is None:
+            logger.debug("token rejected", extra={"reason": "unknown user"})
+            return None
+        principal = Principal.from_user(user)
+        caches.principals.set(user_id, principal)
+
+    if principal.token_version != version:
+        logger.debug("token rejected", extra={"reason": "revoked", "user_id": user_id})
+        return None
+    return principal
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AnySession = Depends(get_db),
+    caches: AuthCaches = Depends(auth_caches),
+) -> Principal:
+    principal = await principal_for_token(token, db, caches)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+async def get_read_db(connection: HTTPConnection, token: str = Depends(oauth2_scheme)):
+    """get_db for read-only handlers: a session on a read replica.
+
+    Users who wrote within db_replica_sticky_seconds, and requests whose
+    token does not verify (they are about to get a 401), stay on the
+    primary. Without replicas this is the primary's session, as from get_db.
+    """
+    database = app_database(connection)
+    if database.replicas:
+        claims = _decode_claims(token, auth_caches(connection))
+        if claims is not None and not await app_response_cache(
+            connection
+        ).wrote_recently(claims[0], database.config.db_replica_sticky_seconds):
+            database = database.replica()
+    async with open_session(database) as db:
+        yield db
+
+
+async def get_current_reader(
+    token: str = Depends(oauth2_scheme),
+    db: AnySession = Depends(get_read_db),
+    caches: AuthCaches = Depends(auth_caches),
+) -> Principal:
+    """get_current_user for handlers that use get_read_db, so a principal
+    cache miss is looked up on the same replica."""
+    return await get_current_user(token, db, caches)
+
+
+async def offload_hashing(fn, *args):
+    """Await a PasswordHasher method, answering 503 when the hashing pool is
+    saturated."""
+    try:
+        return await fn(*args)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+
+def _register(db: Session, email: str, hashed_password: str):
+    db_user = get_user_by_email(db, email=email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return create_user(db=db, user=user)
+    db_user = User(email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(
+    user: UserCreate,
+    db: AnySession = Depends(get_db),
+    hasher: PasswordHasher = Depends(password_hasher),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    hashed_password = await offload_hashing(hasher.hash, user.password)
+    db_user = await run_db(db, _register, user.email, hashed_password)
+    await cache.invalidate(db_user.id)
+    return db_user
+
+
+def _store_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.execute(
+        update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+    )
+    db.commit()
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AnySession = Depends(get_db),
+    hasher: PasswordHasher = Depends(password_hasher),
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    user = await run_db(db, get_user_by_email, form_data.username)
+    valid = new_hash = None
+    if user:
+        valid, new_hash = await offload_hashing(
+            hasher.verify_and_update, form_data.password, user.hashed_password
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user)
+    if new_hash:
+        # Stored with an outdated scheme or cost; upgrade while we have the
+        # plain password
+        await run_db(db, _store_password_hash, user.id, new_hash)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    caches: AuthCaches = Depends(auth_caches),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Revoke all of the user's tokens (tokens are stateless, so logging out
+    one device logs out every device)."""
+    await run_db(db, revoke_user_tokens, current_user.id)
+    caches.principals.delete(current_user.id)
+    await cache.invalidate(current_user.id)
+
+
+def _set_password(db: Session, user_id: int, hashed_password: str):
+    user = db.get(User, user_id)
+    user.hashed_password = hashed_password
+    revoke_user_tokens(db, user.id)
+    db.refresh(user)
+    return user
+
+
+@router.post("/change-password", response_model=Token)
+async def change_password(
+    passwords: PasswordChange,
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    hasher: PasswordHasher = Depends(password_hasher),
+    caches: AuthCaches = Depends(auth_caches),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Change the password, revoke existing tokens and issue a fresh one."""
+    user = await run_db(db, Session.get, User, current_user.id)
+    valid, _ = await offload_hashing(
+        hasher.verify_and_update, passwords.current_password, user.hashed_password
+    )
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect password")
+    hashed_password = await offload_hashing(hasher.hash, passwords.new_password)
+    user = await run_db(db, _set_password, user.id, hashed_password)
+    caches.principals.delete(user.id)
+    await cache.invalidate(user.id)
+    return {"access_token": create_user_token(user), "token_type": "bearer"}
+
+
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def read_users_me(
+    request: Request,
+    current_user: Principal = Depends(get_current_reader),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    async def principal():
+        return current_user
+
+    return await cache.respond(request, current_user.id, principal, UserResponse)
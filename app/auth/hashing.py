@@ -0,0 +1,116 @@
+# physiobuddy-backend/app/auth/hashing.py
+"""Password hashing on a dedicated, bounded executor.
+
+Hashing is deliberately slow CPU work. Running it in Starlette's threadpool
+lets a burst of logins hold every thread (and the GIL) while other requests
+wait, so it goes to a separate pool of worker processes instead, and callers
+are turned away rather than queued once too many hashes are pending.
+"""
+
+import asyncio
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from config import Settings
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised instead of queueing when max_pending hashes are in flight."""
+
+
+@lru_cache(maxsize=None)
+def crypt_context(schemes: Tuple[str, ...], rounds: Optional[int]) -> "CryptContext":
+    """CryptContext for the given settings, cached per process.
+
+    Pinning min, default and max rounds to ``rounds`` makes needs_update()
+    flag hashes made at any other cost, so changing the setting rehashes
+    passwords as users log in. passlib is imported on the first call.
+    """
+    from passlib.context import CryptContext
+    from passlib.registry import get_crypt_handler
+
+    options = {}
+    handler = get_crypt_handler(schemes[0])
+    # Schemes without a cost parameter (e.g. md5_crypt) ignore password_rounds
+    if rounds is not None and "rounds" in handler.setting_kwds:
+        for bound in ("min_rounds", "default_rounds", "max_rounds"):
+            options[f"{schemes[0]}__{bound}"] = rounds
+    return CryptContext(schemes=list(schemes), deprecated="auto", **options)
+
+
+# Executed in the worker; the context is passed as settings, not pickled
+def _hash(password: str, schemes: Tuple[str, ...], rounds: Optional[int]) -> str:
+    return crypt_context(schemes, rounds).hash(password)
+
+
+def _verify_and_update(
+    password: str, hashed: str, schemes: Tuple[str, ...], rounds: Optional[int]
+) -> Tuple[bool, Optional[str]]:
+    return crypt_context(schemes, rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords with the schemes and cost of ``config``,
+    on an executor created on first use.
+
+    Only used from the event loop, so the pending count needs no lock.
+    """
+
+    def __init__(self, config: Settings):
+        self.kind = config.password_hash_executor
+        self.workers = config.password_hash_workers
+        self.max_pending = config.password_hash_max_pending
+        self.schemes = tuple(config.password_schemes)
+        self.rounds = config.password_rounds
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordHasherBusy("Too many password hashes in progress")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenExecutor:
+            # A worker process died; start a fresh pool for the next caller
+            self.shutdown()
+            raise
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(_hash, password, self.schemes, self.rounds)
+
+    async def verify_and_update(
+        self, password: str, hashed: str
+    ) -> Tuple[bool, Optional[str]]:
+        """(valid, new hash or None) - a new hash means the stored one is
+        outdated."""
+        return await self.run(
+            _verify_and_update, password, hashed, self.schemes, self.rounds
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
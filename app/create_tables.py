@@ -1,12 +1,34 @@
-from app.database import engine
-from app.models import Base
+import os
+from typing import Optional
 
+from alembic import command
+from alembic.config import Config
 
-def create_tables():
-    """Create all database tables."""
-    Base.metadata.create_all(bind=engine)
-    print("All tables created successfully!")
+# alembic.ini and migrations/ sit in the repository root
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+
+def alembic_config(url: Optional[str] = None, connection=None) -> Config:
+    """Alembic config for this repository, on ``url`` (default: DATABASE_URL)
+    or on an already open ``connection``."""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option(
+        "script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations")
+    )
+    if url is not None:
+        config.set_main_option("sqlalchemy.url", url)
+    if connection is not None:
+        config.attributes["connection"] = connection
+        config.attributes["configure_logger"] = False
+    return config
+
+
+def create_tables(url: Optional[str] = None, connection=None):
+    """Create the database tables, or bring them up to date, by running every
+    pending migration."""
+    command.upgrade(alembic_config(url, connection), "head")
 
 
 if __name__ == "__main__":
     create_tables()
+    print("All tables created successfully!")
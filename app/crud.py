@@ -0,0 +1,540 @@
+# physiobuddy-backend/app/crud.py
+"""Maintenance of derived per-user tables (personal bests, weekly progress,
+streaks).
+
+Each table has an incremental path, run inside the request transaction that
+writes the source row, and a set-based rebuild used for backfills.
+
+Stored DateTime columns are naive UTC (app.models.utcnow).
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Integer,
+    and_,
+    case,
+    cast,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from config import settings
+from app.database import dialect_insert
+from app.models import (
+    ExerciseProgress,
+    ExerciseSet,
+    PersonalBest,
+    UserStreak,
+    WorkoutSession,
+    utcnow,
+)
+
+PERSONAL_BEST_METRICS = (
+    "max_reps_single_set",
+    "max_total_reps_session",
+    "best_form_score",
+    "longest_session_duration",
+)
+
+
+def _greatest(current, candidate):
+    """Portable GREATEST() that treats NULL as "no value yet"."""
+    return case((or_(current.is_(None), candidate > current), candidate), else_=current)
+
+
+def add_session_duration(db: Session, session: WorkoutSession, seconds: float):
+    """Add to the session's total_duration in one UPDATE, so concurrent
+    uploads cannot overwrite each other's additions, and reflect the new total
+    on ``session``."""
+    total = db.execute(
+        update(WorkoutSession)
+        .where(WorkoutSession.id == session.id)
+        .values(
+            total_duration=func.coalesce(WorkoutSession.total_duration, 0.0) + seconds
+        )
+        .returning(WorkoutSession.total_duration)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    set_committed_value(session, "total_duration", total)
+
+
+def _best(values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def group_by_kind(exercise_sets: Sequence[ExerciseSet]):
+    """Split sets into lists sharing an exercise type and arm, the grain of
+    personal bests and progress buckets."""
+    groups = {}
+    for exercise_set in exercise_sets:
+        key = (exercise_set.exercise_type, exercise_set.arm_used)
+        groups.setdefault(key, []).append(exercise_set)
+    return list(groups.values())
+
+
+def update_personal_best(
+    db: Session, session: WorkoutSession, exercise_sets: Sequence[ExerciseSet]
+):
+    """Fold newly flushed exercise sets, all of one exercise and arm, into the
+    user's personal best with a single INSERT ... ON CONFLICT DO UPDATE."""
+    first = exercise_sets[0]
+    session_reps = (
+        select(func.sum(ExerciseSet.reps_completed))
+        .where(
+            ExerciseSet.session_id == session.id,
+            ExerciseSet.exercise_type == first.exercise_type,
+            ExerciseSet.arm_used == first.arm_used,
+        )
+        .scalar_subquery()
+    )
+    now = utcnow()
+    insert = dialect_insert(db)
+    stmt = insert(PersonalBest).values(
+        user_id=session.user_id,
+        exercise_type=first.exercise_type,
+        arm_used=first.arm_used,
+        max_reps_single_set=_best(s.reps_completed for s in exercise_sets),
+        max_total_reps_session=session_reps,
+        best_form_score=_best(s.form_quality_score for s in exercise_sets),
+        longest_session_duration=session.total_duration,
+        achieved_date=now,
+        last_updated=now,
+    )
+    table = PersonalBest.__table__.c
+    improved = or_(
+        *(
+            or_(table[m].is_(None), stmt.excluded[m] > table[m])
+            for m in PERSONAL_BEST_METRICS
+        )
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "exercise_type", "arm_used"],
+        set_={
+            **{m: _greatest(table[m], stmt.excluded[m]) for m in PERSONAL_BEST_METRICS},
+            "achieved_date": case((improved, now), else_=table.achieved_date),
+            "last_updated": now,
+        },
+    )
+    db.execute(stmt)
+
+
+def rebuild_personal_bests(
+    db: Session, user_ids: Optional[Sequence[int]] = None
+) -> int:
+    """Recompute personal bests from all exercise sets in one aggregation.
+
+    Existing rows are overwritten with the recomputed values. Restrict to
+    ``user_ids`` when given. Returns the number of rows written.
+    """
+    per_session = (
+        select(
+            WorkoutSession.user_id,
+            WorkoutSession.total_duration,
+            ExerciseSet.exercise_type,
+            ExerciseSet.arm_used,
+            func.max(ExerciseSet.reps_completed).label("max_reps"),
+            func.sum(ExerciseSet.reps_completed).label("session_reps"),
+            func.max(ExerciseSet.form_quality_score).label("best_form"),
+        )
+        .join(WorkoutSession, WorkoutSession.id == ExerciseSet.session_id)
+        .group_by(
+            WorkoutSession.id,
+            WorkoutSession.user_id,
+            WorkoutSession.total_duration,
+            ExerciseSet.exercise_type,
+            ExerciseSet.arm_used,
+        )
+    )
+    if user_ids is not None:
+        per_session = per_session.where(WorkoutSession.user_id.in_(user_ids))
+    per_session = per_session.subquery()
+
+    now = utcnow()
+    # SQLite needs a WHERE clause to parse INSERT ... SELECT ... ON CONFLICT
+    aggregate = (
+        select(
+            per_session.c.user_id,
+            per_session.c.exercise_type,
+            per_session.c.arm_used,
+            func.max(per_session.c.max_reps),
+            func.max(per_session.c.session_reps),
+            func.max(per_session.c.best_form),
+            func.max(per_session.c.total_duration),
+            literal(now, DateTime),
+            literal(now, DateTime),
+        )
+        .where(true())
+        .group_by(
+            per_session.c.user_id, per_session.c.exercise_type, per_session.c.arm_used
+        )
+    )
+
+    insert = dialect_insert(db)
+    stmt = insert(PersonalBest).from_select(
+        [
+            "user_id",
+            "exercise_type",
+            "arm_used",
+            *PERSONAL_BEST_METRICS,
+            "achieved_date",
+            "last_updated",
+        ],
+        aggregate,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "exercise_type", "arm_used"],
+        set_={m: stmt.excluded[m] for m in (*PERSONAL_BEST_METRICS, "last_updated")},
+    )
+    return db.execute(stmt).rowcount
+
+
+def week_start(moment: datetime) -> datetime:
+    """Midnight on the Monday of ``moment``'s week."""
+    day = moment - timedelta(days=moment.weekday())
+    return day.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _week_start_sql(db: Session, column):
+    """SQL equivalent of week_start() for set-based rebuilds."""
+    if db.get_bind().dialect.name == "sqlite":
+        # Match the "YYYY-MM-DD HH:MM:SS.ffffff" strings SQLAlchemy stores
+        monday = func.datetime(column, "weekday 0", "-6 days", "start of day")
+        return monday.concat(".000000")
+    return func.date_trunc("week", column)
+
+
+def update_exercise_progress(
+    db: Session, session: WorkoutSession, exercise_sets: Sequence[ExerciseSet]
+):
+    """Add newly flushed exercise sets, all of one exercise and arm, to their
+    weekly progress bucket.
+
+    The bucket keeps running sums, so the upsert only adds to them and
+    avg_form_score is re-derived from the sum and count in the same statement.
+    """
+    first = exercise_sets[0]
+    sets_of_kind_in_session = (
+        select(func.count())
+        .where(
+            ExerciseSet.session_id == session.id,
+            ExerciseSet.exercise_type == first.exercise_type,
+            ExerciseSet.arm_used == first.arm_used,
+        )
+        .scalar_subquery()
+    )
+    form_scores = [
+        s.form_quality_score for s in exercise_sets if s.form_quality_score is not None
+    ]
+    insert = dialect_insert(db)
+    stmt = insert(ExerciseProgress).values(
+        user_id=session.user_id,
+        exercise_type=first.exercise_type,
+        arm_used=first.arm_used,
+        week_start_date=week_start(session.session_date),
+        total_reps=sum(s.reps_completed for s in exercise_sets),
+        total_sets=len(exercise_sets),
+        total_duration=sum(s.duration or 0.0 for s in exercise_sets),
+        avg_form_score=sum(form_scores) / len(form_scores) if form_scores else None,
+        # A session counts as a workout for this exercise when these are its
+        # first sets of it
+        workout_count=case((sets_of_kind_in_session == len(exercise_sets), 1), else_=0),
+        form_score_sum=sum(form_scores),
+        form_score_count=len(form_scores),
+    )
+    table = ExerciseProgress.__table__.c
+    summed = {
+        column: table[column] + stmt.excluded[column]
+        for column in (
+            "total_reps",
+            "total_sets",
+            "total_duration",
+            "workout_count",
+            "form_score_sum",
+            "form_score_count",
+        )
+    }
+    summed["avg_form_score"] = case(
+        (
+            summed["form_score_count"] > 0,
+            summed["form_score_sum"] / summed["form_score_count"],
+        ),
+        else_=None,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "exercise_type", "arm_used", "week_start_date"],
+        set_=summed,
+    )
+    db.execute(stmt)
+
+
+def update_form_score(
+    db: Session,
+    session: WorkoutSession,
+    exercise_set: ExerciseSet,
+    previous: Optional[float],
+):
+    """Carry a flushed change of ``exercise_set``'s form_quality_score (from
+    ``previous``) into its weekly progress bucket and personal best.
+
+    The bucket's sums take the difference; the best is re-derived from the
+    user's sets of that kind, since a lowered score may have been the best.
+    """
+    score = exercise_set.form_quality_score
+    of_kind = (
+        ExerciseProgress.user_id == session.user_id,
+        ExerciseProgress.exercise_type == exercise_set.exercise_type,
+        ExerciseProgress.arm_used == exercise_set.arm_used,
+    )
+    form_sum = ExerciseProgress.form_score_sum + ((score or 0.0) - (previous or 0.0))
+    form_count = ExerciseProgress.form_score_count + (
+        (score is not None) - (previous is not None)
+    )
+    db.execute(
+        update(ExerciseProgress)
+        .where(
+            *of_kind,
+            ExerciseProgress.week_start_date == week_start(session.session_date),
+        )
+        .values(
+            form_score_sum=form_sum,
+            form_score_count=form_count,
+            avg_form_score=case((form_count > 0, form_sum / form_count), else_=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    best = (
+        select(func.max(ExerciseSet.form_quality_score))
+        .join(WorkoutSession, WorkoutSession.id == ExerciseSet.session_id)
+        .where(
+            WorkoutSession.user_id == session.user_id,
+            ExerciseSet.exercise_type == exercise_set.exercise_type,
+            ExerciseSet.arm_used == exercise_set.arm_used,
+        )
+        .scalar_subquery()
+    )
+    now = utcnow()
+    improved = or_(
+        PersonalBest.best_form_score.is_(None), best > PersonalBest.best_form_score
+    )
+    db.execute(
+        update(PersonalBest)
+        .where(
+            PersonalBest.user_id == session.user_id,
+            PersonalBest.exercise_type == exercise_set.exercise_type,
+            PersonalBest.arm_used == exercise_set.arm_used,
+        )
+        .values(
+            best_form_score=best,
+            achieved_date=case((improved, now), else_=PersonalBest.achieved_date),
+            last_updated=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_exercise_progress(
+    db: Session, user_ids: Optional[Sequence[int]] = None
+) -> int:
+    """Recompute weekly progress buckets from all exercise sets in one
+    aggregation, overwriting existing buckets. Returns rows written."""
+    week = _week_start_sql(db, WorkoutSession.session_date)
+    # SQLite needs a WHERE clause to parse INSERT ... SELECT ... ON CONFLICT
+    aggregate = (
+        select(
+            WorkoutSession.user_id,
+            ExerciseSet.exercise_type,
+            ExerciseSet.arm_used,
+            week,
+            func.sum(ExerciseSet.reps_completed),
+            func.count(),
+            func.coalesce(func.sum(ExerciseSet.duration), 0.0),
+            func.avg(ExerciseSet.form_quality_score),
+            func.count(func.distinct(ExerciseSet.session_id)),
+            func.coalesce(func.sum(ExerciseSet.form_quality_score), 0.0),
+            func.count(ExerciseSet.form_quality_score),
+        )
+        .join(WorkoutSession, WorkoutSession.id == ExerciseSet.session_id)
+        .where(true())
+        .group_by(
+            WorkoutSession.user_id,
+            ExerciseSet.exercise_type,
+            ExerciseSet.arm_used,
+            week,
+        )
+    )
+    if user_ids is not None:
+        aggregate = aggregate.where(WorkoutSession.user_id.in_(user_ids))
+
+    columns = [
+        "total_reps",
+        "total_sets",
+        "total_duration",
+        "avg_form_score",
+        "workout_count",
+        "form_score_sum",
+        "form_score_count",
+    ]
+    insert = dialect_insert(db)
+    stmt = insert(ExerciseProgress).from_select(
+        ["user_id", "exercise_type", "arm_used", "week_start_date", *columns],
+        aggregate,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "exercise_type", "arm_used", "week_start_date"],
+        set_={column: stmt.excluded[column] for column in columns},
+    )
+    return db.execute(stmt).rowcount
+
+
+def local_day(moment: datetime, tz: ZoneInfo) -> date:
+    """Calendar day of a stored (naive UTC) timestamp in the user's zone."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(tz).date()
+
+
+def update_streak(db: Session, session: WorkoutSession, tz: ZoneInfo) -> UserStreak:
+    """Advance the user's streak for a newly flushed workout session.
+
+    The streak row is created if missing and then locked (SELECT ... FOR
+    UPDATE), so concurrent session creation for the same user serializes on
+    one row and each update is constant time.
+    """
+    insert = dialect_insert(db)
+    db.execute(
+        insert(UserStreak)
+        .values(user_id=session.user_id, current_streak=0, longest_streak=0)
+        .on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    streak = (
+        db.query(UserStreak)
+        .filter(UserStreak.user_id == session.user_id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+
+    day = local_day(session.session_date, tz)
+    if streak.last_workout_date is None:
+        last_day = None
+    else:
+        last_day = local_day(streak.last_workout_date, tz)
+        if day <= last_day:  # same day, or a backdated session
+            return streak
+
+    if last_day is not None and day - last_day == timedelta(days=1):
+        streak.current_streak += 1
+    else:
+        streak.current_streak = 1
+        streak.streak_start_date = session.session_date
+    streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+    streak.last_workout_date = session.session_date
+    return streak
+
+
+def _day_number_sql(db: Session, column, tz_name: str):
+    """Days since 1970-01-01 of a naive UTC timestamp, in time zone tz_name."""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite has no time zone database; days are UTC days there
+        return cast(func.julianday(func.date(column)), Integer)
+    local = func.timezone(tz_name, func.timezone("UTC", column))
+    return cast(local, Date) - cast(literal("1970-01-01"), Date)
+
+
+def rebuild_user_streaks(
+    db: Session,
+    user_ids: Optional[Sequence[int]] = None,
+    tz_name: Optional[str] = None,
+) -> int:
+    """Recompute streaks from all workout sessions with gaps-and-islands.
+
+    Consecutive workout days share the same (day - row_number) value, so
+    grouping by it yields each streak; the latest island is the current
+    streak and the largest the longest. Returns rows written.
+    """
+    tz_name = tz_name or settings.default_timezone
+    day = _day_number_sql(db, WorkoutSession.session_date, tz_name)
+    sessions = select(
+        WorkoutSession.user_id,
+        WorkoutSession.session_date,
+        day.label("day"),
+    )
+    if user_ids is not None:
+        sessions = sessions.where(WorkoutSession.user_id.in_(user_ids))
+    sessions = sessions.subquery()
+
+    days = select(sessions.c.user_id, sessions.c.day).distinct().subquery()
+    numbered = select(
+        days.c.user_id,
+        days.c.day,
+        (
+            days.c.day
+            - func.row_number().over(partition_by=days.c.user_id, order_by=days.c.day)
+        ).label("island"),
+    ).subquery()
+    islands = (
+        select(
+            numbered.c.user_id,
+            func.min(numbered.c.day).label("first_day"),
+            func.max(numbered.c.day).label("last_day"),
+            func.count().label("length"),
+        )
+        .group_by(numbered.c.user_id, numbered.c.island)
+        .subquery()
+    )
+    ranked = select(
+        islands,
+        func.row_number()
+        .over(partition_by=islands.c.user_id, order_by=islands.c.last_day.desc())
+        .label("recency"),
+        func.max(islands.c.length)
+        .over(partition_by=islands.c.user_id)
+        .label("longest"),
+    ).subquery()
+
+    # SQLite needs a WHERE clause to parse INSERT ... SELECT ... ON CONFLICT
+    current = (
+        select(
+            ranked.c.user_id,
+            ranked.c.length,
+            ranked.c.longest,
+            func.max(sessions.c.session_date),
+            func.min(sessions.c.session_date),
+        )
+        .join(
+            sessions,
+            and_(
+                sessions.c.user_id == ranked.c.user_id,
+                sessions.c.day.between(ranked.c.first_day, ranked.c.last_day),
+            ),
+        )
+        .where(ranked.c.recency == 1)
+        .group_by(ranked.c.user_id, ranked.c.length, ranked.c.longest)
+    )
+
+    columns = [
+        "current_streak",
+        "longest_streak",
+        "last_workout_date",
+        "streak_start_date",
+    ]
+    insert = dialect_insert(db)
+    stmt = insert(UserStreak).from_select(["user_id", *columns], current)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={column: stmt.excluded[column] for column in columns},
+    )
+    return db.execute(stmt).rowcount
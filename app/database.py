@@ -1,22 +1,294 @@
 # fastapi-backend/app/database.py
+"""Engines and sessions.
+
+A Database holds the engines and session factories for one Settings and
+creates them on first use, so building the app (or importing a module that
+needs a session factory) opens no connections and imports no driver. Each
+app built by app.main.create_app has its own, on ``app.state.database``;
+``default_database`` serves DATABASE_URL to scripts and the module-level
+``engine``/``SessionLocal`` names.
+
+With read replicas configured, a Database also holds one (lazy) Database per
+replica URL; get_read_db in app.auth.auth routes read-only handlers to them.
+"""
+
+from contextlib import asynccontextmanager
+from itertools import count
+from operator import attrgetter
+from typing import TYPE_CHECKING, List, Optional, Union
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .config import settings
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+
+from config import Settings, settings
+from app.metrics import instrument_engine
+from app.pool import timed_pool_class
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 # PostgreSQL database URL
 DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+def engine_options(
+    url: str, is_async: bool = False, config: Settings = settings
+) -> dict:
+    """create_engine keyword arguments for the pool settings in ``config``."""
+    if config.db_external_pooler:
+        # The external pooler owns the connections; open one per checkout
+        options = {"poolclass": timed_pool_class(NullPool)}
+    else:
+        if is_async:
+            from sqlalchemy.pool import AsyncAdaptedQueuePool as pool_class
+        else:
+            pool_class = QueuePool
+        options = {
+            "poolclass": timed_pool_class(pool_class),
+            "pool_size": config.db_pool_size,
+            "max_overflow": config.db_max_overflow,
+            "pool_timeout": config.db_pool_timeout,
+            "pool_recycle": config.db_pool_recycle,
+        }
+    options["pool_pre_ping"] = config.db_pool_pre_ping
+
+    connect_args = {}
+    if make_url(url).get_backend_name() == "postgresql":
+        timeout = config.db_statement_timeout_ms
+        if is_async:
+            if timeout is not None:
+                connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+            if config.db_external_pooler:
+                # Prepared statements do not survive transaction-mode pooling
+                connect_args["statement_cache_size"] = 0
+                connect_args["prepared_statement_cache_size"] = 0
+        elif timeout is not None:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
 
 Base = declarative_base()
 
+# Async drivers for the sync URLs database_url may use
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+
+def async_url(url: str) -> str:
+    """The given database URL with its driver swapped for the async one."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+class Database:
+    """The engines and session factories for ``config``, created on first use.
+
+    The sync engine always exists (streamed responses and scripts use it);
+    with ``config.db_async`` requests get AsyncSessions from a second, async
+    engine. SQLAlchemy's asyncio extension is only imported then. An
+    ``engine`` passed in (a test's database, say) is used as it is.
+    """
+
+    def __init__(self, config: Settings = settings, engine=None):
+        self.config = config
+        self.is_async = config.db_async
+        self._engine = engine
+        self._session_factory: Optional[sessionmaker] = None
+        self._async_engine = None
+        self._async_session_factory = None
+        self._replicas: Optional[List["Database"]] = None
+        self._replica_turn = count()
+        # Sessions open on this database; only touched from the event loop
+        self.in_use = 0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            url = self.config.database_url
+            self._engine = create_engine(url, **engine_options(url, config=self.config))
+            instrument_engine(self._engine)
+        return self._engine
+
+    @property
+    def session_factory(self) -> sessionmaker:
+        if self._session_factory is None:
+            self._session_factory = sessionmaker(
+                bind=self.engine, autocommit=False, autoflush=False
+            )
+        return self._session_factory
+
+    @property
+    def async_engine(self):
+        if self._async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            url = self.config.async_database_url or async_url(self.config.database_url)
+            self._async_engine = create_async_engine(
+                url, **engine_options(url, is_async=True, config=self.config)
+            )
+            instrument_engine(self._async_engine.sync_engine)
+        return self._async_engine
+
+    @property
+    def async_session_factory(self):
+        if self._async_session_factory is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            # Handlers return ORM objects after the commit, so keep them loaded
+            self._async_session_factory = async_sessionmaker(
+                bind=self.async_engine, autoflush=False, expire_on_commit=False
+            )
+        return self._async_session_factory
+
+    @property
+    def replicas(self) -> List["Database"]:
+        """A Database per replica URL, sharing this one's other settings."""
+        if self._replicas is None:
+            self._replicas = [
+                Database(
+                    self.config.model_copy(
+                        update={
+                            "database_url": url,
+                            "async_database_url": None,
+                            "db_replica_urls": [],
+                        }
+                    )
+                )
+                for url in self.config.db_replica_urls
+            ]
+        return self._replicas
+
+    def replica(self) -> "Database":
+        """The replica to serve the next read from, or this database if there
+        are none.
+
+        Round robin, or with least_connections the replica with the fewest
+        open sessions, ties going round robin.
+        """
+        replicas = self.replicas
+        if not replicas:
+            return self
+        start = next(self._replica_turn) % len(replicas)
+        candidates = replicas[start:] + replicas[:start]
+        if self.config.db_replica_selection == "least_connections":
+            return min(candidates, key=attrgetter("in_use"))
+        return candidates[0]
+
+    def engines(self) -> dict:
+        """The engines created so far, by kind ("sync", "async")."""
+        engines = {}
+        if self._engine is not None:
+            engines["sync"] = self._engine
+        if self._async_engine is not None:
+            engines["async"] = self._async_engine.sync_engine
+        return engines
+
+    async def dispose(self) -> None:
+        for replica in self._replicas or ():
+            await replica.dispose()
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+default_database = Database(settings)
+
+AnySession = Union[Session, "AsyncSession"]
+
+
+def __getattr__(name):
+    # The engine and session factories of default_database, created when
+    # first imported rather than when this module is
+    if name == "engine":
+        return default_database.engine
+    if name == "SessionLocal":
+        return default_database.session_factory
+    if name == "async_engine":
+        return default_database.async_engine
+    if name == "AsyncSessionLocal":
+        return default_database.async_session_factory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def app_database(connection: HTTPConnection) -> Database:
+    """The Database of the app serving ``connection``."""
+    return getattr(connection.app.state, "database", default_database)
+
+
+@asynccontextmanager
+async def open_session(database: Database):
+    """A session on ``database``, counted in its ``in_use`` while open.
+
+    Opening a sync Session does no I/O, so only closing it (which returns its
+    connection) goes to the threadpool.
+    """
+    database.in_use += 1
     try:
-        yield db
+        if database.is_async:
+            async with database.async_session_factory() as db:
+                db.info["database"] = database
+                yield db
+            return
+        db = database.session_factory()
+        db.info["database"] = database
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
     finally:
-        db.close()
+        database.in_use -= 1
+
+
+# Dependency to get DB session
+async def get_db(connection: HTTPConnection):
+    """A session on the app's (primary) database for one request or
+    WebSocket."""
+    async with open_session(app_database(connection)) as db:
+        yield db
+
+
+async def run_db(db: AnySession, fn, *args, **kwargs):
+    """Run ``fn(session, *args, **kwargs)``, written against a sync Session,
+    without blocking the event loop.
+
+    With an AsyncSession it runs on the loop via run_sync (the async driver
+    does the I/O); with a sync Session it runs in the threadpool.
+    """
+    if not isinstance(db, Session):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def sync_bind(db: AnySession):
+    """A sync Engine on the request's database, for work that outlives the
+    request's session, such as a response body streamed from the threadpool.
+
+    In async mode that is the sync engine of the same Database.
+    """
+    if not isinstance(db, Session):
+        return db.info.get("database", default_database).engine
+    return db.get_bind()
+
+
+# INSERT construct with ON CONFLICT support for the session's database
+def dialect_insert(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+    return insert
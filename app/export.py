@@ -0,0 +1,301 @@
+# physiobuddy-backend/app/export.py
+"""Streamed export of a user's workout history as one flat table.
+
+Without pose data there is one row per exercise set, carrying its session's
+columns (sessions without sets get one row with empty set columns). With
+pose data there is one row per joint sample, carrying its set's and
+session's columns.
+
+Rows are read through a server-side cursor (``yield_per``) and encoded a
+batch at a time, so memory use depends on the batch size, not on how much
+history the user has.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import DateTime, Enum as SQLEnum, Float, Integer, and_, select
+from sqlalchemy.orm import Session
+
+from app.models import (
+    ExerciseSet,
+    JointPosition,
+    PoseBlob,
+    PoseFrame,
+    WorkoutSession,
+)
+from app.pose.blob import decode_pose_blob
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+# Rows fetched from the cursor, and encoded, per batch; also the Parquet row
+# group size
+EXPORT_BATCH_ROWS = 10_000
+
+EXPORT_FORMATS = {
+    # format: (media type, file extension)
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+SET_COLUMNS = (
+    ("session_id", WorkoutSession.id),
+    ("session_date", WorkoutSession.session_date),
+    ("session_duration", WorkoutSession.total_duration),
+    ("session_notes", WorkoutSession.notes),
+    ("exercise_set_id", ExerciseSet.id),
+    ("exercise_type", ExerciseSet.exercise_type),
+    ("arm_used", ExerciseSet.arm_used),
+    ("reps_completed", ExerciseSet.reps_completed),
+    ("set_number", ExerciseSet.set_number),
+    ("duration", ExerciseSet.duration),
+    ("avg_angle_range", ExerciseSet.avg_angle_range),
+    ("form_quality_score", ExerciseSet.form_quality_score),
+    ("rep_consistency_score", ExerciseSet.rep_consistency_score),
+    ("avg_rep_speed", ExerciseSet.avg_rep_speed),
+    ("min_angle_achieved", ExerciseSet.min_angle_achieved),
+    ("max_angle_achieved", ExerciseSet.max_angle_achieved),
+)
+
+POSE_COLUMNS = (
+    ("frame_number", PoseFrame.frame_number),
+    ("timestamp", PoseFrame.timestamp),
+    ("joint", JointPosition.joint_type),
+    ("x", JointPosition.x),
+    ("y", JointPosition.y),
+    ("z", JointPosition.z),
+    ("confidence", JointPosition.confidence),
+)
+
+
+class ExportFormatUnavailable(RuntimeError):
+    """Raised for a format whose optional dependency is not installed."""
+
+
+def export_columns(pose: bool) -> Sequence[Tuple[str, object]]:
+    return SET_COLUMNS + POSE_COLUMNS if pose else SET_COLUMNS
+
+
+def _blob_rows(set_values: tuple, data: bytes) -> List[tuple]:
+    """Expand a pose blob into export rows, frame-major like the row tables."""
+    packed = decode_pose_blob(data)
+    n_frames, n_joints = packed.n_frames, len(packed.joints)
+    flat = packed.positions.reshape(-1, 4).astype(np.float64)
+    z, confidence = (np.where(np.isnan(c), None, c).tolist() for c in flat[:, 2:].T)
+    return [
+        set_values + sample
+        for sample in zip(
+            np.repeat(packed.frame_numbers, n_joints).tolist(),
+            np.repeat(packed.timestamps.astype(np.float64), n_joints).tolist(),
+            list(packed.joints) * n_frames,
+            flat[:, 0].tolist(),
+            flat[:, 1].tolist(),
+            z,
+            confidence,
+        )
+    ]
+
+
+def export_batches(
+    db: Session, user_id: int, pose: bool, batch_rows: int = EXPORT_BATCH_ROWS
+) -> Iterator[List[tuple]]:
+    """Yield the user's export rows in lists of at most ``batch_rows``."""
+    # Core execution: plain rows without the ORM's per-row overhead
+    connection = db.connection()
+    set_columns = [column for _, column in SET_COLUMNS]
+    if not pose:
+        query = (
+            select(*set_columns)
+            .select_from(WorkoutSession)
+            .outerjoin(ExerciseSet, ExerciseSet.session_id == WorkoutSession.id)
+            .where(WorkoutSession.user_id == user_id)
+            .order_by(WorkoutSession.session_date, WorkoutSession.id, ExerciseSet.id)
+        )
+        result = connection.execute(query.execution_options(yield_per=batch_rows))
+        for partition in result.partitions():
+            yield partition
+        return
+
+    query = (
+        select(*set_columns, *(column for _, column in POSE_COLUMNS))
+        .select_from(WorkoutSession)
+        .join(ExerciseSet, ExerciseSet.session_id == WorkoutSession.id)
+        .join(PoseFrame, PoseFrame.exercise_set_id == ExerciseSet.id)
+        .join(
+            JointPosition,
+            and_(
+                JointPosition.frame_id == PoseFrame.id,
+                # Matches partition to partition when the tables are partitioned
+                JointPosition.created_at == PoseFrame.created_at,
+            ),
+        )
+        .where(WorkoutSession.user_id == user_id)
+        .order_by(
+            WorkoutSession.session_date,
+            WorkoutSession.id,
+            ExerciseSet.id,
+            PoseFrame.frame_number,
+            JointPosition.id,
+        )
+    )
+    result = connection.execute(query.execution_options(yield_per=batch_rows))
+    for partition in result.partitions():
+        yield partition
+
+    # Sets stored with the blob backend follow, one blob in memory at a time
+    blobs = connection.execute(
+        select(*set_columns, PoseBlob.data)
+        .select_from(WorkoutSession)
+        .join(ExerciseSet, ExerciseSet.session_id == WorkoutSession.id)
+        .join(PoseBlob, PoseBlob.exercise_set_id == ExerciseSet.id)
+        .where(WorkoutSession.user_id == user_id)
+        .order_by(WorkoutSession.session_date, WorkoutSession.id, ExerciseSet.id)
+        .execution_options(yield_per=1)
+    )
+    for *set_values, data in blobs:
+        rows = _blob_rows(tuple(set_values), data)
+        for start in range(0, len(rows), batch_rows):
+            yield rows[start : start + batch_rows]
+
+
+def _converters(columns, datetimes: bool) -> List[Tuple[int, object]]:
+    """(index, function) for the columns that need converting to plain
+    values: enums to their values and, for text formats, datetimes to ISO
+    8601."""
+    converters = []
+    for i, (_, column) in enumerate(columns):
+        if isinstance(column.type, SQLEnum):
+            converters.append((i, attrgetter("value")))
+        elif datetimes and isinstance(column.type, DateTime):
+            converters.append((i, datetime.isoformat))
+    return converters
+
+
+def _convert(rows: List[tuple], converters) -> List[list]:
+    """Column-wise conversion, touching only the columns that need it."""
+    values = [list(column) for column in zip(*rows)]
+    for i, convert in converters:
+        values[i] = [None if v is None else convert(v) for v in values[i]]
+    return values
+
+
+def _ndjson(columns, batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    names = [name for name, _ in columns]
+    converters = _converters(columns, datetimes=True)
+    dumps = json.dumps
+    # Pose rows repeat their set's columns; encode those once per set
+    shared = len(SET_COLUMNS) if len(columns) > len(SET_COLUMNS) else 0
+    shared_names, own_names = names[:shared], names[shared:]
+    last_shared, prefix = None, "{"
+    for rows in batches:
+        lines = []
+        for row in zip(*_convert(rows, converters)):
+            if shared:
+                if row[:shared] != last_shared:
+                    last_shared = row[:shared]
+                    prefix = dumps(dict(zip(shared_names, last_shared)))[:-1] + ", "
+                lines.append(prefix + dumps(dict(zip(own_names, row[shared:])))[1:])
+            else:
+                lines.append(dumps(dict(zip(names, row))))
+        lines.append("")
+        yield "\n".join(lines).encode()
+
+
+def _csv(columns, batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    converters = _converters(columns, datetimes=True)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for rows in batches:
+        writer.writerows(zip(*_convert(rows, converters)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last take."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp("us")
+    return pyarrow.string()  # String and Enum columns
+
+
+def _parquet(columns, batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    schema = pyarrow.schema([(name, _arrow_type(column)) for name, column in columns])
+    converters = _converters(columns, datetimes=False)
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            arrays = [
+                pyarrow.array(column, type=field.type)
+                for field, column in zip(schema, _convert(rows, converters))
+            ]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    # Closing the writer appends the footer
+    yield sink.take()
+
+
+def check_export_format(format: str) -> None:
+    if format == "parquet" and pyarrow is None:
+        raise ExportFormatUnavailable("Parquet export needs the pyarrow package")
+
+
+def export_history(
+    bind, user_id: int, format: str, pose: bool, batch_rows: int = EXPORT_BATCH_ROWS
+) -> Iterator[bytes]:
+    """The user's history encoded as ``format``, in chunks.
+
+    Opens its own session on ``bind``: the body is streamed after the
+    request's session has been closed.
+    """
+    check_export_format(format)
+    columns = export_columns(pose)
+    with Session(bind=bind) as db:
+        batches = export_batches(db, user_id, pose, batch_rows)
+        if format == "ndjson":
+            yield from _ndjson(columns, batches)
+        elif format == "csv":
+            yield from _csv(columns, batches)
+        else:
+            yield from _parquet(columns, batches)
@@ -0,0 +1,241 @@
+# physiobuddy-backend/app/jobs.py
+"""Durable queue of derived-data jobs, kept in the jobs table.
+
+With ``derived_data = "queue"`` in the app's settings the workouts router
+does not update personal bests, progress and streaks in the request; it
+enqueues a job in the same transaction as the write, so the job exists
+exactly when the write does. Each job has an idempotency key naming the
+work ("session:12", "pose:7"); enqueueing a key that is already queued does
+nothing.
+
+Workers (``python -m app.worker``) claim the oldest ready jobs with SELECT
+... FOR UPDATE SKIP LOCKED, so any number of them share the queue without
+handing out a job twice, together with every other ready job of the same
+users. A batch is then processed in one transaction: "analyze" jobs first
+recompute their exercise set's metrics from its pose data, after which the
+set-based rebuilds of app.crud run once for all of the batch's users, and
+the jobs are deleted. A burst of writes by one user thus costs one
+recomputation.
+
+A job queued while another worker is processing its user's earlier ones is
+not locked, so a second worker can claim it. The rebuilds recompute from
+committed rows, but the first worker's results, computed before the newer
+write, could then commit last and overwrite the newer ones. So processing
+takes a transaction-scoped advisory lock per user on PostgreSQL: the second
+worker waits for the first to commit and then rebuilds from everything.
+
+SQLite has no FOR UPDATE; run a single worker there.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.crud import (
+    rebuild_exercise_progress,
+    rebuild_personal_bests,
+    rebuild_user_streaks,
+)
+from app.database import dialect_insert
+from app.models import ExerciseSet, Job, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Delay before the first retry of a failed job; doubles with each attempt
+RETRY_BASE_SECONDS = 5.0
+
+# First key of the (int, int) advisory locks serializing a user's jobs
+ADVISORY_LOCK_SPACE = 25
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    user_id: int,
+    key: str,
+    target_id: Optional[int] = None,
+) -> None:
+    """Add a job to the session's transaction, unless ``key`` is queued."""
+    insert = dialect_insert(db)
+    db.execute(
+        insert(Job)
+        .values(
+            kind=kind,
+            user_id=user_id,
+            target_id=target_id,
+            idempotency_key=key,
+            created_at=utcnow(),
+            run_after=utcnow(),
+            attempts=0,
+        )
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+    )
+
+
+def claim(db: Session, limit: int) -> List[Job]:
+    """Lock up to ``limit`` of the oldest ready jobs, plus the other ready
+    jobs of their users, skipping jobs other workers hold."""
+    now = utcnow()
+    jobs = db.scalars(
+        select(Job)
+        .where(Job.run_after <= now)
+        .order_by(Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not jobs:
+        return []
+    # The rest of each user's burst, so it is recomputed once
+    jobs += db.scalars(
+        select(Job)
+        .where(
+            Job.user_id.in_(sorted({job.user_id for job in jobs})),
+            Job.run_after <= now,
+            Job.id.not_in([job.id for job in jobs]),
+        )
+        .with_for_update(skip_locked=True)
+    ).all()
+    return jobs
+
+
+def analyze_exercise_set(db: Session, exercise_set_id: int) -> None:
+    """Recompute a set's quality metrics from its pose data, if it has any
+    that they can be derived from."""
+    # Imported here: numpy is only needed for pose jobs
+    from app.pose.analytics import ANGLE_JOINTS, METRIC_COLUMNS, compute_set_metrics
+    from app.pose.storage import read_pose_stream
+
+    exercise_set = db.get(ExerciseSet, exercise_set_id)
+    if exercise_set is None:
+        return
+    packed = read_pose_stream(db, exercise_set_id, joints=ANGLE_JOINTS)
+    metrics = compute_set_metrics(packed) if packed is not None else None
+    if metrics is not None:
+        for column in METRIC_COLUMNS:
+            setattr(exercise_set, column, metrics[column])
+        db.flush()
+
+
+def lock_users(db: Session, user_ids: Sequence[int]) -> None:
+    """Hold off other workers processing jobs of ``user_ids`` until the
+    session's transaction ends (PostgreSQL; SQLite runs one worker)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    # In one order everywhere, so two workers cannot deadlock
+    for user_id in sorted(user_ids):
+        db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_SPACE, user_id)))
+
+
+def process(db: Session, jobs: Sequence[Job]) -> None:
+    """Do the claimed ``jobs`` and delete them, in the session's transaction."""
+    lock_users(db, {job.user_id for job in jobs})
+    for job in jobs:
+        if job.kind == "analyze":
+            analyze_exercise_set(db, job.target_id)
+    user_ids = sorted({job.user_id for job in jobs})
+    rebuild_personal_bests(db, user_ids)
+    rebuild_exercise_progress(db, user_ids)
+    rebuild_user_streaks(db, user_ids)
+    db.execute(delete(Job).where(Job.id.in_([job.id for job in jobs])))
+
+
+def _retry_later(db: Session, job_ids: Sequence[int], error: Exception) -> None:
+    now = utcnow()
+    for job in db.scalars(select(Job).where(Job.id.in_(job_ids))):
+        delay = min(
+            RETRY_BASE_SECONDS * 2**job.attempts, settings.job_max_backoff_seconds
+        )
+        job.attempts += 1
+        job.run_after = now + timedelta(seconds=delay)
+        job.last_error = repr(error)[:2000]
+    db.commit()
+
+
+def run_once(db: Session, batch_size: int = 100) -> Dict[int, int]:
+    """Claim and process one batch. Returns the number of jobs done per user
+    claimed (0 for a user whose jobs failed); empty if none were ready.
+
+    If the batch fails, each user's jobs are tried again on their own, so
+    one user's failing job does not hold back the others; jobs that still
+    fail are retried later, with exponential backoff.
+    """
+    jobs = claim(db, batch_size)
+    if not jobs:
+        db.rollback()
+        return {}
+    by_user: Dict[int, List[int]] = {}
+    for job in jobs:
+        by_user.setdefault(job.user_id, []).append(job.id)
+    try:
+        process(db, jobs)
+        db.commit()
+        return {user_id: len(ids) for user_id, ids in by_user.items()}
+    except Exception as e:
+        db.rollback()
+        if len(by_user) == 1:
+            logger.exception("derived-data jobs failed", extra={"jobs": len(jobs)})
+            _retry_later(db, next(iter(by_user.values())), e)
+            return dict.fromkeys(by_user, 0)
+
+    done = {}
+    for user_id, ids in by_user.items():
+        jobs = db.scalars(
+            select(Job).where(Job.id.in_(ids)).with_for_update(skip_locked=True)
+        ).all()
+        if not jobs:  # taken by another worker since the rollback
+            continue
+        try:
+            process(db, jobs)
+            db.commit()
+            done[user_id] = len(jobs)
+        except Exception as e:
+            db.rollback()
+            logger.exception("derived-data jobs failed", extra={"user_id": user_id})
+            _retry_later(db, ids, e)
+            done[user_id] = 0
+    return done
+
+
+def queue_stats(db: Session) -> dict:
+    """Queue depth: jobs queued, ready to run and waiting for a retry, and
+    the age of the oldest (the lag of derived data behind writes)."""
+    now = utcnow()
+    depth, ready, retrying, oldest = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((Job.run_after <= now, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Job.attempts > 0, 1), else_=0)), 0),
+            func.min(Job.created_at),
+        )
+    ).one()
+    return {
+        "depth": depth,
+        "ready": ready,
+        "retrying": retrying,
+        "oldest_age_seconds": (now - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+def render_queue_stats(stats: dict) -> str:
+    """``stats`` as Prometheus gauges, to append to /metrics."""
+    lines = []
+    for name, help_text, value in (
+        ("job_queue_depth", "Derived-data jobs queued.", stats["depth"]),
+        ("job_queue_ready", "Queued jobs ready to run.", stats["ready"]),
+        ("job_queue_retrying", "Queued jobs that failed before.", stats["retrying"]),
+        (
+            "job_queue_lag_seconds",
+            "Age of the oldest queued job.",
+            stats["oldest_age_seconds"],
+        ),
+    ):
+        lines += [
+            f"# HELP physiobuddy_{name} {help_text}",
+            f"# TYPE physiobuddy_{name} gauge",
+            f"physiobuddy_{name} {value!r}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,122 @@
+# physiobuddy-backend/app/kvstore.py
+"""Small async key-value stores behind one interface.
+
+MemoryStore lives in the worker process; RedisStore is shared by every
+worker. Both store bytes with a time-to-live, and integer counters.
+LocalRedis implements the handful of redis.asyncio.Redis methods RedisStore
+uses, in process, so the Redis code path runs in tests and development
+without a server.
+"""
+
+import threading
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from app.cache import TTLCache
+
+
+class MemoryStore:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        """Add ``amount`` to the counter at ``key`` (0 if absent) and return
+        it, (re)setting its time-to-live. Not atomic across threads; callers
+        use it from the event loop."""
+        value = int(self._cache.get(key) or 0) + amount
+        self._cache.set(key, str(value).encode(), ttl=ttl)
+        return value
+
+
+class RedisStore:
+    """Store backed by a redis.asyncio.Redis (or compatible) client."""
+
+    def __init__(self, client, prefix: str = "physiobuddy:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis backend needs the redis package") from e
+        return cls(redis.asyncio.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def incr(self, key: str, amount: int, ttl: float) -> int:
+        name = self.prefix + key
+        value = await self.client.incr(name, amount)
+        await self.client.pexpire(name, max(int(ttl * 1000), 1))
+        return value
+
+
+class LocalRedis:
+    """In-process stand-in for the subset of redis.asyncio.Redis used here."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, name: str) -> Optional[bytes]:
+        item = self._data.get(name)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= monotonic():
+            del self._data[name]
+            return None
+        return value
+
+    async def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(name)
+
+    async def set(self, name: str, value, ex=None, px=None) -> bool:
+        ttl = px / 1000 if px is not None else ex
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[name] = (value, None if ttl is None else monotonic() + ttl)
+        return True
+
+    async def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    async def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._live(name) or 0) + amount
+            expires_at = self._data.get(name, (None, None))[1]
+            self._data[name] = (str(value).encode(), expires_at)
+            return value
+
+    async def pexpire(self, name: str, milliseconds: int) -> bool:
+        with self._lock:
+            value = self._live(name)
+            if value is None:
+                return False
+            self._data[name] = (value, monotonic() + milliseconds / 1000)
+            return True
+
+    async def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
@@ -1,30 +1,31 @@
-from fastapi import FastAPI
+"""The FastAPI application.
+
+``create_app(settings)`` builds an app for the given Settings; ``app`` is
+the one for the process's settings, built when first accessed (uvicorn's
+``app.main:app``), so importing this module stays cheap. The routers and
+everything behind them (models, schemas, jose, numpy) are imported when an
+app is built; the database engines and the password hash context are
+created on first use.
+"""
+
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.auth.auth import router as auth_router
-from app.routers.workouts import router as workouts_router
+from config import Settings, settings
 
-app = FastAPI(
-    title="PhysioBuddy API",
-    description="Backend API for physiotherapy exercise tracking",
-    version="1.0.0",
-)
+router = APIRouter()
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure this properly in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include routers
-app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
-app.include_router(workouts_router, prefix="/workouts", tags=["Workouts"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    app.state.password_hasher.shutdown()
+    await app.state.database.dispose()
 
 
-@app.get("/")
+@router.get("/")
 def read_root():
     return {
         "message": "Welcome to the PhysioBuddy API",
@@ -33,6 +34,128 @@ def read_root():
     }
 
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@router.get("/health/pool")
+def pool_health(request: Request):
+    """Connection pool occupancy and checkout wait/hold times, per engine."""
+    from app.pool import pool_status
+
+    database = request.app.state.database
+    pools = {"sync": pool_status(database.engine)}
+    if database.is_async:
+        pools["async"] = pool_status(database.async_engine.sync_engine)
+    for i, replica in enumerate(database.replicas):
+        engine = (
+            replica.async_engine.sync_engine if replica.is_async else replica.engine
+        )
+        pools[f"replica{i}"] = pool_status(engine)
+    return pools
+
+
+@router.get("/health/cache")
+def cache_health(request: Request):
+    """Response cache hit, miss and 304 counters for this worker."""
+    return request.app.state.response_cache.stats()
+
+
+def _queue_stats(request: Request) -> dict:
+    from app.jobs import queue_stats
+
+    db = request.app.state.database.session_factory()
+    try:
+        return queue_stats(db)
+    finally:
+        db.close()
+
+
+@router.get("/health/queue")
+def queue_health(request: Request):
+    """Derived-data job queue depth and the age of its oldest job."""
+    return _queue_stats(request)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    """Per-route latency, status and DB metrics for this worker, in
+    Prometheus text format, and the job queue's depth and lag when
+    derived data is queued."""
+    from app.metrics import request_metrics
+
+    body = request_metrics.render()
+    if request.app.state.settings.derived_data == "queue":
+        from app.jobs import render_queue_stats
+
+        body += render_queue_stats(_queue_stats(request))
+    return Response(body, media_type="text/plain; version=0.0.4")
+
+
+def create_app(config: Settings = settings, database=None) -> FastAPI:
+    """Build the API for ``config``.
+
+    ``database`` (an app.database.Database) defaults to a new one for
+    ``config``. Apps built for different settings, e.g. one per test, share
+    nothing: each has its own engines, response cache, auth caches and
+    password hasher, and handlers read ``app.state.settings``.
+    """
+    from app.auth.auth import AuthCaches, router as auth_router
+    from app.auth.hashing import PasswordHasher
+    from app.database import Database
+    from app.metrics import MetricsMiddleware
+    from app.ratelimit import RateLimitMiddleware, RateLimits
+    from app.response_cache import make_response_cache
+    from app.routers.workouts import router as workouts_router
+
+    app = FastAPI(
+        title="PhysioBuddy API",
+        description="Backend API for physiotherapy exercise tracking",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    if config.derived_data == "queue" and config.response_cache_backend != "redis":
+        # The worker invalidates the responses its jobs make stale, which the
+        # API workers only see in a shared cache; app.state.response_cache
+        # is built from config below
+        raise ValueError("derived_data='queue' needs response_cache_backend='redis'")
+    app.state.settings = config
+    app.state.database = database or Database(config)
+    app.state.rate_limits = RateLimits(config)
+    app.state.response_cache = make_response_cache(config)
+    app.state.auth_caches = AuthCaches(config)
+    app.state.password_hasher = PasswordHasher(config)
+
+    # Innermost, so its 429s get CORS headers and are counted in the metrics
+    if config.rate_limit_enabled:
+        app.add_middleware(
+            RateLimitMiddleware,
+            limits=app.state.rate_limits,
+            routes=app.router.routes,
+            auth_caches=app.state.auth_caches,
+        )
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure this properly in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Outermost, so it times everything else
+    app.add_middleware(MetricsMiddleware, server_timing=config.server_timing)
+
+    # Include routers
+    app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+    app.include_router(workouts_router, prefix="/workouts", tags=["Workouts"])
+    app.include_router(router)
+    return app
+
+
+def __getattr__(name):
+    # Module-level ``app``, built on first access
+    if name == "app":
+        app = globals()["app"] = create_app(settings)
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,243 @@
+# physiobuddy-backend/app/metrics.py
+"""Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware is plain ASGI rather than BaseHTTPMiddleware, which would
+cost a task and a memory stream per request. It times each HTTP request,
+labels it with its route template ("/workouts/sessions/{session_id}/...",
+not the raw path, so label cardinality stays bounded) and adds a
+``Server-Timing`` header. SQL statements are attributed to the request that
+ran them through a context variable that engine events add to;
+contextvars follow the request into the threadpool and into run_sync.
+
+Metrics are per worker process, like the pool and cache stats: Prometheus
+scrapes each worker, or sums them.
+"""
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Upper bounds, in seconds, of the latency histogram buckets (+Inf implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label for requests that matched no route (404s, probes), so arbitrary paths
+# cannot create label values
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _DbTime:
+    """SQL statement count and time for one request."""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+_request_db: ContextVar[Optional[_DbTime]] = ContextVar("request_db", default=None)
+
+
+# The dialect's do_execute* events, rather than before/after_cursor_execute:
+# any cursor_execute listener moves every statement onto a slower path in
+# SQLAlchemy (about 9 us more per statement, see benchmarks/bench_metrics.py),
+# while these cost one call. Each handler runs the dialect's own method, timed,
+# and returns True to say the statement has been executed.
+def _do_execute(cursor, statement, parameters, context):
+    db_time = _request_db.get()
+    if db_time is None:
+        return False
+    started_at = perf_counter()
+    try:
+        context.dialect.do_execute(cursor, statement, parameters, context)
+    finally:
+        db_time.statements += 1
+        db_time.seconds += perf_counter() - started_at
+    return True
+
+
+def _do_execute_no_params(cursor, statement, context):
+    db_time = _request_db.get()
+    if db_time is None:
+        return False
+    started_at = perf_counter()
+    try:
+        context.dialect.do_execute_no_params(cursor, statement, context)
+    finally:
+        db_time.statements += 1
+        db_time.seconds += perf_counter() - started_at
+    return True
+
+
+def _do_executemany(cursor, statement, parameters, context):
+    db_time = _request_db.get()
+    if db_time is None:
+        return False
+    started_at = perf_counter()
+    try:
+        context.dialect.do_executemany(cursor, statement, parameters, context)
+    finally:
+        db_time.statements += 1
+        db_time.seconds += perf_counter() - started_at
+    return True
+
+
+def instrument_engine(engine) -> None:
+    """Count the statements a sync Engine (for an AsyncEngine, its
+    ``sync_engine``) runs, and their time, towards the current request."""
+    event.listen(engine, "do_execute", _do_execute)
+    event.listen(engine, "do_execute_no_params", _do_execute_no_params)
+    event.listen(engine, "do_executemany", _do_executemany)
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "duration_sum", "statuses", "db_statements", "db_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.db_statements = 0
+        self.db_seconds = 0.0
+
+
+class RequestMetrics:
+    """Latency histograms, status counts and DB totals per (method, route).
+
+    Recorded from the event loop only, so it needs no lock.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], _RouteStats] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        db_time: _DbTime,
+    ) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[method, route] = _RouteStats()
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.duration_sum += seconds
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.db_statements += db_time.statements
+        stats.db_seconds += db_time.seconds
+
+    def reset(self) -> None:
+        self.routes.clear()
+
+    def render(self) -> str:
+        """The metrics in Prometheus text exposition format (0.0.4)."""
+        duration = [
+            "# HELP physiobuddy_http_request_duration_seconds "
+            "Request latency by route template.",
+            "# TYPE physiobuddy_http_request_duration_seconds histogram",
+        ]
+        requests = [
+            "# HELP physiobuddy_http_requests_total Requests by route and status.",
+            "# TYPE physiobuddy_http_requests_total counter",
+        ]
+        statements = [
+            "# HELP physiobuddy_db_statements_total SQL statements run by requests.",
+            "# TYPE physiobuddy_db_statements_total counter",
+        ]
+        db_seconds = [
+            "# HELP physiobuddy_db_duration_seconds_total "
+            "Time requests spent executing SQL.",
+            "# TYPE physiobuddy_db_duration_seconds_total counter",
+        ]
+        for (method, route), stats in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                cumulative += count
+                duration.append(
+                    "physiobuddy_http_request_duration_seconds_bucket"
+                    f'{{{labels},le="{bound}"}} {cumulative}'
+                )
+            duration.append(
+                f"physiobuddy_http_request_duration_seconds_sum{{{labels}}} "
+                f"{stats.duration_sum!r}"
+            )
+            duration.append(
+                f"physiobuddy_http_request_duration_seconds_count{{{labels}}} "
+                f"{cumulative}"
+            )
+            for status, count in sorted(stats.statuses.items()):
+                requests.append(
+                    f'physiobuddy_http_requests_total{{{labels},status="{status}"}} '
+                    f"{count}"
+                )
+            statements.append(
+                f"physiobuddy_db_statements_total{{{labels}}} {stats.db_statements}"
+            )
+            db_seconds.append(
+                f"physiobuddy_db_duration_seconds_total{{{labels}}} "
+                f"{stats.db_seconds!r}"
+            )
+        return "\n".join(duration + requests + statements + db_seconds) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    def __init__(
+        self, app, metrics: RequestMetrics = request_metrics, server_timing=False
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = perf_counter()
+        db_time = _DbTime()
+        token = _request_db.set(db_time)
+        status = 500  # unless a response starts
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message["headers"] = _with_server_timing(
+                        message.get("headers", []), perf_counter() - started_at, db_time
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db.reset(token)
+            route = scope.get("route")
+            self.metrics.record(
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+                status,
+                perf_counter() - started_at,
+                db_time,
+            )
+
+
+def _with_server_timing(headers, seconds: float, db_time: _DbTime) -> List:
+    # Time to the first byte of the response; a streamed body runs on after
+    value = (
+        f"app;dur={seconds * 1e3:.2f}, "
+        f'db;dur={db_time.seconds * 1e3:.2f};desc="{db_time.statements} queries"'
+    )
+    return [*headers, (b"server-timing", value.encode("latin-1"))]
@@ -8,15 +8,24 @@ from sqlalchemy import (
     ForeignKey,
     Enum,
     Boolean,
+    LargeBinary,
+    Text,
+    UniqueConstraint,
+    Index,
 )
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 import enum
 
 # Import Base from database.py instead of creating a new one
 from app.database import Base
 
 
+def utcnow() -> datetime:
+    """The current time as a naive UTC datetime, as DateTime columns store it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class ExerciseType(str, enum.Enum):
     BICEP_CURL = "bicep_curl"
     # Add more exercises later
@@ -36,7 +45,9 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=utcnow)
+    # Bumped on logout / password change to revoke every issued token
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     workout_sessions = relationship("WorkoutSession", back_populates="user")
@@ -45,10 +56,14 @@ class User(Base):
 
 class WorkoutSession(Base):
     __tablename__ = "workout_sessions"
+    __table_args__ = (
+        # Serves per-user listings ordered by (session_date, id)
+        Index("ix_workout_sessions_user_date", "user_id", "session_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    session_date = Column(DateTime, default=datetime.now)
+    session_date = Column(DateTime, default=utcnow)
     total_duration = Column(Float)  # in seconds
     notes = Column(String, nullable=True)
 
@@ -59,6 +74,10 @@ class WorkoutSession(Base):
 
 class ExerciseSet(Base):
     __tablename__ = "exercise_sets"
+    __table_args__ = (
+        # Serves a session's sets in order, and the joins from sessions to sets
+        Index("ix_exercise_sets_session_set", "session_id", "set_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("workout_sessions.id"), nullable=False)
@@ -80,7 +99,7 @@ class ExerciseSet(Base):
     min_angle_achieved = Column(Float)
     max_angle_achieved = Column(Float)
 
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=utcnow)
 
     # Relationships
     session = relationship("WorkoutSession", back_populates="exercises")
@@ -88,6 +107,10 @@ class ExerciseSet(Base):
 
 class PoseFrame(Base):
     __tablename__ = "pose_frames"
+    __table_args__ = (
+        # Serves a set's frames, or a frame range, in order with one range scan
+        Index("ix_pose_frames_set_frame", "exercise_set_id", "frame_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     exercise_set_id = Column(Integer, ForeignKey("exercise_sets.id"), nullable=False)
@@ -95,7 +118,9 @@ class PoseFrame(Base):
     timestamp = Column(Float, nullable=False)  # seconds from start of set
     frame_number = Column(Integer, nullable=False)
 
-    created_at = Column(DateTime, default=datetime.now)
+    # The exercise set's created_at, so all of a set's frames share one
+    # monthly partition (app/partitions.py)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
 
     # Relationships
     exercise_set = relationship("ExerciseSet", backref="pose_frames")
@@ -114,6 +139,10 @@ class JointType(str, enum.Enum):
 
 class JointPosition(Base):
     __tablename__ = "joint_positions"
+    __table_args__ = (
+        # Joins each frame to its joints when reading a stream back
+        Index("ix_joint_positions_frame", "frame_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     frame_id = Column(Integer, ForeignKey("pose_frames.id"), nullable=False)
@@ -125,12 +154,44 @@ class JointPosition(Base):
 
     confidence = Column(Float, nullable=True)  # From BlazePose if available
 
+    # Its frame's created_at; the partition key
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
     # Relationships
     frame = relationship("PoseFrame", back_populates="joint_positions")
 
 
+# Compact alternative to PoseFrame/JointPosition rows: one packed float32
+# (frames x joints x 4) array per exercise set. Layout in app/pose/blob.py.
+class PoseBlob(Base):
+    __tablename__ = "pose_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    exercise_set_id = Column(
+        Integer, ForeignKey("exercise_sets.id"), nullable=False, unique=True
+    )
+
+    n_frames = Column(Integer, nullable=False)
+    n_joints = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    created_at = Column(DateTime, default=utcnow)
+
+    # Relationships
+    exercise_set = relationship("ExerciseSet")
+
+
 class PersonalBest(Base):
     __tablename__ = "personal_bests"
+    __table_args__ = (
+        # Its index, led by user_id, also serves per-user lookups
+        UniqueConstraint(
+            "user_id",
+            "exercise_type",
+            "arm_used",
+            name="uq_personal_bests_user_exercise_arm",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -144,8 +205,8 @@ class PersonalBest(Base):
     longest_session_duration = Column(Float)
 
     # Tracking
-    achieved_date = Column(DateTime, default=datetime.now)
-    last_updated = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    achieved_date = Column(DateTime, default=utcnow)
+    last_updated = Column(DateTime, default=utcnow, onupdate=utcnow)
 
     # Relationships
     user = relationship("User", back_populates="personal_bests")
@@ -155,7 +216,7 @@ class UserStreak(Base):
     __tablename__ = "user_streaks"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
     current_streak = Column(Integer, default=0)
     longest_streak = Column(Integer, default=0)
     last_workout_date = Column(DateTime)
@@ -167,6 +228,16 @@ class UserStreak(Base):
 
 class ExerciseProgress(Base):
     __tablename__ = "exercise_progress"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "exercise_type",
+            "arm_used",
+            "week_start_date",
+            name="uq_exercise_progress_user_exercise_arm_week",
+        ),
+        Index("ix_exercise_progress_user_week", "user_id", "week_start_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -181,10 +252,31 @@ class ExerciseProgress(Base):
     avg_form_score = Column(Float)
     workout_count = Column(Integer, default=0)
 
+    # Running sums so avg_form_score stays exact under incremental updates
+    form_score_sum = Column(Float, default=0.0)
+    form_score_count = Column(Integer, default=0)
+
     # Relationships
     user = relationship("User")
 
 
+# Pending derived-data work (app/jobs.py). A row is deleted once processed.
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # "derived" or "analyze"
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    target_id = Column(Integer)  # the exercise set of an "analyze" job
+    # A key already queued is not queued again
+    idempotency_key = Column(String, nullable=False, unique=True)
+
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    run_after = Column(DateTime, nullable=False, default=utcnow, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+
+
 class VideoMetadata(Base):
     __tablename__ = "video_metadata"
 
@@ -0,0 +1,31 @@
+# physiobuddy-backend/app/pagination.py
+"""Opaque cursors for keyset pagination.
+
+A cursor holds the sort key of the last row on a page; the next page starts
+strictly after it, so fetching page N costs the same as fetching page 1.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    payload = json.dumps([moment.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises InvalidCursor for anything else."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(moment), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
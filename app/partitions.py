@@ -0,0 +1,300 @@
+# physiobuddy-backend/app/partitions.py
+"""Monthly partitions for the pose row tables.
+
+pose_frames and joint_positions are orders of magnitude larger than anything
+else. On PostgreSQL they can be range-partitioned by month of ``created_at``
+(settings.pose_partitioning, applied by migration 0003): retention then
+drops whole months with DROP TABLE instead of a DELETE that leaves the
+tables to vacuum, and a read that pins ``created_at`` touches one partition.
+
+Every pose row of a set carries the set's own ``created_at`` (see
+pose_partition_key), so a set lives in one partition however long its upload
+or stream took, and is kept or dropped as a whole. Inserts create their
+month's partition if it is missing (ensure_pose_partition), e.g. for a set
+older than the tables' conversion; sets past retention take no new rows.
+
+Usage:
+    python -m app.partitions partition
+    python -m app.partitions rotate [--months-ahead N] [--retention-months N]
+
+``partition`` converts existing unpartitioned tables (migration 0003 does
+this when settings.pose_partitioning is set). ``rotate``, run e.g. daily,
+creates the coming months' partitions and drops expired ones; on SQLite or
+unpartitioned tables it deletes expired rows instead.
+"""
+
+import argparse
+import re
+from datetime import datetime
+from typing import List, Optional, Set
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models import ExerciseSet, JointPosition, PoseFrame, utcnow
+from config import settings
+
+POSE_TABLES = ("pose_frames", "joint_positions")
+PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, n: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def pose_partition_key(db: Session, exercise_set_id: int) -> Optional[datetime]:
+    """The ``created_at`` the set's pose rows are stored under: the set's own.
+
+    None for a set without one; its rows are stored under their insert time
+    and reads cannot pin them to a partition.
+    """
+    return db.execute(
+        select(ExerciseSet.created_at).where(ExerciseSet.id == exercise_set_id)
+    ).scalar()
+
+
+def retention_cutoff(
+    today: datetime, retention_months: Optional[int]
+) -> Optional[datetime]:
+    """Start of the oldest month of pose data kept; None keeps everything."""
+    if retention_months is None:
+        return None
+    return add_months(month_start(today), 1 - retention_months)
+
+
+def past_retention(
+    created_at: Optional[datetime], retention_months: Optional[int]
+) -> bool:
+    """Whether pose rows stored under ``created_at`` are already expired."""
+    cutoff = retention_cutoff(utcnow(), retention_months)
+    return cutoff is not None and created_at is not None and created_at < cutoff
+
+
+def is_partitioned(connection, table: str = "pose_frames") -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:table))"
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{month:%Y-%m-%d}') "
+        f"TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+
+# Months whose partitions were seen committed (or that need none); only
+# those are skipped, since a partition created in a transaction that rolls
+# back is gone again
+_ready_months: Set[datetime] = set()
+
+
+def ensure_pose_partition(db: Session, created_at: datetime) -> None:
+    """Create ``created_at``'s month's partitions if the pose tables are
+    partitioned and they are missing, in the session's transaction."""
+    month = month_start(created_at)
+    if month in _ready_months:
+        return
+    connection = db.connection()
+    if not is_partitioned(connection):
+        _ready_months.add(month)
+        return
+    missing = [
+        table
+        for table in POSE_TABLES
+        if connection.execute(
+            text("SELECT to_regclass(:name) IS NULL"),
+            {"name": partition_name(table, month)},
+        ).scalar()
+    ]
+    for table in missing:
+        connection.exec_driver_sql(create_partition_sql(table, month))
+    if not missing:
+        _ready_months.add(month)
+
+
+def months(first: datetime, last: datetime) -> List[datetime]:
+    """Month starts from ``first``'s month through ``last``'s."""
+    month, last = month_start(first), month_start(last)
+    result = []
+    while month <= last:
+        result.append(month)
+        month = add_months(month, 1)
+    return result
+
+
+def partition_sql(first: datetime, last: datetime) -> List[str]:
+    """DDL converting the unpartitioned pose tables into partitioned ones,
+    with partitions for ``first``'s month through ``last``'s, and moving
+    their rows across.
+
+    The primary keys must include the partition key, so pose_frames.id alone
+    is no longer unique to the database and joint_positions.frame_id loses
+    its foreign key; the ids still come from the tables' sequences.
+    """
+    statements = []
+    for table in POSE_TABLES:
+        statements += [
+            # The sequences outlive the tables they were created with
+            f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE",
+            f"ALTER TABLE {table} RENAME TO {table}_unpartitioned",
+            f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (created_at)",
+        ]
+        statements += [
+            create_partition_sql(table, month) for month in months(first, last)
+        ]
+        statements.append(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+    for table in reversed(POSE_TABLES):
+        statements.append(f"DROP TABLE {table}_unpartitioned")
+    statements += [
+        "ALTER TABLE pose_frames ADD PRIMARY KEY (id, created_at)",
+        "ALTER TABLE pose_frames ADD FOREIGN KEY (exercise_set_id) "
+        "REFERENCES exercise_sets (id)",
+        "CREATE INDEX ix_pose_frames_id ON pose_frames (id)",
+        "CREATE INDEX ix_pose_frames_set_frame "
+        "ON pose_frames (exercise_set_id, frame_number)",
+        "ALTER TABLE joint_positions ADD PRIMARY KEY (id, created_at)",
+        "CREATE INDEX ix_joint_positions_id ON joint_positions (id)",
+        "CREATE INDEX ix_joint_positions_frame ON joint_positions (frame_id)",
+    ]
+    statements += [f"ALTER SEQUENCE {t}_id_seq OWNED BY {t}.id" for t in POSE_TABLES]
+    return statements
+
+
+def partition_pose_tables(
+    connection, months_ahead: int = settings.pose_partition_months_ahead
+) -> None:
+    """Convert the pose tables to monthly partitions, in the caller's
+    transaction. Rewrites both tables: run it in a maintenance window."""
+    if connection.dialect.name != "postgresql":
+        raise NotImplementedError("Partitioning needs PostgreSQL")
+    if is_partitioned(connection):
+        return
+    today = utcnow()
+    # Pose rows go in under their set's created_at, so sets without any yet
+    # need their months too
+    oldest = [
+        connection.execute(select(func.min(column))).scalar()
+        for column in (ExerciseSet.created_at, PoseFrame.created_at)
+    ]
+    first = min([moment for moment in oldest if moment is not None] + [today])
+    for statement in partition_sql(first, add_months(today, months_ahead)):
+        connection.exec_driver_sql(statement)
+
+
+def list_partitions(connection, table: str) -> List[str]:
+    return (
+        connection.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(:table) "
+                "ORDER BY child.relname"
+            ),
+            {"table": table},
+        )
+        .scalars()
+        .all()
+    )
+
+
+def drop_expired_partitions(connection, cutoff: datetime) -> List[str]:
+    """Drop the partitions of months before ``cutoff``'s; returns their names."""
+    dropped = []
+    for table in reversed(POSE_TABLES):  # joints before their frames
+        for name in list_partitions(connection, table):
+            match = PARTITION_SUFFIX.search(name)
+            if match and datetime(int(match[1]), int(match[2]), 1) < cutoff:
+                connection.exec_driver_sql(f"DROP TABLE {name}")
+                dropped.append(name)
+    return dropped
+
+
+def delete_expired_rows(connection, cutoff: datetime) -> int:
+    """Fallback for unpartitioned tables: DELETE what a partition drop would
+    have removed. Returns the number of frames deleted."""
+    connection.execute(
+        JointPosition.__table__.delete().where(JointPosition.created_at < cutoff)
+    )
+    return connection.execute(
+        PoseFrame.__table__.delete().where(PoseFrame.created_at < cutoff)
+    ).rowcount
+
+
+def rotate(
+    connection,
+    today: Optional[datetime] = None,
+    months_ahead: int = settings.pose_partition_months_ahead,
+    retention_months: Optional[int] = settings.pose_retention_months,
+) -> dict:
+    """Create partitions through ``months_ahead`` months from ``today`` and
+    expire pose data from before the last ``retention_months`` months (the
+    current one included)."""
+    today = today or utcnow()
+    cutoff = retention_cutoff(today, retention_months)
+
+    if not is_partitioned(connection):
+        deleted = 0 if cutoff is None else delete_expired_rows(connection, cutoff)
+        return {"created": [], "dropped": [], "frames_deleted": deleted}
+
+    created = []
+    for month in months(today, add_months(today, months_ahead)):
+        for table in POSE_TABLES:
+            connection.exec_driver_sql(create_partition_sql(table, month))
+            created.append(partition_name(table, month))
+    dropped = [] if cutoff is None else drop_expired_partitions(connection, cutoff)
+    return {"created": created, "dropped": dropped, "frames_deleted": 0}
+
+
+def main(argv=None):
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Manage pose table partitions.")
+    parser.add_argument("command", choices=["partition", "rotate"])
+    parser.add_argument(
+        "--months-ahead", type=int, default=settings.pose_partition_months_ahead
+    )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=settings.pose_retention_months,
+        help="Keep this many months of pose data, the current one included.",
+    )
+    args = parser.parse_args(argv)
+
+    with engine.begin() as connection:
+        if args.command == "partition":
+            partition_pose_tables(connection, args.months_ahead)
+            print("Partitioned " + ", ".join(POSE_TABLES) + ".")
+            return
+        result = rotate(
+            connection,
+            months_ahead=args.months_ahead,
+            retention_months=args.retention_months,
+        )
+    print(
+        f"Partitions ensured: {len(result['created'])}, "
+        f"dropped: {', '.join(result['dropped']) or 'none'}, "
+        f"frames deleted: {result['frames_deleted']}."
+    )
+
+
+if __name__ == "__main__":
+    main()
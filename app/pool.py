@@ -0,0 +1,128 @@
+# physiobuddy-backend/app/pool.py
+"""Connection pool classes that record checkout wait and hold times.
+
+SQLAlchemy has no event for "started waiting for a connection", so the wait
+is measured by wrapping the pool's own checkout. Stats live on the pool
+class rather than the instance because Engine.dispose() replaces the pool
+with a fresh instance of the same class.
+"""
+
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Optional, Type
+
+import numpy as np
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+
+# Waits kept for percentiles; older ones only count towards the totals
+RECENT_WAITS = 10_000
+
+
+class PoolStats:
+    """Checkout counters for one engine's pool, shared by all its threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.hold_total = 0.0
+            self.hold_max = 0.0
+            self.returns = 0
+            self._recent_waits = deque(maxlen=RECENT_WAITS)
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._recent_waits.append(seconds)
+
+    def record_hold(self, seconds: float) -> None:
+        with self._lock:
+            self.returns += 1
+            self.hold_total += seconds
+            self.hold_max = max(self.hold_max, seconds)
+
+    def snapshot(self) -> dict:
+        """Totals plus wait percentiles over recent checkouts, in ms."""
+        with self._lock:
+            waits = np.array(self._recent_waits)
+            attempts = self.checkouts + self.timeouts
+            snapshot = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": 1e3 * self.wait_total / attempts if attempts else 0.0,
+                "wait_ms_max": 1e3 * self.wait_max,
+                "hold_ms_avg": (
+                    1e3 * self.hold_total / self.returns if self.returns else 0.0
+                ),
+                "hold_ms_max": 1e3 * self.hold_max,
+            }
+        for q, value in zip(
+            (50, 95, 99),
+            np.percentile(waits, (50, 95, 99)) if waits.size else (0.0,) * 3,
+        ):
+            snapshot[f"wait_ms_p{q}"] = 1e3 * float(value)
+        return snapshot
+
+
+class _TimedCheckout:
+    """Mixin for a Pool subclass; ``stats`` is set by timed_pool_class."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(perf_counter() - start, timed_out=True)
+            raise
+        now = perf_counter()
+        self.stats.record_wait(now - start)
+        record.info["checked_out_at"] = now
+        return record
+
+    def _do_return_conn(self, record):
+        checked_out_at = record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.stats.record_hold(perf_counter() - checked_out_at)
+        super()._do_return_conn(record)
+
+
+def timed_pool_class(base: Type[Pool], stats: Optional[PoolStats] = None) -> Type[Pool]:
+    """A subclass of ``base`` recording into ``stats`` (a new one by default)."""
+    return type(
+        f"Timed{base.__name__}",
+        (_TimedCheckout, base),
+        {"stats": stats or PoolStats()},
+    )
+
+
+def pool_status(engine) -> dict:
+    """Occupancy and checkout stats for an engine created with a timed pool."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    # NullPool keeps no connections, so it has no occupancy to report
+    if hasattr(pool, "checkedout"):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
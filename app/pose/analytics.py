@@ -0,0 +1,264 @@
+# physiobuddy-backend/app/pose/analytics.py
+"""Exercise-set metrics computed from raw joint positions.
+
+Everything here works on whole NumPy columns at once; the only Python-level
+iteration is over a handful of metric values, never over frames.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from app.models import JointType
+from app.pose.ingest import PackedPoseStream
+
+# Joints whose angle drives the exercise, as (proximal, vertex, distal)
+ANGLE_JOINTS = (JointType.SHOULDER, JointType.ELBOW, JointType.WRIST)
+
+# Columns of ExerciseSet filled in from pose data
+METRIC_COLUMNS = (
+    "avg_angle_range",
+    "form_quality_score",
+    "rep_consistency_score",
+    "avg_rep_speed",
+    "min_angle_achieved",
+    "max_angle_achieved",
+)
+
+MIN_CONFIDENCE = 0.5  # frames below this on any angle joint are interpolated over
+SMOOTHING_SECONDS = 0.1  # moving-average window applied before rep detection
+HYSTERESIS = 0.3  # fraction of the angle span a rep must cross at each end
+MIN_REP_RANGE = 20.0  # degrees; smaller oscillations are treated as noise
+FULL_RANGE_OF_MOTION = 120.0  # degrees of elbow travel that scores a full rep
+
+
+def joint_angles(
+    proximal: np.ndarray, vertex: np.ndarray, distal: np.ndarray
+) -> np.ndarray:
+    """Angle in degrees at ``vertex`` for each row of (frames, dims) arrays."""
+    u = proximal - vertex
+    v = distal - vertex
+    cosine = np.einsum("ij,ij->i", u, v) / (
+        np.linalg.norm(u, axis=1) * np.linalg.norm(v, axis=1)
+    )
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def arm_angles(shoulder: np.ndarray, elbow: np.ndarray, wrist: np.ndarray):
+    """Elbow angle per frame from (frames, 4) x, y, z, confidence arrays.
+
+    Uses z only when every frame has it. Frames below MIN_CONFIDENCE on any
+    of the three joints are NaN; unknown (NaN) confidence is kept.
+    """
+    joints = np.stack([shoulder, elbow, wrist]).astype(np.float64)
+    dims = 3 if np.isfinite(joints[:, :, 2]).all() else 2
+    angles = joint_angles(joints[0, :, :dims], joints[1, :, :dims], joints[2, :, :dims])
+    angles[(joints[:, :, 3] < MIN_CONFIDENCE).any(axis=0)] = np.nan
+    return angles
+
+
+def _fill_gaps(values: np.ndarray) -> np.ndarray:
+    """Linearly interpolate over NaNs."""
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return values
+    index = np.arange(values.shape[0])
+    filled = values.copy()
+    filled[missing] = np.interp(index[missing], index[~missing], values[~missing])
+    return filled
+
+
+def _smooth(values: np.ndarray, window: int) -> np.ndarray:
+    if window <= 1:
+        return values
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode="edge")
+    return np.convolve(padded, np.ones(window) / window, mode="valid")
+
+
+def _forward_fill(states: np.ndarray) -> np.ndarray:
+    """Replace zeros with the last non-zero state before them."""
+    index = np.where(states != 0, np.arange(states.shape[0]), 0)
+    np.maximum.accumulate(index, out=index)
+    return states[index]
+
+
+def segment_reps(timestamps: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """Return frame indexes bounding each rep (``len(reps) + 1`` of them).
+
+    A rep is one excursion from the extended end of the movement to the
+    flexed end and back, detected with hysteresis on the smoothed angle so
+    that jitter near a turning point cannot count as an extra rep.
+    """
+    if angles.shape[0] < 3:
+        return np.zeros(0, dtype=np.intp)
+    step = np.median(np.diff(timestamps))
+    window = int(round(SMOOTHING_SECONDS / step)) if step > 0 else 1
+    smoothed = _smooth(angles, window)
+
+    low, high = smoothed.min(), smoothed.max()
+    span = high - low
+    if span < MIN_REP_RANGE:
+        return np.zeros(0, dtype=np.intp)
+    states = np.zeros(smoothed.shape[0], dtype=np.int8)
+    states[smoothed >= high - HYSTERESIS * span] = 1  # extended
+    states[smoothed <= low + HYSTERESIS * span] = -1  # flexed
+    states = _forward_fill(states)
+
+    # A rep ends each time the movement returns to the extended zone
+    returns = np.flatnonzero((states[1:] == 1) & (states[:-1] == -1)) + 1
+    if returns.shape[0] == 0:
+        return returns
+    extended = np.flatnonzero(states[: returns[0]] == 1)
+    start = extended[0] if extended.shape[0] else 0
+    return np.concatenate(([start], returns))
+
+
+class RepCounter:
+    """Counts reps as a pose stream arrives, one chunk of frames at a time.
+
+    The same hysteresis as segment_reps, made causal: smoothing uses a
+    trailing window and the extended/flexed thresholds come from the angle
+    range seen so far, so a rep is counted once the arm is back in the
+    extended zone. The final count can differ from segment_reps on the
+    whole stream while the range is still being learned in the first rep.
+    """
+
+    def __init__(self):
+        self.reps = 0
+        self._state = 0
+        self._low = np.inf
+        self._high = -np.inf
+        self._last_angle = np.nan
+        self._last_timestamp: Optional[float] = None
+        self._window: Optional[int] = None
+        self._tail = np.zeros(0)  # the last window - 1 angles, for smoothing
+
+    def _angles(self, shoulder, elbow, wrist) -> np.ndarray:
+        angles = arm_angles(shoulder, elbow, wrist)
+        # Hold the last good angle over low-confidence frames; interpolating
+        # would need frames that have not arrived yet
+        angles = np.concatenate(([self._last_angle], angles))
+        index = np.where(np.isnan(angles), 0, np.arange(angles.shape[0]))
+        np.maximum.accumulate(index, out=index)
+        return angles[index][1:]
+
+    def _smooth(self, angles: np.ndarray) -> np.ndarray:
+        window = self._window or 1
+        if window <= 1:
+            return angles
+        values = np.concatenate((self._tail, angles))
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        end = np.arange(self._tail.shape[0], values.shape[0]) + 1
+        start = np.maximum(end - window, 0)
+        self._tail = values[-(window - 1) :]
+        return (sums[end] - sums[start]) / (end - start)
+
+    def update(self, timestamps, shoulder, elbow, wrist) -> int:
+        """Add a chunk of frames, shaped as for compute_exercise_metrics, and
+        return the total number of reps counted so far."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if timestamps.shape[0] == 0:
+            return self.reps
+        if self._window is None:
+            if self._last_timestamp is not None:
+                timestamps_seen = np.concatenate(([self._last_timestamp], timestamps))
+            else:
+                timestamps_seen = timestamps
+            if timestamps_seen.shape[0] >= 2:
+                step = np.median(np.diff(timestamps_seen))
+                self._window = int(round(SMOOTHING_SECONDS / step)) if step > 0 else 1
+        self._last_timestamp = float(timestamps[-1])
+
+        angles = self._angles(shoulder, elbow, wrist)
+        self._last_angle = angles[-1]
+        smoothed = self._smooth(angles)
+
+        # NaN (no usable frame yet) is ignored by fmin/fmax and compares False
+        low = np.fmin.accumulate(np.concatenate(([self._low], smoothed)))[1:]
+        high = np.fmax.accumulate(np.concatenate(([self._high], smoothed)))[1:]
+        self._low, self._high = low[-1], high[-1]
+        span = high - low
+        ranged = span >= MIN_REP_RANGE
+
+        states = np.zeros(smoothed.shape[0] + 1, dtype=np.int8)
+        states[0] = self._state
+        states[1:][ranged & (smoothed >= high - HYSTERESIS * span)] = 1
+        states[1:][ranged & (smoothed <= low + HYSTERESIS * span)] = -1
+        states = _forward_fill(states)
+
+        self.reps += int(((states[1:] == 1) & (states[:-1] == -1)).sum())
+        self._state = int(states[-1])
+        return self.reps
+
+
+def compute_exercise_metrics(
+    timestamps: np.ndarray,
+    shoulder: np.ndarray,
+    elbow: np.ndarray,
+    wrist: np.ndarray,
+) -> dict:
+    """Compute ExerciseSet quality metrics from per-frame joint positions.
+
+    ``shoulder``, ``elbow`` and ``wrist`` are (frames, 4) arrays of
+    x, y, z, confidence. Returns a dict keyed by METRIC_COLUMNS plus
+    ``reps_detected``; values are None when they cannot be derived.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    angles = arm_angles(shoulder, elbow, wrist)
+
+    metrics = dict.fromkeys(METRIC_COLUMNS)
+    metrics["reps_detected"] = 0
+    if np.isnan(angles).all():
+        return metrics
+    metrics["min_angle_achieved"] = float(np.nanmin(angles))
+    metrics["max_angle_achieved"] = float(np.nanmax(angles))
+
+    angles = _fill_gaps(angles)
+    bounds = segment_reps(timestamps, angles)
+    if bounds.shape[0] < 2:
+        return metrics
+
+    within = angles[: bounds[-1]]
+    ranges = np.maximum.reduceat(within, bounds[:-1]) - np.minimum.reduceat(
+        within, bounds[:-1]
+    )
+    durations = np.diff(timestamps[bounds])
+    mean_range = float(ranges.mean())
+    spread = float(ranges.std())
+
+    # Full range of motion, discounted by how much reps vary from each other
+    range_score = min(mean_range / FULL_RANGE_OF_MOTION, 1.0)
+    variation = min(spread / mean_range, 1.0) if mean_range > 0 else 1.0
+
+    metrics.update(
+        reps_detected=int(ranges.shape[0]),
+        avg_angle_range=mean_range,
+        rep_consistency_score=spread,
+        avg_rep_speed=float(durations.mean()),
+        form_quality_score=range_score * (1.0 - variation),
+    )
+    return metrics
+
+
+def _angle_columns(packed: PackedPoseStream):
+    if not set(ANGLE_JOINTS) <= set(packed.joints):
+        return None
+    return [packed.positions[:, packed.joints.index(j), :] for j in ANGLE_JOINTS]
+
+
+def compute_set_metrics(packed: PackedPoseStream) -> Optional[dict]:
+    """compute_exercise_metrics for a stored stream, or None if it lacks the
+    shoulder, elbow and wrist joints."""
+    columns = _angle_columns(packed)
+    if columns is None:
+        return None
+    return compute_exercise_metrics(packed.timestamps, *columns)
+
+
+def stream_angles(packed: PackedPoseStream) -> Optional[np.ndarray]:
+    """Elbow angle per frame of a stream, interpolated over low-confidence
+    frames, or None if it lacks the shoulder, elbow and wrist joints."""
+    columns = _angle_columns(packed)
+    if columns is None:
+        return None
+    return _fill_gaps(arm_angles(*columns))
@@ -0,0 +1,176 @@
+# physiobuddy-backend/app/pose/blob.py
+"""Packed binary layout for a set's skeleton time series.
+
+    offset                      contents
+    0                           header: magic, version, n_joints, n_frames,
+                                joint codes (one byte each, MAX_JOINTS slots)
+    HEADER_SIZE                 frame numbers, int32[n_frames]
+    HEADER_SIZE + 4 * n_frames  timestamps, float32[n_frames]
+    HEADER_SIZE + 8 * n_frames  positions, float32[n_frames, n_joints, 4]
+
+All values are little-endian. Positions are frame-major, so any frame range is
+one contiguous byte range and can be fetched with SUBSTR without reading the
+rest of the blob. Joint codes are indexes into JointType, which must therefore
+only ever be appended to.
+"""
+
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import JointType, PoseBlob
+from app.pose.ingest import PackedPoseStream
+
+MAGIC = b"PBP1"
+VERSION = 1
+MAX_JOINTS = 64
+
+_HEADER = struct.Struct(f"<4sBBHI{MAX_JOINTS}s")
+HEADER_SIZE = _HEADER.size
+_JOINT_TYPES = list(JointType)
+
+
+class PoseBlobError(ValueError):
+    """Raised when a blob is not in the expected layout."""
+
+
+def encode_pose_blob(packed: PackedPoseStream) -> bytes:
+    n_frames, n_joints = packed.n_frames, len(packed.joints)
+    if n_joints > MAX_JOINTS:
+        raise PoseBlobError(f"At most {MAX_JOINTS} joints fit in a pose blob")
+    codes = bytes(_JOINT_TYPES.index(joint) for joint in packed.joints)
+    header = _HEADER.pack(
+        MAGIC, VERSION, n_joints, 0, n_frames, codes.ljust(MAX_JOINTS, b"\xff")
+    )
+    return b"".join(
+        (
+            header,
+            packed.frame_numbers.astype("<i4").tobytes(),
+            packed.timestamps.astype("<f4").tobytes(),
+            packed.positions.astype("<f4").tobytes(),
+        )
+    )
+
+
+def _unpack_header(data) -> tuple:
+    magic, version, n_joints, _, n_frames, codes = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise PoseBlobError("Unrecognised pose blob header")
+    joints = tuple(_JOINT_TYPES[code] for code in codes[:n_joints])
+    return n_frames, joints
+
+
+def decode_pose_blob(data) -> PackedPoseStream:
+    """Decode a whole blob. Arrays are read-only views over ``data``."""
+    n_frames, joints = _unpack_header(data)
+    offset = HEADER_SIZE
+    frame_numbers = np.frombuffer(data, dtype="<i4", count=n_frames, offset=offset)
+    offset += 4 * n_frames
+    timestamps = np.frombuffer(data, dtype="<f4", count=n_frames, offset=offset)
+    offset += 4 * n_frames
+    positions = np.frombuffer(
+        data, dtype="<f4", count=n_frames * len(joints) * 4, offset=offset
+    ).reshape(n_frames, len(joints), 4)
+    return PackedPoseStream(timestamps, frame_numbers, joints, positions)
+
+
+def select_joints(
+    packed: PackedPoseStream, joints: Optional[Sequence[JointType]]
+) -> PackedPoseStream:
+    """Keep only the requested joints (in stored order)."""
+    if joints is None:
+        return packed
+    wanted = set(joints)
+    index = [j for j, joint in enumerate(packed.joints) if joint in wanted]
+    return packed._replace(
+        joints=tuple(packed.joints[j] for j in index),
+        positions=packed.positions[:, index, :],
+    )
+
+
+def write_pose_blob(
+    db: Session,
+    exercise_set_id: int,
+    packed: PackedPoseStream,
+    data: Optional[bytes] = None,
+):
+    """Store ``packed`` (already encoded as ``data``, if given) as the set's
+    pose blob. The caller owns the transaction."""
+    db_blob = PoseBlob(
+        exercise_set_id=exercise_set_id,
+        n_frames=packed.n_frames,
+        n_joints=len(packed.joints),
+        data=encode_pose_blob(packed) if data is None else data,
+    )
+    db.add(db_blob)
+    return db_blob
+
+
+def read_pose_blob(
+    db: Session,
+    exercise_set_id: int,
+    start_frame: Optional[int] = None,
+    end_frame: Optional[int] = None,
+    joints: Optional[Sequence[JointType]] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+) -> Optional[PackedPoseStream]:
+    """Read frames with ``start_frame <= frame_number < end_frame`` and
+    ``start_time <= timestamp < end_time``.
+
+    The first query fetches the header, frame-number and timestamp columns,
+    the second only the byte range of positions for the matching frames; the
+    rest of the blob never leaves the database. None when no frames or none
+    of ``joints`` match, as from read_pose_rows.
+    """
+    row = db.execute(
+        select(
+            PoseBlob.n_frames,
+            func.substr(PoseBlob.data, 1, HEADER_SIZE + PoseBlob.n_frames * 8),
+        ).where(PoseBlob.exercise_set_id == exercise_set_id)
+    ).first()
+    if row is None:
+        return None
+    n_frames, prefix = row
+    _, stored_joints = _unpack_header(prefix)
+    frame_numbers = np.frombuffer(
+        prefix, dtype="<i4", count=n_frames, offset=HEADER_SIZE
+    )
+    timestamps = np.frombuffer(
+        prefix, dtype="<f4", count=n_frames, offset=HEADER_SIZE + 4 * n_frames
+    )
+
+    lo, hi = 0, n_frames
+    if start_frame is not None:
+        lo = max(lo, int(np.searchsorted(frame_numbers, start_frame)))
+    if end_frame is not None:
+        hi = min(hi, int(np.searchsorted(frame_numbers, end_frame)))
+    if start_time is not None:
+        lo = max(lo, int(np.searchsorted(timestamps, np.float32(start_time))))
+    if end_time is not None:
+        hi = min(hi, int(np.searchsorted(timestamps, np.float32(end_time))))
+    if hi <= lo or (joints is not None and not set(joints) & set(stored_joints)):
+        return None
+    stride = len(stored_joints) * 16
+    positions_at = HEADER_SIZE + 8 * n_frames
+
+    position_bytes = db.execute(
+        select(
+            func.substr(
+                PoseBlob.data, positions_at + stride * lo + 1, stride * (hi - lo)
+            ),
+        ).where(PoseBlob.exercise_set_id == exercise_set_id)
+    ).scalar_one()
+
+    packed = PackedPoseStream(
+        timestamps=timestamps[lo:hi],
+        frame_numbers=frame_numbers[lo:hi],
+        joints=stored_joints,
+        positions=np.frombuffer(position_bytes, dtype="<f4").reshape(
+            hi - lo, len(stored_joints), 4
+        ),
+    )
+    return select_joints(packed, joints)
@@ -0,0 +1,224 @@
+# physiobuddy-backend/app/pose/ingest.py
+import csv
+import io
+from datetime import datetime
+from itertools import repeat
+from typing import NamedTuple, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import JointPosition, JointType, PoseFrame, utcnow
+from app.partitions import ensure_pose_partition, pose_partition_key
+from app.schemas import PoseStreamCreate
+
+# One hour of video at 30 fps; anything larger is almost certainly a client bug.
+MAX_POSE_FRAMES = 108_000
+
+# Column order of the last axis of PackedPoseStream.positions
+POSITION_FIELDS = ("x", "y", "z", "confidence")
+
+
+class PoseStreamError(ValueError):
+    """Raised when a pose stream payload fails validation."""
+
+
+class PackedPoseStream(NamedTuple):
+    timestamps: np.ndarray  # (frames,) float64
+    frame_numbers: np.ndarray  # (frames,) int64
+    joints: Tuple[JointType, ...]
+    positions: np.ndarray  # (frames, joints, 4) floats, NaN where missing
+
+    @property
+    def n_frames(self) -> int:
+        return int(self.timestamps.shape[0])
+
+
+def _column(values, n_frames: int, label: str) -> np.ndarray:
+    if values is None:
+        return np.full(n_frames, np.nan)
+    column = np.asarray(values, dtype=np.float64)  # None becomes NaN
+    if column.shape != (n_frames,):
+        raise PoseStreamError(
+            f"{label} has {column.shape[0]} values, expected {n_frames}"
+        )
+    return column
+
+
+def pack_pose_stream(stream: PoseStreamCreate) -> PackedPoseStream:
+    """Validate a columnar pose payload and pack it into NumPy arrays.
+
+    All checks are vectorized over whole columns, so validation cost does not
+    grow with a Python loop per frame.
+    """
+    timestamps = np.asarray(stream.timestamps, dtype=np.float64)
+    n_frames = timestamps.shape[0]
+    if n_frames == 0:
+        raise PoseStreamError("Pose stream has no frames")
+    if n_frames > MAX_POSE_FRAMES:
+        raise PoseStreamError(f"Pose stream exceeds {MAX_POSE_FRAMES} frames")
+    if not stream.joints:
+        raise PoseStreamError("Pose stream has no joints")
+    if not np.isfinite(timestamps).all() or timestamps[0] < 0:
+        raise PoseStreamError("timestamps must be finite and non-negative")
+    if (np.diff(timestamps) <= 0).any():
+        raise PoseStreamError("timestamps must be strictly increasing")
+
+    if stream.frame_numbers is None:
+        frame_numbers = np.arange(n_frames, dtype=np.int64)
+    else:
+        frame_numbers = np.asarray(stream.frame_numbers, dtype=np.int64)
+        if frame_numbers.shape != (n_frames,):
+            raise PoseStreamError("frame_numbers must match timestamps in length")
+        if frame_numbers[0] < 0 or (np.diff(frame_numbers) <= 0).any():
+            raise PoseStreamError(
+                "frame_numbers must be non-negative and strictly increasing"
+            )
+
+    joints = tuple(stream.joints)
+    positions = np.empty((n_frames, len(joints), 4), dtype=np.float64)
+    for j, joint in enumerate(joints):
+        series = stream.joints[joint]
+        for k, field in enumerate(POSITION_FIELDS):
+            positions[:, j, k] = _column(
+                getattr(series, field), n_frames, f"{joint.value}.{field}"
+            )
+
+    if not np.isfinite(positions[:, :, :2]).all():
+        raise PoseStreamError("x and y must be finite for every joint and frame")
+    if np.isinf(positions[:, :, 2:]).any():
+        raise PoseStreamError("z and confidence must be finite or null")
+    confidence = positions[:, :, 3]
+    if ((confidence < 0) | (confidence > 1)).any():  # NaN compares False
+        raise PoseStreamError("confidence must be between 0 and 1")
+
+    return PackedPoseStream(timestamps, frame_numbers, joints, positions)
+
+
+def _nullable(column: np.ndarray) -> list:
+    values = column.astype(object)
+    values[np.isnan(column)] = None
+    return values.tolist()
+
+
+class PoseRows(NamedTuple):
+    """A packed stream laid out as PoseFrame/JointPosition rows, except for
+    what only the database knows (frame ids, the set's created_at)."""
+
+    n_frames: int
+    n_joints: int
+    frame_rows: list  # dicts: timestamp, frame_number
+    # Dicts for an executemany, their frame_id still the frame's index; with
+    # copy, columns (frame index, joint name, x, y, z, confidence) instead
+    joint_rows: list
+    copy: bool
+
+
+def uses_copy(db) -> bool:
+    """Whether ``db`` writes joint rows with COPY (psycopg2 only)."""
+    return isinstance(db, Session) and db.get_bind().dialect.driver == "psycopg2"
+
+
+def pose_rows(packed: PackedPoseStream, copy: bool = False) -> PoseRows:
+    """Build the rows insert_pose_rows writes for ``packed``.
+
+    This is the CPU-bound half of an insert, kept apart so async handlers
+    can run it in the threadpool rather than on the event loop.
+    """
+    n_joints = len(packed.joints)
+    frame_rows = [
+        {"timestamp": timestamp, "frame_number": frame_number}
+        for timestamp, frame_number in zip(
+            packed.timestamps.tolist(), packed.frame_numbers.tolist()
+        )
+    ]
+    flat = packed.positions.reshape(-1, 4)
+    frame_index = np.repeat(np.arange(packed.n_frames), n_joints).tolist()
+    joint_column = list(packed.joints) * packed.n_frames
+    columns = (
+        flat[:, 0].tolist(),
+        flat[:, 1].tolist(),
+        _nullable(flat[:, 2]),
+        _nullable(flat[:, 3]),
+    )
+    if copy:
+        # SQLAlchemy's Enum type persists enum member names
+        joint_names = [joint.name for joint in joint_column]
+        joint_rows = [frame_index, joint_names, *columns]
+    else:
+        joint_rows = [
+            {
+                "frame_id": frame,
+                "joint_type": joint_type,
+                "x": x,
+                "y": y,
+                "z": z,
+                "confidence": confidence,
+            }
+            for frame, joint_type, x, y, z, confidence in zip(
+                frame_index, joint_column, *columns
+            )
+        ]
+    return PoseRows(packed.n_frames, n_joints, frame_rows, joint_rows, copy)
+
+
+def _copy_joint_positions(db: Session, columns, created_at: datetime) -> None:
+    """Stream joint rows into PostgreSQL with COPY instead of INSERT."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(zip(*columns, repeat(created_at.isoformat())))
+    buffer.seek(0)
+    dbapi_connection = db.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            "COPY joint_positions "
+            "(frame_id, joint_type, x, y, z, confidence, created_at) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def insert_pose_rows(
+    db: Session, exercise_set_id: int, rows: PoseRows
+) -> Tuple[int, int]:
+    """Bulk insert rows from pose_rows().
+
+    Frames go in as one multi-row INSERT ... RETURNING so their ids can be fanned
+    out to the joint rows; joint rows go in as one executemany (or COPY on
+    PostgreSQL). The caller owns the transaction.
+    """
+    # Every row of the set goes in under the set's created_at: one partition
+    created_at = pose_partition_key(db, exercise_set_id) or utcnow()
+    ensure_pose_partition(db, created_at)
+    for row in rows.frame_rows:
+        row["exercise_set_id"] = exercise_set_id
+        row["created_at"] = created_at
+    frame_ids = (
+        db.execute(
+            insert(PoseFrame).returning(PoseFrame.id, sort_by_parameter_order=True),
+            rows.frame_rows,
+        )
+        .scalars()
+        .all()
+    )
+
+    if rows.copy:
+        frame_index, *columns = rows.joint_rows
+        frame_id_column = [frame_ids[frame] for frame in frame_index]
+        _copy_joint_positions(db, (frame_id_column, *columns), created_at)
+    else:
+        for row in rows.joint_rows:
+            row["frame_id"] = frame_ids[row["frame_id"]]
+            row["created_at"] = created_at
+        db.execute(insert(JointPosition.__table__), rows.joint_rows)
+
+    return rows.n_frames, rows.n_frames * rows.n_joints
+
+
+def insert_pose_stream(
+    db: Session, exercise_set_id: int, packed: PackedPoseStream
+) -> Tuple[int, int]:
+    """Bulk insert a packed stream as PoseFrame/JointPosition rows; see
+    insert_pose_rows. The caller owns the transaction."""
+    return insert_pose_rows(db, exercise_set_id, pose_rows(packed, uses_copy(db)))
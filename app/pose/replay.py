@@ -0,0 +1,69 @@
+# physiobuddy-backend/app/pose/replay.py
+"""Downsampling of stored pose streams for playback on a client.
+
+Both methods pick whole frames, so every returned sample is a real frame
+with all its joints; they differ in which frames. "nth" keeps every Nth
+frame. "lttb" (largest-triangle-three-buckets) keeps the frames that best
+preserve the shape of the elbow angle over time, so the turning points of
+each rep survive even at a few points per second.
+"""
+
+import numpy as np
+
+from app.pose.ingest import PackedPoseStream
+
+
+def take_frames(packed: PackedPoseStream, index: np.ndarray) -> PackedPoseStream:
+    return packed._replace(
+        timestamps=packed.timestamps[index],
+        frame_numbers=packed.frame_numbers[index],
+        positions=packed.positions[index],
+    )
+
+
+def every_nth(packed: PackedPoseStream, n: int) -> PackedPoseStream:
+    if n <= 1:
+        return packed
+    return take_frames(packed, np.arange(0, packed.n_frames, n))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indexes of ``n_out`` points of the series (x, y) chosen by LTTB.
+
+    The first and last points are always kept; between them the series is
+    split into ``n_out - 2`` buckets and each keeps the point forming the
+    largest triangle with the point kept before it and the mean of the next
+    bucket. One pass over the buckets, vectorized within each.
+    """
+    n = x.shape[0]
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        if bucket + 2 < edges.shape[0]:
+            next_lo, next_hi = hi, max(edges[bucket + 2], hi + 1)
+        else:
+            next_lo, next_hi = n - 1, n
+        mean_x = x[next_lo:next_hi].mean()
+        mean_y = y[next_lo:next_hi].mean()
+        # Twice the triangle area; the constant factor does not change argmax
+        area = np.abs(
+            (x[a] - mean_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+
+def lttb(
+    packed: PackedPoseStream, values: np.ndarray, max_frames: int
+) -> PackedPoseStream:
+    """At most ``max_frames`` frames chosen by LTTB on ``values`` (one per
+    frame) against time."""
+    return take_frames(
+        packed, lttb_indices(packed.timestamps.astype(np.float64), values, max_frames)
+    )
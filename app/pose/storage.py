@@ -0,0 +1,167 @@
+# physiobuddy-backend/app/pose/storage.py
+"""Storage-backend dispatch for pose streams.
+
+Two backends are supported side by side: "rows" writes one PoseFrame per frame
+and one JointPosition per joint, "blob" writes a single PoseBlob per set. Both
+read back into the same PackedPoseStream shape.
+"""
+
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from sqlalchemy import String, and_, exists, select, type_coerce
+from sqlalchemy.orm import Session
+
+from app.models import JointPosition, JointType, PoseBlob, PoseFrame
+from app.partitions import pose_partition_key
+from app.pose.blob import encode_pose_blob, read_pose_blob, write_pose_blob
+from app.pose.ingest import (
+    PackedPoseStream,
+    PoseRows,
+    insert_pose_rows,
+    pose_rows,
+    uses_copy,
+)
+
+POSE_STORAGE_BACKENDS = ("rows", "blob")
+
+
+class PreparedPoseStream(NamedTuple):
+    packed: PackedPoseStream
+    storage: str
+    encoded: Union[PoseRows, bytes]  # rows, or the blob
+
+
+def prepare_pose_stream(
+    packed: PackedPoseStream, storage: str, copy: bool = False
+) -> PreparedPoseStream:
+    """Encode ``packed`` for the chosen backend: the CPU-bound half of
+    store_pose_stream, for async handlers to run in the threadpool."""
+    if storage == "blob":
+        return PreparedPoseStream(packed, storage, encode_pose_blob(packed))
+    return PreparedPoseStream(packed, storage, pose_rows(packed, copy))
+
+
+def write_pose_stream(
+    db: Session, exercise_set_id: int, prepared: PreparedPoseStream
+) -> Tuple[int, int]:
+    """Persist a prepared stream; returns (frames, joint samples)."""
+    if prepared.storage == "blob":
+        packed = prepared.packed
+        write_pose_blob(db, exercise_set_id, packed, prepared.encoded)
+        return packed.n_frames, packed.n_frames * len(packed.joints)
+    return insert_pose_rows(db, exercise_set_id, prepared.encoded)
+
+
+def store_pose_stream(
+    db: Session, exercise_set_id: int, packed: PackedPoseStream, storage: str
+) -> Tuple[int, int]:
+    """Persist ``packed`` with the chosen backend; returns (frames, joint samples)."""
+    prepared = prepare_pose_stream(packed, storage, uses_copy(db))
+    return write_pose_stream(db, exercise_set_id, prepared)
+
+
+def read_pose_rows(
+    db: Session,
+    exercise_set_id: int,
+    start_frame: Optional[int] = None,
+    end_frame: Optional[int] = None,
+    joints: Optional[Sequence[JointType]] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+) -> Optional[PackedPoseStream]:
+    """Read frames with ``start_frame <= frame_number < end_frame`` and
+    ``start_time <= timestamp < end_time`` from the row tables in a single
+    joined query and pivot them into arrays.
+
+    The frames come from one range scan of ix_pose_frames_set_frame; the time
+    bounds filter within it, as timestamps increase with frame numbers. Both
+    tables are pinned to the set's partition key, so partitioned tables are
+    pruned to one partition when the query is planned.
+    """
+    partition_key = pose_partition_key(db, exercise_set_id)
+    query = (
+        select(
+            PoseFrame.frame_number,
+            PoseFrame.timestamp,
+            # Stored enum names; skips building an enum member per row
+            type_coerce(JointPosition.joint_type, String),
+            JointPosition.x,
+            JointPosition.y,
+            JointPosition.z,
+            JointPosition.confidence,
+        )
+        .join(
+            JointPosition,
+            and_(
+                JointPosition.frame_id == PoseFrame.id,
+                JointPosition.created_at == PoseFrame.created_at,
+            ),
+        )
+        .where(PoseFrame.exercise_set_id == exercise_set_id)
+        .order_by(PoseFrame.frame_number)
+    )
+    if partition_key is not None:
+        query = query.where(
+            PoseFrame.created_at == partition_key,
+            JointPosition.created_at == partition_key,
+        )
+    if start_frame is not None:
+        query = query.where(PoseFrame.frame_number >= start_frame)
+    if end_frame is not None:
+        query = query.where(PoseFrame.frame_number < end_frame)
+    if start_time is not None:
+        query = query.where(PoseFrame.timestamp >= start_time)
+    if end_time is not None:
+        query = query.where(PoseFrame.timestamp < end_time)
+    if joints is not None:
+        query = query.where(JointPosition.joint_type.in_(list(joints)))
+
+    # Core execution: plain rows without the ORM's per-row overhead
+    rows = db.connection().execute(query).all()
+    if not rows:
+        return None
+    frame_numbers, timestamps, joint_types, *coords = zip(*rows)
+
+    unique_frames, frame_index = np.unique(
+        np.asarray(frame_numbers, dtype=np.int64), return_inverse=True
+    )
+    present = set(joint_types)
+    stored_joints = tuple(joint for joint in JointType if joint.name in present)
+    joint_lookup = {joint.name: j for j, joint in enumerate(stored_joints)}
+    joint_index = np.fromiter(
+        (joint_lookup[joint] for joint in joint_types), dtype=np.intp, count=len(rows)
+    )
+
+    positions = np.full((len(unique_frames), len(stored_joints), 4), np.nan)
+    positions[frame_index, joint_index] = np.array(coords, dtype=np.float64).T
+    frame_timestamps = np.empty(len(unique_frames))
+    frame_timestamps[frame_index] = timestamps
+
+    return PackedPoseStream(frame_timestamps, unique_frames, stored_joints, positions)
+
+
+def read_pose_stream(
+    db: Session,
+    exercise_set_id: int,
+    start_frame: Optional[int] = None,
+    end_frame: Optional[int] = None,
+    joints: Optional[Sequence[JointType]] = None,
+    storage: Optional[str] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+) -> Optional[PackedPoseStream]:
+    """Read a set's pose stream from whichever backend holds it.
+
+    Pass ``storage`` to force a backend; otherwise a stored blob wins over rows.
+    Frame and time bounds are half-open and can be combined.
+    """
+    if storage is None:
+        has_blob = db.execute(
+            select(exists().where(PoseBlob.exercise_set_id == exercise_set_id))
+        ).scalar()
+        storage = "blob" if has_blob else "rows"
+    reader = read_pose_blob if storage == "blob" else read_pose_rows
+    return reader(
+        db, exercise_set_id, start_frame, end_frame, joints, start_time, end_time
+    )
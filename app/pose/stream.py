@@ -0,0 +1,212 @@
+# physiobuddy-backend/app/pose/stream.py
+"""Live pose ingestion: frames arrive over a WebSocket in small chunks and
+are written in batches.
+
+The receive loop validates each chunk, updates the live rep count and
+buffers frames; full (or old enough) buffers go on a bounded queue that a
+single writer task drains into storage. When the writer falls behind and
+the queue is full the receive loop waits on it, so the client is slowed
+down by TCP flow control instead of the server buffering without limit.
+"""
+
+import asyncio
+import logging
+from time import monotonic
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+from pydantic import ValidationError
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.pose.analytics import ANGLE_JOINTS, RepCounter
+from app.pose.ingest import PackedPoseStream, PoseStreamError, pack_pose_stream
+from app.schemas import PoseStreamCreate
+
+logger = logging.getLogger(__name__)
+
+
+def concat_packed(chunks: List[PackedPoseStream]) -> PackedPoseStream:
+    """Join chunks with the same joints into one stream."""
+    if len(chunks) == 1:
+        return chunks[0]
+    return PackedPoseStream(
+        np.concatenate([chunk.timestamps for chunk in chunks]),
+        np.concatenate([chunk.frame_numbers for chunk in chunks]),
+        chunks[0].joints,
+        np.concatenate([chunk.positions for chunk in chunks]),
+    )
+
+
+class PoseStreamBuffer:
+    """Validates that chunks continue the stream and holds them until flushed."""
+
+    def __init__(self):
+        self.joints = None
+        self.frames_received = 0
+        self.n_buffered = 0
+        self.buffered_since: Optional[float] = None
+        self._chunks: List[PackedPoseStream] = []
+        self._last_timestamp = -np.inf
+        self._last_frame_number = -1
+
+    def add(self, packed: PackedPoseStream) -> PackedPoseStream:
+        """Buffer a chunk and return it, renumbered if the client sent no
+        frame numbers."""
+        if self.joints is None:
+            self.joints = packed.joints
+        elif set(packed.joints) != set(self.joints):
+            raise PoseStreamError("Every chunk must carry the same joints")
+        elif packed.joints != self.joints:
+            order = [packed.joints.index(joint) for joint in self.joints]
+            packed = packed._replace(
+                joints=self.joints, positions=packed.positions[:, order]
+            )
+        if packed.timestamps[0] <= self._last_timestamp:
+            raise PoseStreamError("timestamps must increase across chunks")
+        if packed.frame_numbers[0] <= self._last_frame_number:
+            raise PoseStreamError("frame_numbers must increase across chunks")
+
+        self._last_timestamp = packed.timestamps[-1]
+        self._last_frame_number = int(packed.frame_numbers[-1])
+        self.frames_received += packed.n_frames
+        self.n_buffered += packed.n_frames
+        if self.buffered_since is None:
+            self.buffered_since = monotonic()
+        self._chunks.append(packed)
+        return packed
+
+    def take(self) -> Optional[PackedPoseStream]:
+        """Everything buffered as one stream, or None if empty."""
+        if not self._chunks:
+            return None
+        packed = concat_packed(self._chunks)
+        self._chunks = []
+        self.n_buffered = 0
+        self.buffered_since = None
+        return packed
+
+
+def parse_chunk(message: dict, frames_received: int) -> PackedPoseStream:
+    packed = pack_pose_stream(PoseStreamCreate.model_validate(message))
+    if message.get("frame_numbers") is None:
+        # Default numbering continues from the previous chunk
+        packed = packed._replace(frame_numbers=packed.frame_numbers + frames_received)
+    return packed
+
+
+async def run_pose_stream(
+    websocket: WebSocket,
+    store: Callable[[PackedPoseStream], Awaitable[int]],
+    batch_frames: int,
+    batch_seconds: float,
+    max_pending_batches: int,
+) -> dict:
+    """Serve an accepted pose stream WebSocket until the client ends it.
+
+    Each client message is a PoseStreamCreate-shaped chunk; ``{"end": true}``
+    finishes the stream. The server answers a chunk with
+    ``{"type": "reps", ...}`` whenever the rep count changes, ``{"type":
+    "error", "detail": ...}`` if the chunk is rejected (the stream goes on)
+    and ``{"type": "done", ...}`` once everything is stored. A binary frame
+    closes the stream with 1003, after storing what came before it. ``store`` must
+    persist a batch off the event loop and return the frames written.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending_batches)
+    buffer = PoseStreamBuffer()
+    counter = RepCounter()
+    stored = 0
+    failure: Optional[BaseException] = None
+
+    async def writer():
+        nonlocal stored, failure
+        while (batch := await queue.get()) is not None:
+            if failure is None:
+                try:
+                    stored += await store(batch)
+                except Exception as e:
+                    # Keep draining so the receive loop never blocks on a
+                    # dead writer; it reports the failure
+                    failure = e
+
+    async def flush():
+        batch = buffer.take()
+        if batch is not None:
+            await queue.put(batch)  # waits here while the writer is behind
+
+    writer_task = asyncio.create_task(writer())
+    ended = binary = False
+    try:
+        while failure is None:
+            timeout = None
+            if buffer.buffered_since is not None:
+                timeout = max(buffer.buffered_since + batch_seconds - monotonic(), 0)
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout)
+            except asyncio.TimeoutError:
+                await flush()
+                continue
+            except WebSocketDisconnect:
+                break
+            except KeyError:
+                # A binary frame: the protocol is JSON text only
+                binary = True
+                break
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json(
+                    {"type": "error", "detail": "Expected a JSON object"}
+                )
+                continue
+            if message.get("end"):
+                ended = True
+                break
+
+            try:
+                packed = buffer.add(parse_chunk(message, buffer.frames_received))
+            except (ValidationError, PoseStreamError) as e:
+                detail = e.errors()[0]["msg"] if isinstance(e, ValidationError) else e
+                await websocket.send_json({"type": "error", "detail": str(detail)})
+                continue
+
+            if set(ANGLE_JOINTS) <= set(packed.joints):
+                reps_before = counter.reps
+                columns = [
+                    packed.positions[:, packed.joints.index(j), :] for j in ANGLE_JOINTS
+                ]
+                counter.update(packed.timestamps, *columns)
+                if counter.reps != reps_before:
+                    await websocket.send_json(
+                        {
+                            "type": "reps",
+                            "reps": counter.reps,
+                            "frames_received": buffer.frames_received,
+                            "frames_stored": stored,
+                        }
+                    )
+            if buffer.n_buffered >= batch_frames:
+                await flush()
+
+        # Whatever arrived before an end or disconnect is still stored
+        await flush()
+        await queue.put(None)
+        await writer_task
+    finally:
+        writer_task.cancel()
+
+    result = {
+        "frames_received": buffer.frames_received,
+        "frames_stored": stored,
+        "reps": counter.reps,
+    }
+    if failure is not None:
+        logger.error("pose stream write failed", exc_info=failure)
+        await websocket.send_json({"type": "error", "detail": "Failed to store frames"})
+        await websocket.close(code=1011)
+    elif binary:
+        await websocket.close(code=1003, reason="Expected JSON text frames")
+    elif ended:
+        await websocket.send_json({"type": "done", **result})
+        await websocket.close()
+    return result
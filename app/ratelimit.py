@@ -0,0 +1,209 @@
+# physiobuddy-backend/app/ratelimit.py
+"""Per-route rate limits, counted per user or client IP.
+
+Budgets come from ``settings.rate_limits``, keyed by method and route
+template ("POST /auth/token"); RateLimitMiddleware enforces them.
+Authenticated requests are counted per user (the token is verified without
+the database, as get_current_user does), others per client IP.
+
+Two engines behind one ``acquire()``:
+
+- TokenBucketLimiter keeps a bucket per (route, caller) in the worker
+  process. It is only touched from the event loop, so it needs no lock and
+  cannot become a contention point; each worker allows the full budget.
+- SlidingWindowLimiter counts in a shared store (app.kvstore), so the budget
+  holds across workers. Each (route, caller, window) is a counter of its
+  own, bumped with an atomic INCR, so callers never contend on one key and
+  keys spread over a Redis cluster's slots.
+"""
+
+import math
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute
+
+from config import Settings
+from app.auth.auth import AuthCaches, token_user_id
+from app.kvstore import RedisStore
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0}
+
+
+class Rate(NamedTuple):
+    count: int
+    period: float  # seconds
+
+
+def parse_rate(spec: str) -> Rate:
+    """``"10/minute"`` or ``"10/60"`` (seconds) as a Rate."""
+    count, _, period = spec.partition("/")
+    try:
+        rate = Rate(int(count), PERIODS.get(period.strip()) or float(period))
+    except ValueError:
+        raise ValueError(f"Invalid rate {spec!r}, expected e.g. '10/minute'")
+    if rate.count < 1 or rate.period <= 0:
+        raise ValueError(f"Invalid rate {spec!r}, count and period must be > 0")
+    return rate
+
+
+class TokenBucketLimiter:
+    """In-process token buckets: ``rate.count`` requests in a burst, refilled
+    at ``rate.count`` per ``rate.period``.
+
+    Holds at most ``max_keys`` buckets; beyond that, full ones (which are
+    the same as no bucket) are dropped, then the oldest.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [tokens, updated at, capacity, refill per second]
+        self._buckets: Dict[str, list] = {}
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        """Take a token; 0.0 if there was one, else seconds until there is."""
+        now = time.monotonic()
+        per_second = rate.count / rate.period
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            bucket = self._buckets[key] = [
+                float(rate.count),
+                now,
+                rate.count,
+                per_second,
+            ]
+        else:
+            bucket[0] = min(rate.count, bucket[0] + (now - bucket[1]) * per_second)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / per_second
+
+    def _evict(self, now: float) -> None:
+        for key, (tokens, updated_at, capacity, per_second) in list(
+            self._buckets.items()
+        ):
+            if tokens + (now - updated_at) * per_second >= capacity:
+                del self._buckets[key]
+        while len(self._buckets) >= self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counters in a shared store.
+
+    The count over the last ``rate.period`` is estimated from the current
+    fixed window's counter plus the previous one's, weighted by how much of
+    it still overlaps. Rejected requests are taken back off the counter.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        now = time.time()
+        window, elapsed = divmod(now, rate.period)
+        window = int(window)
+        current = await self.store.incr(f"rl:{key}:{window}", 1, 2 * rate.period)
+        previous = int(await self.store.get(f"rl:{key}:{window - 1}") or 0)
+        overlap = 1.0 - elapsed / rate.period
+        if previous * overlap + current <= rate.count:
+            return 0.0
+        await self.store.incr(f"rl:{key}:{window}", -1, 2 * rate.period)
+        if current > rate.count:
+            # Full on its own; the next window starts with this one as its
+            # previous, so that is the earliest chance
+            return rate.period - elapsed
+        # Wait until enough of the previous window has slid out
+        needed = 1.0 - (rate.count - current) / previous
+        return max(needed * rate.period - elapsed, 0.0)
+
+
+class RateLimits:
+    """The parsed budgets of a Settings and the engine enforcing them."""
+
+    def __init__(self, config: Settings):
+        self.rates: Dict[Tuple[str, str], Rate] = {}
+        for route, spec in config.rate_limits.items():
+            method, _, path = route.partition(" ")
+            self.rates[method.upper(), path] = parse_rate(spec)
+        if config.rate_limit_backend == "redis":
+            self.limiter = SlidingWindowLimiter(RedisStore.from_url(config.redis_url))
+        else:
+            self.limiter = TokenBucketLimiter(config.rate_limit_max_keys)
+
+    def bind(self, routes) -> Dict[str, List[Tuple[BaseRoute, Rate]]]:
+        """The budgeted routes among ``routes``, by method."""
+        budgets: Dict[str, List[Tuple[BaseRoute, Rate]]] = {}
+        for (method, path), rate in self.rates.items():
+            for route in routes:
+                if getattr(route, "path", None) == path and method in getattr(
+                    route, "methods", ()
+                ):
+                    budgets.setdefault(method, []).append((route, rate))
+                    break
+            else:
+                raise ValueError(f"Rate limit for unknown route {method} {path}")
+        return budgets
+
+
+def caller_key(scope, caches: AuthCaches) -> str:
+    """``user:<id>`` for a request with a valid bearer token, else
+    ``ip:<client address>``."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                user_id = token_user_id(token, caches)
+                if user_id is not None:
+                    return f"user:{user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """Answers 429 to requests over their route's budget.
+
+    Plain ASGI, like MetricsMiddleware: a dependency would cost FastAPI's
+    dependency resolution on every request (about 25 us, see
+    benchmarks/bench_ratelimit.py). It matches the request against the
+    budgeted routes for its method only, so a request with none costs a
+    dict lookup. ``routes`` is the app's route list, resolved when the
+    middleware stack is built, after the routers are included; tokens are
+    verified through the app's ``auth_caches``.
+    """
+
+    def __init__(self, app, limits: RateLimits, routes, auth_caches: AuthCaches):
+        self.app = app
+        self.limiter = limits.limiter
+        self.budgets = limits.bind(routes)
+        self.auth_caches = auth_caches
+
+    async def __call__(self, scope, receive, send):
+        budgets = self.budgets.get(scope["method"]) if scope["type"] == "http" else None
+        if budgets:
+            # Relative to the mount point, as the router matches it
+            path = scope["path"].removeprefix(scope.get("root_path", ""))
+            for route, rate in budgets:
+                if route.path_regex.match(path):
+                    key = f"{scope['method']} {route.path}|{caller_key(scope, self.auth_caches)}"
+                    retry_after = await self.limiter.acquire(key, rate)
+                    if retry_after:
+                        # For the metrics' route label
+                        scope["route"] = route
+                        response = JSONResponse(
+                            {"detail": "Too many requests, please retry later"},
+                            status_code=429,
+                            headers={
+                                "Retry-After": str(max(math.ceil(retry_after), 1))
+                            },
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
@@ -0,0 +1,46 @@
+# physiobuddy-backend/app/rebuild.py
+"""Offline backfill of derived tables.
+
+Usage:
+    python -m app.rebuild {personal-bests,progress,streaks} [--user-id ID ...]
+"""
+
+import argparse
+
+from app.crud import (
+    rebuild_exercise_progress,
+    rebuild_personal_bests,
+    rebuild_user_streaks,
+)
+from app.database import SessionLocal
+
+REBUILDERS = {
+    "personal-bests": rebuild_personal_bests,
+    "progress": rebuild_exercise_progress,
+    "streaks": rebuild_user_streaks,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute derived tables.")
+    parser.add_argument("table", choices=sorted(REBUILDERS))
+    parser.add_argument(
+        "--user-id",
+        dest="user_ids",
+        type=int,
+        action="append",
+        help="Only rebuild these users (repeatable); default is everyone.",
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        rows = REBUILDERS[args.table](db, args.user_ids)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {args.table}: {rows} rows written.")
+
+
+if __name__ == "__main__":
+    main()
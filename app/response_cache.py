@@ -0,0 +1,158 @@
+# physiobuddy-backend/app/response_cache.py
+"""Per-user cache of serialized GET responses, with conditional GET support.
+
+Entries are keyed by user, a per-user version and the request URL. A write
+invalidates everything cached for its user by bumping the version, so no
+key listing is needed and the scheme works the same on every store. The
+version is the write's timestamp, which doubles as Last-Modified (rounded
+up to whole seconds, the header's resolution). A version in the same second
+as the one before it is marked with a trailing "*": their Last-Modified is
+the same, so If-Modified-Since is not trusted for it. Read replica routing
+checks the version's age to send the reads of a user who has just written
+to the primary. Each app has a cache of its own, built from its settings by
+create_app.
+"""
+
+import hashlib
+import time
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from starlette.requests import HTTPConnection
+
+from config import Settings
+from app.kvstore import MemoryStore, RedisStore
+
+
+class ResponseCache:
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def _version(self, user_id: int) -> Tuple[int, bool]:
+        """The user's version, and whether its Last-Modified is its own."""
+        key = f"rc:{user_id}:version"
+        version = await self.store.get(key)
+        if version is None:
+            # First request, or the version was evicted: start a new one so
+            # entries from before the eviction can never be served
+            version = str(time.time_ns()).encode()
+            await self.store.set(key, version, self.ttl)
+        return int(version.rstrip(b"*")), not version.endswith(b"*")
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop every cached response for the user, who has just written."""
+        key = f"rc:{user_id}:version"
+        version = time.time_ns()
+        previous = await self.store.get(key)
+        shares_second = False
+        if previous is not None:
+            previous = int(previous.rstrip(b"*"))
+            # Strictly newer, even where the clock is coarse
+            version = max(version, previous + 1)
+            shares_second = _seconds(previous) == _seconds(version)
+        await self.store.set(
+            key, f"{version}{'*' if shares_second else ''}".encode(), self.ttl
+        )
+
+    async def wrote_recently(self, user_id: int, seconds: float) -> bool:
+        """Whether the user wrote within the last ``seconds``. A version
+        started by a read after an eviction counts too, which errs on the
+        safe side."""
+        version = await self.store.get(f"rc:{user_id}:version")
+        if version is None:
+            return False
+        return time.time_ns() - int(version.rstrip(b"*")) < seconds * 10**9
+
+    async def respond(
+        self,
+        request: Request,
+        user_id: int,
+        compute: Callable[[], Awaitable[Any]],
+        response_type: Any,
+    ) -> Response:
+        """The cached response for this request, else ``await compute()``
+        serialized as ``response_type`` and cached.
+
+        Answers 304 when the client's If-None-Match / If-Modified-Since
+        still match, without touching the database on a hit.
+        """
+        version, own_last_modified = await self._version(user_id)
+        key = f"rc:{user_id}:{version}:{request.url.path}?{request.url.query}"
+        entry = await self.store.get(key)
+        if entry is None:
+            self.misses += 1
+            adapter = TypeAdapter(response_type)
+            data = adapter.validate_python(await compute(), from_attributes=True)
+            body = adapter.dump_json(data)
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            entry = etag.encode() + b"\n" + body
+            await self.store.set(key, entry, self.ttl)
+        else:
+            self.hits += 1
+            etag, body = entry.split(b"\n", 1)
+            etag = etag.decode()
+
+        last_modified = datetime.fromtimestamp(_seconds(version), tz=timezone.utc)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            # Clients may keep the response but must revalidate it
+            "Cache-Control": "private, no-cache",
+        }
+        if _not_modified(request, etag, last_modified if own_last_modified else None):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+def _seconds(version: int) -> int:
+    """A version's timestamp rounded up to whole seconds, so that it is never
+    earlier than the version itself."""
+    return -(-version // 10**9)
+
+
+def _not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def make_store(config: Settings):
+    if config.response_cache_backend == "redis":
+        return RedisStore.from_url(config.redis_url)
+    return MemoryStore(config.response_cache_size, config.response_cache_ttl_seconds)
+
+
+def make_response_cache(config: Settings) -> ResponseCache:
+    return ResponseCache(make_store(config), config.response_cache_ttl_seconds)
+
+
+def app_response_cache(connection: HTTPConnection) -> ResponseCache:
+    """The ResponseCache of the app serving ``connection``."""
+    return connection.app.state.response_cache
@@ -33,124 +33,986 @@
 #     )
 
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from app.database import get_db
-from app.models import User, WorkoutSession, ExerciseSet, PersonalBest
+from config import Settings
+from app.database import AnySession, get_db, run_db, sync_bind
+from app.models import (
+    ArmType,
+    ExerciseProgress,
+    ExerciseSet,
+    ExerciseType,
+    JointType,
+    PersonalBest,
+    PoseBlob,
+    PoseFrame,
+    UserStreak,
+    WorkoutSession,
+)
 from app.schemas import (
     WorkoutSessionCreate,
     WorkoutSessionResponse,
+    WorkoutSessionPage,
+    WorkoutSessionHistoryPage,
     ExerciseSetCreate,
     ExerciseSetResponse,
     PersonalBestResponse,
+    ExerciseProgressResponse,
+    UserStreakResponse,
+    PoseStreamCreate,
+    PoseStreamIngestResponse,
+    PoseReplayResponse,
+)
+from app.response_cache import ResponseCache, app_response_cache
+from app.export import (
+    EXPORT_FORMATS,
+    ExportFormatUnavailable,
+    check_export_format,
+    export_history,
+)
+from app.jobs import enqueue
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.auth.auth import (
+    AuthCaches,
+    Principal,
+    auth_caches,
+    get_current_reader,
+    get_current_user,
+    get_read_db,
+    principal_for_token,
+)
+from app.crud import (
+    add_session_duration,
+    group_by_kind,
+    local_day,
+    update_exercise_progress,
+    update_form_score,
+    update_personal_best,
+    update_streak,
+    week_start,
+)
+from app.partitions import past_retention
+from app.pose.analytics import (
+    ANGLE_JOINTS,
+    METRIC_COLUMNS,
+    compute_set_metrics,
+    stream_angles,
+)
+from app.pose.blob import encode_pose_blob, select_joints
+from app.pose.ingest import (
+    POSITION_FIELDS,
+    PackedPoseStream,
+    PoseRows,
+    PoseStreamError,
+    insert_pose_rows,
+    pack_pose_stream,
+    pose_rows,
+    uses_copy,
 )
-from app.auth.auth import get_current_user
+from app.pose.storage import (
+    PreparedPoseStream,
+    prepare_pose_stream,
+    read_pose_stream,
+    write_pose_stream,
+)
+from app.pose.replay import every_nth, lttb
+from app.pose.stream import run_pose_stream
 
 router = APIRouter()
 
+# Handlers are async and hand their database work, written against a sync
+# Session, to run_db: with the async engine it runs on the event loop via
+# AsyncSession.run_sync, with the sync engine in the threadpool.
+#
+# Read-heavy GETs go through the app's response cache; every write here must
+# invalidate it for the user.
+#
+# Settings are the app's own (app_settings), not config.settings. With
+# derived_data == "queue", writes enqueue a job (app.jobs) in their
+# transaction instead of updating personal bests, progress and streaks
+# themselves.
 
-@router.post("/sessions", response_model=WorkoutSessionResponse)
-def create_workout_session(
-    session_data: WorkoutSessionCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+
+def app_settings(connection: HTTPConnection) -> Settings:
+    """The Settings of the app serving ``connection``."""
+    return connection.app.state.settings
+
+
+def queue_derived_data(connection: HTTPConnection) -> bool:
+    return connection.app.state.settings.derived_data == "queue"
+
+
+def get_timezone(name: Optional[str], default: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or default)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=422, detail=f"Unknown time zone: {name}")
+
+
+def get_owned_session(db: Session, session_id: int, user_id: int):
+    """Return the workout session if it belongs to the user."""
+    return (
+        db.query(WorkoutSession)
+        .filter(WorkoutSession.id == session_id, WorkoutSession.user_id == user_id)
+        .first()
+    )
+
+
+def get_owned_exercise_set(db: Session, exercise_set_id: int, user_id: int):
+    """Return the exercise set if it belongs to one of the user's sessions."""
+    return (
+        db.query(ExerciseSet)
+        .join(WorkoutSession, ExerciseSet.session_id == WorkoutSession.id)
+        .filter(ExerciseSet.id == exercise_set_id, WorkoutSession.user_id == user_id)
+        .first()
+    )
+
+
+def _create_workout_session(
+    db: Session, user_id: int, notes, tz: ZoneInfo, queued: bool
 ):
-    """Create a new workout session."""
-    db_session = WorkoutSession(user_id=current_user.id, notes=session_data.notes)
+    db_session = WorkoutSession(user_id=user_id, notes=notes)
     db.add(db_session)
+    db.flush()
+    if queued:
+        enqueue(db, "derived", user_id, f"session:{db_session.id}")
+    else:
+        update_streak(db, db_session, tz)
     db.commit()
     db.refresh(db_session)
     return db_session
 
 
-@router.get("/sessions", response_model=List[WorkoutSessionResponse])
-def get_user_sessions(
-    skip: int = 0,
-    limit: int = 10,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+@router.post("/sessions", response_model=WorkoutSessionResponse)
+async def create_workout_session(
+    session_data: WorkoutSessionCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    queued: bool = Depends(queue_derived_data),
+    config: Settings = Depends(app_settings),
+    cache: ResponseCache = Depends(app_response_cache),
 ):
-    """Get user's workout sessions."""
-    sessions = (
-        db.query(WorkoutSession)
-        .filter(WorkoutSession.user_id == current_user.id)
+    """Create a new workout session."""
+    tz = get_timezone(session_data.timezone, config.default_timezone)
+    db_session = await run_db(
+        db, _create_workout_session, current_user.id, session_data.notes, tz, queued
+    )
+    await cache.invalidate(current_user.id)
+    return db_session
+
+
+def sessions_query(db: Session, user_id: int, date_from=None, date_to=None):
+    """The user's sessions in (session_date, id) order, optionally limited to
+    session dates in [date_from, date_to]."""
+    query = db.query(WorkoutSession).filter(WorkoutSession.user_id == user_id)
+    if date_from is not None:
+        query = query.filter(WorkoutSession.session_date >= date_from)
+    if date_to is not None:
+        query = query.filter(WorkoutSession.session_date <= date_to)
+    return query
+
+
+def _get_user_sessions(
+    db: Session, user_id: int, skip: int, limit: int, date_from, date_to
+):
+    return (
+        sessions_query(db, user_id, date_from, date_to)
+        .order_by(WorkoutSession.session_date, WorkoutSession.id)
         .offset(skip)
         .limit(limit)
         .all()
     )
-    return sessions
 
 
-@router.post("/sessions/{session_id}/exercises", response_model=ExerciseSetResponse)
-def add_exercise_to_session(
-    session_id: int,
-    exercise_data: ExerciseSetCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+@router.get("/sessions", response_model=List[WorkoutSessionResponse])
+async def get_user_sessions(
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+    cache: ResponseCache = Depends(app_response_cache),
 ):
-    """Add an exercise set to a workout session."""
-    # Verify session belongs to current user
-    session = (
-        db.query(WorkoutSession)
-        .filter(
-            WorkoutSession.id == session_id, WorkoutSession.user_id == current_user.id
+    """Get user's workout sessions, oldest first.
+
+    Offset pagination gets slower with depth; prefer ``/sessions/page``.
+    """
+    return await cache.respond(
+        request,
+        current_user.id,
+        lambda: run_db(
+            db, _get_user_sessions, current_user.id, skip, limit, date_from, date_to
+        ),
+        List[WorkoutSessionResponse],
+    )
+
+
+def session_page(
+    db: Session,
+    user_id: int,
+    cursor: Optional[str],
+    limit: int,
+    order: str,
+    date_from=None,
+    date_to=None,
+    options=(),
+):
+    """A keyset page of the user's sessions and the cursor for the next one.
+
+    ``options`` are loader options (e.g. eager loads) for the sessions query.
+    """
+    query = sessions_query(db, user_id, date_from, date_to).options(*options)
+    key = tuple_(WorkoutSession.session_date, WorkoutSession.id)
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(key > after if order == "asc" else key < after)
+    if order == "asc":
+        query = query.order_by(WorkoutSession.session_date, WorkoutSession.id)
+    else:
+        query = query.order_by(
+            WorkoutSession.session_date.desc(), WorkoutSession.id.desc()
         )
-        .first()
+    # One extra row tells us whether there is a next page
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.session_date, last.id)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/sessions/page", response_model=WorkoutSessionPage)
+async def get_user_session_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    order: Literal["asc", "desc"] = "asc",
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+):
+    """Get a page of the user's workout sessions, ordered by session date.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page,
+    with the same ``order``, ``from`` and ``to``.
+    """
+    return await run_db(
+        db,
+        session_page,
+        current_user.id,
+        cursor,
+        limit,
+        order,
+        date_from,
+        date_to,
+    )
+
+
+# Exercise set fields a history request may project to; id is always sent
+EXERCISE_SET_FIELDS = tuple(ExerciseSetResponse.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(EXERCISE_SET_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown exercise fields: {', '.join(unknown)}"
+        )
+    return ["id"] + [name for name in names if name != "id"]
+
+
+def _get_session_history(
+    db: Session,
+    user_id: int,
+    cursor: Optional[str],
+    limit: int,
+    order: str,
+    date_from,
+    date_to,
+    fields: Optional[List[str]],
+):
+    exercises = selectinload(WorkoutSession.exercises)
+    if fields is not None:
+        # session_id is what selectinload matches sets to sessions by
+        columns = {"session_id", *fields}
+        exercises = exercises.load_only(
+            *(getattr(ExerciseSet, name) for name in columns)
+        )
+    page = session_page(
+        db, user_id, cursor, limit, order, date_from, date_to, options=(exercises,)
     )
 
+    # Serialized here, while only the loaded columns are touched
+    items = []
+    for session in page["items"]:
+        item = WorkoutSessionResponse.model_validate(session).model_dump()
+        sets = sorted(session.exercises, key=lambda e: e.id)
+        if fields is None:
+            item["exercises"] = [
+                ExerciseSetResponse.model_validate(e).model_dump() for e in sets
+            ]
+        else:
+            item["exercises"] = [
+                {name: getattr(e, name) for name in fields} for e in sets
+            ]
+        items.append(item)
+    return {"items": items, "next_cursor": page["next_cursor"]}
+
+
+@router.get("/history", response_model=WorkoutSessionHistoryPage)
+async def get_session_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    order: Literal["asc", "desc"] = "desc",
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+):
+    """Get a page of sessions with their exercise sets, newest first.
+
+    Sessions and all of their sets load in two queries regardless of page
+    size. ``fields`` is a comma-separated list of exercise set fields to
+    return (``id`` is always included); paging works as in ``/sessions/page``.
+    """
+    page = await run_db(
+        db,
+        _get_session_history,
+        current_user.id,
+        cursor,
+        limit,
+        order,
+        date_from,
+        date_to,
+        parse_fields(fields),
+    )
+    # Projected sets do not match the response model, so skip its validation
+    return JSONResponse(jsonable_encoder(page))
+
+
+@router.get("/export")
+async def export_workout_history(
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    pose: bool = False,
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+):
+    """Download the user's whole history as one flat table, streamed.
+
+    One row per exercise set, or per joint sample with ``pose=true``; see
+    app.export for the columns. Parquet needs pyarrow installed.
+    """
+    try:
+        check_export_format(format)
+    except ExportFormatUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"physiobuddy-{'pose' if pose else 'history'}.{extension}"
+    # A sync iterator: Starlette runs each step in the threadpool
+    return StreamingResponse(
+        export_history(sync_bind(db), current_user.id, format, pose),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _add_exercises_to_session(
+    db: Session,
+    session_id: int,
+    user_id: int,
+    exercises: List[ExerciseSetCreate],
+    queued: bool,
+):
+    # Verify session belongs to current user
+    session = get_owned_session(db, session_id, user_id)
     if not session:
         raise HTTPException(status_code=404, detail="Workout session not found")
 
-    db_exercise = ExerciseSet(session_id=session_id, **exercise_data.dict())
-    db.add(db_exercise)
+    # One multi-row INSERT ... RETURNING: render_nulls keeps rows with
+    # different unset fields together. RETURNING order is not the VALUES
+    # order in general; sort_by_parameter_order restores it, in one statement
+    # on PostgreSQL. SQLite would insert row by row for it, but assigns ids
+    # in VALUES order, so sorting by id does there
+    in_order = db.get_bind().dialect.name != "sqlite"
+    exercise_sets = db.scalars(
+        insert(ExerciseSet)
+        .returning(ExerciseSet, sort_by_parameter_order=in_order)
+        .execution_options(render_nulls=True),
+        [dict(session_id=session_id, **e.model_dump()) for e in exercises],
+    ).all()
+    if not in_order:
+        exercise_sets = sorted(exercise_sets, key=lambda e: e.id)
+
+    durations = [e.duration for e in exercises if e.duration]
+    if durations:
+        add_session_duration(db, session, sum(durations))
+
+    if queued:
+        enqueue(
+            db,
+            "derived",
+            user_id,
+            f"sets:{exercise_sets[0].id}-{exercise_sets[-1].id}",
+        )
+    else:
+        for group in group_by_kind(exercise_sets):
+            update_personal_best(db, session, group)
+            update_exercise_progress(db, session, group)
+    # Serialize before the commit expires the sets
+    response = [ExerciseSetResponse.model_validate(e) for e in exercise_sets]
     db.commit()
-    db.refresh(db_exercise)
+    return response
 
-    # Update session total duration if provided
-    if exercise_data.duration:
-        if session.total_duration:
-            session.total_duration += exercise_data.duration
-        else:
-            session.total_duration = exercise_data.duration
-        db.commit()
 
-    return db_exercise
+@router.post("/sessions/{session_id}/exercises", response_model=ExerciseSetResponse)
+async def add_exercise_to_session(
+    session_id: int,
+    exercise_data: ExerciseSetCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    queued: bool = Depends(queue_derived_data),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Add an exercise set to a workout session."""
+    created = await run_db(
+        db,
+        _add_exercises_to_session,
+        session_id,
+        current_user.id,
+        [exercise_data],
+        queued,
+    )
+    await cache.invalidate(current_user.id)
+    return created[0]
+
+
+@router.post(
+    "/sessions/{session_id}/exercises/batch",
+    response_model=List[ExerciseSetResponse],
+)
+async def add_exercises_to_session(
+    session_id: int,
+    exercises: List[ExerciseSetCreate] = Body(..., min_length=1, max_length=50),
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    queued: bool = Depends(queue_derived_data),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Add several exercise sets to a workout session in one transaction."""
+    created = await run_db(
+        db, _add_exercises_to_session, session_id, current_user.id, exercises, queued
+    )
+    await cache.invalidate(current_user.id)
+    return created
+
+
+def _get_session_exercises(db: Session, session_id: int, user_id: int):
+    # Verify session belongs to current user
+    if not get_owned_session(db, session_id, user_id):
+        raise HTTPException(status_code=404, detail="Workout session not found")
+
+    return (
+        db.query(ExerciseSet)
+        .filter(ExerciseSet.session_id == session_id)
+        .order_by(ExerciseSet.set_number, ExerciseSet.id)
+        .all()
+    )
 
 
 @router.get(
     "/sessions/{session_id}/exercises", response_model=List[ExerciseSetResponse]
 )
-def get_session_exercises(
+async def get_session_exercises(
     session_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
 ):
     """Get all exercises from a workout session."""
-    # Verify session belongs to current user
-    session = (
-        db.query(WorkoutSession)
-        .filter(
-            WorkoutSession.id == session_id, WorkoutSession.user_id == current_user.id
-        )
-        .first()
-    )
+    return await run_db(db, _get_session_exercises, session_id, current_user.id)
 
-    if not session:
-        raise HTTPException(status_code=404, detail="Workout session not found")
 
-    exercises = db.query(ExerciseSet).filter(ExerciseSet.session_id == session_id).all()
-    return exercises
+def _get_personal_bests(db: Session, user_id: int):
+    return db.query(PersonalBest).filter(PersonalBest.user_id == user_id).all()
 
 
 @router.get("/personal-bests", response_model=List[PersonalBestResponse])
-def get_personal_bests(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+async def get_personal_bests(
+    request: Request,
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+    cache: ResponseCache = Depends(app_response_cache),
 ):
     """Get user's personal bests."""
-    personal_bests = (
-        db.query(PersonalBest).filter(PersonalBest.user_id == current_user.id).all()
+    return await cache.respond(
+        request,
+        current_user.id,
+        lambda: run_db(db, _get_personal_bests, current_user.id),
+        List[PersonalBestResponse],
+    )
+
+
+def _get_streak(db: Session, user_id: int):
+    return db.query(UserStreak).filter(UserStreak.user_id == user_id).first()
+
+
+@router.get("/streak", response_model=UserStreakResponse)
+async def get_streak(
+    timezone: Optional[str] = None,
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+    config: Settings = Depends(app_settings),
+):
+    """Get user's workout streak.
+
+    A streak whose last workout was before yesterday (in ``timezone``) is
+    reported as broken, with a current streak of 0.
+    """
+    tz = get_timezone(timezone, config.default_timezone)
+    streak = await run_db(db, _get_streak, current_user.id)
+    if not streak:
+        raise HTTPException(status_code=404, detail="No workouts recorded yet")
+
+    response = UserStreakResponse.model_validate(streak)
+    today = datetime.now(tz).date()
+    if local_day(streak.last_workout_date, tz) < today - timedelta(days=1):
+        response.current_streak = 0
+    return response
+
+
+def _get_exercise_progress(
+    db: Session, user_id: int, date_from, date_to, exercise_type, arm_used
+):
+    query = db.query(ExerciseProgress).filter(ExerciseProgress.user_id == user_id)
+    if date_from is not None:
+        query = query.filter(ExerciseProgress.week_start_date >= week_start(date_from))
+    if date_to is not None:
+        query = query.filter(ExerciseProgress.week_start_date <= date_to)
+    if exercise_type is not None:
+        query = query.filter(ExerciseProgress.exercise_type == exercise_type)
+    if arm_used is not None:
+        query = query.filter(ExerciseProgress.arm_used == arm_used)
+    return query.order_by(ExerciseProgress.week_start_date).all()
+
+
+@router.get("/progress", response_model=List[ExerciseProgressResponse])
+async def get_exercise_progress(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    exercise_type: Optional[ExerciseType] = None,
+    arm_used: Optional[ArmType] = None,
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+):
+    """Get user's weekly progress buckets, oldest week first.
+
+    ``from``/``to`` select every week that overlaps the given range.
+    """
+    return await run_db(
+        db,
+        _get_exercise_progress,
+        current_user.id,
+        date_from,
+        date_to,
+        exercise_type,
+        arm_used,
+    )
+
+
+PAST_RETENTION = "Exercise set is older than the pose data retention period"
+
+
+def _prepare_pose_upload(stream: PoseStreamCreate, storage: str, copy: bool):
+    try:
+        packed = pack_pose_stream(stream)
+    except PoseStreamError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return prepare_pose_stream(packed, storage, copy)
+
+
+def _ingest_pose_stream(
+    db: Session,
+    exercise_set_id: int,
+    user_id: int,
+    prepared: PreparedPoseStream,
+    queued: bool,
+    retention_months: Optional[int],
+):
+    exercise_set = get_owned_exercise_set(db, exercise_set_id, user_id)
+    if not exercise_set:
+        raise HTTPException(status_code=404, detail="Exercise set not found")
+    # Its month's partition is dropped, or about to be
+    if prepared.storage == "rows" and past_retention(
+        exercise_set.created_at, retention_months
+    ):
+        raise HTTPException(status_code=410, detail=PAST_RETENTION)
+
+    # A second upload would store a second copy (rows) or clash (blob)
+    frames = db.query(PoseFrame.id).filter(PoseFrame.exercise_set_id == exercise_set_id)
+    if exercise_set.created_at is not None:
+        # The partition key, so a partitioned table is pruned to one partition
+        frames = frames.filter(PoseFrame.created_at == exercise_set.created_at)
+    if (
+        db.query(PoseBlob.id)
+        .filter(PoseBlob.exercise_set_id == exercise_set_id)
+        .first()
+        or frames.first()
+    ):
+        raise HTTPException(
+            status_code=409, detail="Pose data already stored for this exercise set"
+        )
+
+    frames, joint_positions = write_pose_stream(db, exercise_set_id, prepared)
+    if queued:
+        enqueue(db, "analyze", user_id, f"pose:{exercise_set_id}", exercise_set_id)
+    db.commit()
+
+    return {
+        "exercise_set_id": exercise_set_id,
+        "frames_inserted": frames,
+        "joint_positions_inserted": joint_positions,
+    }
+
+
+@router.post(
+    "/exercises/{exercise_set_id}/pose", response_model=PoseStreamIngestResponse
+)
+async def ingest_pose_stream(
+    exercise_set_id: int,
+    stream: PoseStreamCreate,
+    storage: Optional[Literal["rows", "blob"]] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    queued: bool = Depends(queue_derived_data),
+    config: Settings = Depends(app_settings),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Store a whole set's pose stream, sent column-wise, in one bulk write.
+
+    ``storage`` overrides the configured backend so both can be compared.
+    """
+    # Packing and encoding are CPU-bound: off the event loop, even when the
+    # database work runs on it (async sessions)
+    prepared = await run_in_threadpool(
+        _prepare_pose_upload, stream, storage or config.pose_storage, uses_copy(db)
+    )
+    result = await run_db(
+        db,
+        _ingest_pose_stream,
+        exercise_set_id,
+        current_user.id,
+        prepared,
+        queued,
+        config.pose_retention_months,
+    )
+    await cache.invalidate(current_user.id)
+    return result
+
+
+def _store_stream_batch(
+    db: Session, exercise_set_id: int, user_id: int, rows: PoseRows, queued: bool
+):
+    frames, _ = insert_pose_rows(db, exercise_set_id, rows)
+    if queued:
+        # One job for the whole stream while it is still queued
+        enqueue(db, "analyze", user_id, f"pose:{exercise_set_id}", exercise_set_id)
+    db.commit()
+    return frames
+
+
+@router.websocket("/exercises/{exercise_set_id}/stream")
+async def stream_pose(
+    websocket: WebSocket,
+    exercise_set_id: int,
+    token: Optional[str] = None,
+    db: AnySession = Depends(get_db),
+    queued: bool = Depends(queue_derived_data),
+    config: Settings = Depends(app_settings),
+    caches: AuthCaches = Depends(auth_caches),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Ingest a set's pose stream live, frame chunk by frame chunk.
+
+    Browsers cannot set headers on a WebSocket, so the bearer token may be
+    passed as ``?token=``. Frames always go to the "rows" backend: a blob
+    holds a whole set and cannot be appended to. See app.pose.stream for the
+    message protocol.
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(
+            " "
+        )
+        token = credentials if scheme.lower() == "bearer" else None
+    principal = await principal_for_token(token, db, caches) if token else None
+    if principal is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    exercise_set = await run_db(
+        db, get_owned_exercise_set, exercise_set_id, principal.id
+    )
+    if not exercise_set:
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Exercise set not found"
+        )
+        return
+    if past_retention(exercise_set.created_at, config.pose_retention_months):
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION, reason=PAST_RETENTION
+        )
+        return
+
+    await websocket.accept()
+
+    async def store(packed: PackedPoseStream) -> int:
+        rows = await run_in_threadpool(pose_rows, packed, uses_copy(db))
+        return await run_db(
+            db, _store_stream_batch, exercise_set_id, principal.id, rows, queued
+        )
+
+    try:
+        await run_pose_stream(
+            websocket,
+            store,
+            config.pose_stream_batch_frames,
+            config.pose_stream_batch_seconds,
+            config.pose_stream_max_pending_batches,
+        )
+    finally:
+        await cache.invalidate(principal.id)
+
+
+def parse_joints(joints: Optional[str]) -> Optional[List[JointType]]:
+    if joints is None:
+        return None
+    names = [name.strip() for name in joints.split(",") if name.strip()]
+    known = {joint.value for joint in JointType}
+    unknown = sorted(set(names) - known)
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown joints: {', '.join(unknown)}"
+        )
+    return [JointType(name) for name in names]
+
+
+def _read_replay(
+    db: Session,
+    exercise_set_id: int,
+    user_id: int,
+    start_frame: Optional[int],
+    end_frame: Optional[int],
+    start_time: Optional[float],
+    end_time: Optional[float],
+    joints: Optional[List[JointType]],
+    max_frames: Optional[int],
+):
+    if not get_owned_exercise_set(db, exercise_set_id, user_id):
+        raise HTTPException(status_code=404, detail="Exercise set not found")
+
+    # LTTB ranks frames by elbow angle, so it needs the angle joints read too
+    read_joints = joints
+    if max_frames is not None and joints is not None:
+        read_joints = list(set(joints) | set(ANGLE_JOINTS))
+    packed = read_pose_stream(
+        db,
+        exercise_set_id,
+        start_frame,
+        end_frame,
+        read_joints,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    if packed is None:
+        raise HTTPException(status_code=404, detail="No pose data for exercise set")
+    return packed
+
+
+def _downsample(
+    packed: PackedPoseStream,
+    joints: Optional[List[JointType]],
+    every: Optional[int],
+    max_frames: Optional[int],
+):
+    frames_in_range = packed.n_frames
+    if every is not None:
+        packed = every_nth(packed, every)
+    elif max_frames is not None and packed.n_frames > max_frames:
+        angles = stream_angles(packed)
+        if angles is None:
+            raise HTTPException(
+                status_code=422,
+                detail="max_frames needs shoulder, elbow and wrist joints",
+            )
+        packed = lttb(packed, angles, max_frames)
+    return select_joints(packed, joints), frames_in_range
+
+
+def _column_list(column: np.ndarray) -> list:
+    """A float column as a list, with NaN (missing) as None."""
+    if np.isnan(column).any():
+        return np.where(np.isnan(column), None, column).tolist()
+    return column.tolist()
+
+
+def _replay_response(
+    exercise_set_id: int,
+    packed: PackedPoseStream,
+    joints: Optional[List[JointType]],
+    every: Optional[int],
+    max_frames: Optional[int],
+    format: str,
+) -> Response:
+    packed, frames_in_range = _downsample(packed, joints, every, max_frames)
+    if format == "binary":
+        return Response(
+            encode_pose_blob(packed),
+            media_type="application/octet-stream",
+            headers={"X-Frames-In-Range": str(frames_in_range)},
+        )
+    # Built directly: validating thousands of floats per column through the
+    # response model would cost more than reading them
+    positions = packed.positions.astype(np.float64)
+    return JSONResponse(
+        {
+            "exercise_set_id": exercise_set_id,
+            "frames_in_range": frames_in_range,
+            "timestamps": packed.timestamps.astype(np.float64).tolist(),
+            "frame_numbers": packed.frame_numbers.tolist(),
+            "joints": {
+                joint.value: {
+                    field: _column_list(positions[:, j, k])
+                    for k, field in enumerate(POSITION_FIELDS)
+                }
+                for j, joint in enumerate(packed.joints)
+            },
+        }
+    )
+
+
+@router.get("/exercises/{exercise_set_id}/replay", response_model=PoseReplayResponse)
+async def replay_pose_stream(
+    exercise_set_id: int,
+    start_frame: Optional[int] = Query(None, ge=0),
+    end_frame: Optional[int] = Query(None, ge=0),
+    start_time: Optional[float] = Query(None, ge=0),
+    end_time: Optional[float] = Query(None, ge=0),
+    joints: Optional[str] = None,
+    every: Optional[int] = Query(None, ge=1),
+    max_frames: Optional[int] = Query(None, ge=3),
+    format: Literal["json", "binary"] = "json",
+    current_user: Principal = Depends(get_current_reader),
+    db: AnySession = Depends(get_read_db),
+):
+    """Read back a set's skeleton time series for playback.
+
+    Frame (``start_frame``/``end_frame``) and time (``start_time``/
+    ``end_time``, seconds) bounds are half-open and combine. Downsample with
+    ``every`` (every Nth frame) or ``max_frames`` (LTTB on the elbow angle).
+    ``joints`` is a comma-separated subset. ``format=binary`` returns the
+    packed float32 layout of app.pose.blob instead of JSON columns.
+    """
+    if every is not None and max_frames is not None:
+        raise HTTPException(status_code=422, detail="Use either every or max_frames")
+    parsed_joints = parse_joints(joints)
+    packed = await run_db(
+        db,
+        _read_replay,
+        exercise_set_id,
+        current_user.id,
+        start_frame,
+        end_frame,
+        start_time,
+        end_time,
+        parsed_joints,
+        max_frames,
+    )
+    # Downsampling and encoding are CPU-bound and need no database: run them
+    # in the threadpool, off the event loop
+    return await run_in_threadpool(
+        _replay_response,
+        exercise_set_id,
+        packed,
+        parsed_joints,
+        every,
+        max_frames,
+        format,
+    )
+
+
+def _read_set_pose(db: Session, exercise_set_id: int, user_id: int):
+    if not get_owned_exercise_set(db, exercise_set_id, user_id):
+        raise HTTPException(status_code=404, detail="Exercise set not found")
+
+    packed = read_pose_stream(db, exercise_set_id, joints=ANGLE_JOINTS)
+    if packed is None:
+        raise HTTPException(status_code=404, detail="No pose data for exercise set")
+    return packed
+
+
+def _save_set_metrics(
+    db: Session, exercise_set_id: int, user_id: int, metrics, queued: bool
+):
+    exercise_set = get_owned_exercise_set(db, exercise_set_id, user_id)
+    previous_score = exercise_set.form_quality_score
+    for column in METRIC_COLUMNS:
+        setattr(exercise_set, column, metrics[column])
+    # The new form score counts towards bests and progress
+    if queued:
+        enqueue(db, "derived", user_id, f"metrics:{exercise_set_id}")
+    elif exercise_set.form_quality_score != previous_score:
+        db.flush()
+        update_form_score(db, exercise_set.session, exercise_set, previous_score)
+    db.commit()
+    db.refresh(exercise_set)
+    return exercise_set
+
+
+@router.post("/exercises/{exercise_set_id}/analyze", response_model=ExerciseSetResponse)
+async def analyze_exercise_set(
+    exercise_set_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AnySession = Depends(get_db),
+    queued: bool = Depends(queue_derived_data),
+    cache: ResponseCache = Depends(app_response_cache),
+):
+    """Recompute an exercise set's quality metrics from its stored pose data."""
+    packed = await run_db(db, _read_set_pose, exercise_set_id, current_user.id)
+    metrics = await run_in_threadpool(compute_set_metrics, packed)
+    if metrics is None:
+        raise HTTPException(
+            status_code=422,
+            detail="Pose data needs shoulder, elbow and wrist joints",
+        )
+    exercise_set = await run_db(
+        db, _save_set_metrics, exercise_set_id, current_user.id, metrics, queued
     )
-    return personal_bests
+    await cache.invalidate(current_user.id)
+    return exercise_set
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
-from app.models import ExerciseType, ArmType
+from typing import Annotated, Optional, List, Dict
+from app.models import ExerciseType, ArmType, JointType
 
 
 # User schemas
@@ -31,9 +31,15 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+
 # Workout Session schemas
 class WorkoutSessionCreate(BaseModel):
     notes: Optional[str] = None
+    timezone: Optional[str] = None  # IANA name, e.g. "Europe/Berlin"
 
 
 class WorkoutSessionResponse(BaseModel):
@@ -47,6 +53,11 @@ class WorkoutSessionResponse(BaseModel):
         from_attributes = True
 
 
+class WorkoutSessionPage(BaseModel):
+    items: List[WorkoutSessionResponse]
+    next_cursor: Optional[str] = None  # None on the last page
+
+
 # Exercise Set schemas
 class ExerciseSetCreate(BaseModel):
     exercise_type: ExerciseType
@@ -71,6 +82,15 @@ class ExerciseSetResponse(ExerciseSetCreate):
         from_attributes = True
 
 
+class WorkoutSessionDetail(WorkoutSessionResponse):
+    exercises: List[ExerciseSetResponse]
+
+
+class WorkoutSessionHistoryPage(BaseModel):
+    items: List[WorkoutSessionDetail]
+    next_cursor: Optional[str] = None
+
+
 # Personal Best schemas
 class PersonalBestResponse(BaseModel):
     id: int
@@ -116,3 +136,38 @@ class ExerciseProgressResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Pose stream schemas
+class JointSeries(BaseModel):
+    """Per-joint coordinate columns, one entry per frame."""
+
+    x: List[float]
+    y: List[float]
+    z: Optional[List[Optional[float]]] = None
+    confidence: Optional[List[Optional[float]]] = None
+
+
+class PoseStreamCreate(BaseModel):
+    """A whole set's pose stream packed column-wise."""
+
+    timestamps: List[float]  # seconds from start of set
+    # Defaults to 0..n-1; stored as int32
+    frame_numbers: Optional[List[Annotated[int, Field(ge=0, le=2**31 - 1)]]] = None
+    joints: Dict[JointType, JointSeries]
+
+
+class PoseReplayResponse(BaseModel):
+    """A set's pose stream, or a slice of it, in the PoseStreamCreate layout."""
+
+    exercise_set_id: int
+    frames_in_range: int  # before downsampling
+    timestamps: List[float]
+    frame_numbers: List[int]
+    joints: Dict[JointType, JointSeries]
+
+
+class PoseStreamIngestResponse(BaseModel):
+    exercise_set_id: int
+    frames_inserted: int
+    joint_positions_inserted: int
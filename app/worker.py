@@ -0,0 +1,106 @@
+# physiobuddy-backend/app/worker.py
+"""Worker processing the derived-data job queue (app/jobs.py).
+
+Usage:
+    python -m app.worker [--batch-size N] [--poll-seconds S] [--once]
+
+Run it next to uvicorn when DERIVED_DATA=queue, as many processes as the
+queue needs (a single one on SQLite). It takes batches while jobs are ready
+and otherwise checks every --poll-seconds; --once stops when none are left.
+SIGINT or SIGTERM lets the batch in progress finish. Users whose derived
+data was recomputed get their cached responses invalidated in the redis
+response cache, which queue mode requires: the worker builds its own
+client of it from the database's settings, as create_app does for the API.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from config import settings
+from app.database import Database
+from app.jobs import run_once
+from app.response_cache import make_response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _run_batch(database: Database, batch_size: int):
+    db = database.session_factory()
+    try:
+        return run_once(db, batch_size)
+    finally:
+        db.close()
+
+
+async def run_worker(
+    database: Database,
+    batch_size: int,
+    poll_seconds: float,
+    once: bool = False,
+    stop: Optional[asyncio.Event] = None,
+) -> int:
+    """Process jobs until ``stop`` is set (or, with ``once``, until none are
+    ready). Returns the number of jobs done."""
+    if database.config.response_cache_backend != "redis":
+        # Invalidations in a cache of the worker's own would reach no API
+        # worker
+        raise ValueError("the worker needs response_cache_backend='redis'")
+    stop = stop or asyncio.Event()
+    response_cache = make_response_cache(database.config)
+    total = 0
+    while not stop.is_set():
+        # Database work is blocking; keep the loop free for the signals
+        done = await asyncio.to_thread(_run_batch, database, batch_size)
+        for user_id, count in done.items():
+            if count:
+                await response_cache.invalidate(user_id)
+        if done:
+            total += sum(done.values())
+            logger.info(
+                "processed %d jobs for %d users",
+                sum(done.values()),
+                sum(1 for count in done.values() if count),
+            )
+            continue
+        if once:
+            break
+        try:
+            await asyncio.wait_for(stop.wait(), poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process derived-data jobs.")
+    parser.add_argument("--batch-size", type=int, default=settings.job_batch_size)
+    parser.add_argument("--poll-seconds", type=float, default=settings.job_poll_seconds)
+    parser.add_argument(
+        "--once", action="store_true", help="Exit once no jobs are ready."
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(asctime)s %(name)s %(message)s")
+    logger.setLevel(logging.INFO)
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        database = Database(settings)
+        try:
+            return await run_worker(
+                database, args.batch_size, args.poll_seconds, args.once, stop
+            )
+        finally:
+            await database.dispose()
+
+    total = asyncio.run(run())
+    print(f"Processed {total} jobs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure per-request authentication overhead, before and after caching.
+
+Usage:
+    python -m benchmarks.bench_auth [--iterations 5000] [--database-url URL]
+
+"before" re-creates the original get_current_user path: decode the JWT, then
+look the user up by email. "after" is the current get_current_user, which
+serves verified claims and principals from in-process caches.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from app.auth.auth import (
+    ALGORITHM,
+    SECRET_KEY,
+    AuthCaches,
+    create_user_token,
+    get_current_user,
+    get_user_by_email,
+)
+from app.database import Base
+from app.models import User
+
+
+def uncached_auth(token: str, db):
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return get_user_by_email(db, email=payload["sub"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'auth.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    with SessionLocal() as db:
+        user = User(email=f"bench_{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        token = create_user_token(user)
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            uncached_auth(token, db)
+            db.rollback()  # each request gets a fresh transaction
+        before = (time.perf_counter() - start) / args.iterations
+
+        caches = AuthCaches(settings)
+
+        async def cached_loop():
+            for _ in range(args.iterations):
+                await get_current_user(token=token, db=db, caches=caches)
+
+        start = time.perf_counter()
+        asyncio.run(cached_loop())
+        after = (time.perf_counter() - start) / args.iterations
+
+    print(f"database: {engine.dialect.name}, {args.iterations} iterations")
+    print(f"before (decode + user query): {before * 1e6:8.1f} us/request")
+    print(f"after  (cached claims):       {after * 1e6:8.1f} us/request")
+    print(f"speedup: {before / after:.1f}x")
+
+    engine.dispose()
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
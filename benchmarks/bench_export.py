@@ -0,0 +1,246 @@
+"""Measure peak memory and throughput of the streamed history export.
+
+Usage:
+    python -m benchmarks.bench_export [--rows 500000 5000000]
+        [--formats ndjson csv parquet] [--database-url URL]
+
+For each history size, seeds a user with that many joint samples (pose rows
+are what make a history large) and exports it with ``pose=true`` in every
+format, each in a fresh process so its peak RSS is the export's alone. The
+response is driven through the ASGI app and its body discarded as it
+arrives. Flat peak RSS across sizes is the point.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    ArmType,
+    Base,
+    ExerciseSet,
+    ExerciseType,
+    JointPosition,
+    JointType,
+    PoseFrame,
+    User,
+    WorkoutSession,
+    utcnow,
+)
+
+FRAMES_PER_SET = 1800  # one minute at 30 fps
+SETS_PER_SESSION = 3
+JOINTS = list(JointType)
+BATCH = 200_000
+
+
+def seed(SessionLocal, n_rows: int) -> int:
+    """A user whose pose data has ``n_rows`` joint samples; returns its id."""
+    n_frames = -(-n_rows // len(JOINTS))
+    n_sets = -(-n_frames // FRAMES_PER_SET)
+    rng = np.random.default_rng(0)
+    # Pose rows carry their set's created_at; one for the whole history
+    created_at = utcnow()
+    with SessionLocal() as db:
+        user = User(email=f"export_{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        set_ids = []
+        for s in range(n_sets):
+            if s % SETS_PER_SESSION == 0:
+                session = WorkoutSession(user_id=user.id, total_duration=180.0)
+                db.add(session)
+                db.flush()
+            exercise_set = ExerciseSet(
+                session_id=session.id,
+                exercise_type=ExerciseType.BICEP_CURL,
+                arm_used=ArmType.LEFT,
+                reps_completed=12,
+                set_number=s % SETS_PER_SESSION + 1,
+                duration=60.0,
+                created_at=created_at,
+            )
+            db.add(exercise_set)
+            db.flush()
+            set_ids.append(exercise_set.id)
+        db.commit()
+
+        frame_id = db.query(func.coalesce(func.max(PoseFrame.id), 0)).scalar()
+        joint_rows = []
+        for s, set_id in enumerate(set_ids):
+            count = min(FRAMES_PER_SET, n_frames - s * FRAMES_PER_SET)
+            db.execute(
+                insert(PoseFrame),
+                [
+                    {
+                        "id": frame_id + i + 1,
+                        "exercise_set_id": set_id,
+                        "timestamp": i / 30,
+                        "frame_number": i,
+                        "created_at": created_at,
+                    }
+                    for i in range(count)
+                ],
+            )
+            coords = rng.random((count * len(JOINTS), 3)).tolist()
+            joint_rows.extend(
+                {
+                    "frame_id": frame_id + k // len(JOINTS) + 1,
+                    "joint_type": JOINTS[k % len(JOINTS)],
+                    "x": x,
+                    "y": y,
+                    "z": None,
+                    "confidence": c,
+                    "created_at": created_at,
+                }
+                for k, (x, y, c) in enumerate(coords)
+            )
+            frame_id += count
+            if len(joint_rows) >= BATCH or s == len(set_ids) - 1:
+                db.execute(insert(JointPosition.__table__), joint_rows)
+                db.commit()
+                joint_rows = []
+        return user.id
+
+
+def max_rss_mb() -> float:
+    """Peak RSS of this process. Not getrusage's ru_maxrss: on Linux that
+    survives exec, so a child would report the parent's peak."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("peak RSS is only available on Linux")
+
+
+async def drive_export(app, token: str, export_format: str) -> int:
+    """GET the export through the ASGI app, counting and dropping the body."""
+    received = 0
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # the client never disconnects
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 0),
+        "root_path": "",
+        "path": "/workouts/export",
+        "raw_path": b"/workouts/export",
+        "query_string": f"format={export_format}&pose=true".encode(),
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+    await app(scope, receive, send)
+    return received
+
+
+def child(database_url: str, user_id: int, export_format: str):
+    """Run one export in this process and print its measurements as JSON."""
+    from config import Settings
+    from app.auth.auth import create_user_token
+    from app.database import Database
+    from app.main import create_app
+
+    engine = create_engine(database_url)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    config = Settings(database_url=database_url)
+    app = create_app(config, database=Database(config, engine=engine))
+    with SessionLocal() as db:
+        token = create_user_token(db.get(User, user_id))
+    baseline = max_rss_mb()
+    start = time.perf_counter()
+    size = asyncio.run(drive_export(app, token, export_format))
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "bytes": size,
+                "seconds": elapsed,
+                "baseline_mb": baseline,
+                "peak_mb": max_rss_mb(),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[500_000, 5_000_000])
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "csv", "parquet"])
+    parser.add_argument("--database-url")
+    parser.add_argument("--child", nargs=2, metavar=("USER_ID", "FORMAT"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.database_url, int(args.child[0]), args.child[1])
+        return
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'export.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    print(f"database: {engine.dialect.name}")
+    print(
+        f"{'rows':>10} {'format':>8} {'MB out':>8} {'rows/s':>10} "
+        f"{'base RSS':>9} {'peak RSS':>9}"
+    )
+    for n_rows in args.rows:
+        start = time.perf_counter()
+        user_id = seed(SessionLocal, n_rows)
+        print(f"seeded {n_rows} rows in {time.perf_counter() - start:.0f}s")
+        for export_format in args.formats:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_export",
+                    "--database-url",
+                    url,
+                    "--child",
+                    str(user_id),
+                    export_format,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+            print(
+                f"{n_rows:>10} {export_format:>8} {result['bytes'] / 2**20:>8.0f} "
+                f"{n_rows / result['seconds']:>10.0f} "
+                f"{result['baseline_mb']:>8.0f}M {result['peak_mb']:>8.0f}M"
+            )
+
+    engine.dispose()
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
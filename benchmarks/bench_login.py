@@ -0,0 +1,134 @@
+"""Measure login throughput, and its effect on other requests, with and
+without the password hashing offload.
+
+Usage:
+    python -m benchmarks.bench_login [--logins 16] [--readers 16]
+        [--duration 10] [--database-url URL]
+
+Runs the app in-process. ``--logins`` clients log in back to back while
+``--readers`` clients fetch their sessions. "inline" re-creates the original
+behaviour of hashing in Starlette's shared threadpool; "offload" is the
+current bounded process pool.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine
+from starlette.concurrency import run_in_threadpool
+
+from app.auth.hashing import crypt_context
+from app.database import Database
+from app.main import create_app
+from app.models import Base
+from config import Settings
+
+PASSWORD = "benchmark-password"
+
+
+def inline_verify_and_update(hasher):
+    context = crypt_context(hasher.schemes, hasher.rounds)
+
+    async def verify_and_update(password, hashed):
+        return await run_in_threadpool(context.verify_and_update, password, hashed)
+
+    return verify_and_update
+
+
+async def login_loop(client, email, stop_at, latencies):
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        response = await client.post(
+            "/auth/token", data={"username": email, "password": PASSWORD}
+        )
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+
+
+async def read_loop(client, headers, stop_at, latencies):
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        await client.get("/workouts/sessions", headers=headers)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(app, logins: int, readers: int, duration: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=120.0
+    ) as client:
+        email = f"bench_{time.time_ns()}@example.com"
+        await client.post("/auth/register", json={"email": email, "password": PASSWORD})
+        token = (
+            await client.post(
+                "/auth/token", data={"username": email, "password": PASSWORD}
+            )
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        login_latencies, read_latencies = [], []
+        stop_at = time.monotonic() + duration
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                login_loop(client, email, stop_at, login_latencies)
+                for _ in range(logins)
+            ),
+            *(
+                read_loop(client, headers, stop_at, read_latencies)
+                for _ in range(readers)
+            ),
+        )
+        elapsed = time.perf_counter() - start
+    return np.array(login_latencies), np.array(read_latencies), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'login.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    # Never turn logins away; this measures throughput, not shedding
+    config = Settings(database_url=url, rate_limit_enabled=False)
+    app = create_app(config, database=Database(config, engine=engine))
+    hasher = app.state.password_hasher
+    hasher.max_pending = args.logins + 1
+
+    print(
+        f"{args.logins} login clients, {args.readers} reader clients, "
+        f"{args.duration:.0f}s per mode, {hasher.workers} hash workers"
+    )
+    for mode in ("inline", "offload"):
+        if mode == "inline":
+            hasher.verify_and_update = inline_verify_and_update(hasher)
+        else:
+            del hasher.verify_and_update
+        logins, reads, elapsed = asyncio.run(
+            run(app, args.logins, args.readers, args.duration)
+        )
+        read_p50, read_p99 = np.percentile(reads, [50, 99]) * 1e3
+        print(
+            f"{mode:>7}: {logins.size / elapsed:7.1f} logins/s"
+            f"  reads {reads.size / elapsed:7.1f}/s"
+            f"  read p50 {read_p50:7.1f} ms  p99 {read_p99:7.1f} ms"
+        )
+
+    hasher.shutdown()
+    engine.dispose()
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
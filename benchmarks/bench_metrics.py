@@ -0,0 +1,113 @@
+"""Measure the per-request and per-statement cost of the metrics instrumentation.
+
+Usage:
+    python -m benchmarks.bench_metrics [--requests 50000] [--statements 20000] [--repeat 10]
+
+Requests go straight into a minimal ASGI app, with and without
+MetricsMiddleware in front of it, so the difference is the middleware alone
+(timing, route lookup, histogram update and the Server-Timing header).
+Statements are ``SELECT 1`` on an in-memory SQLite engine, with and without
+the engine events, inside a request's context.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.metrics import (
+    MetricsMiddleware,
+    RequestMetrics,
+    _DbTime,
+    _request_db,
+    instrument_engine,
+)
+
+
+class Route:
+    path = "/workouts/sessions/{session_id}/exercises"
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app, n: int) -> float:
+    """Seconds per request through ``app``."""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/workouts/sessions/1/exercises"}
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+def per_statement(engine, n: int) -> float:
+    """Seconds per ``SELECT 1`` on ``engine``, run inside a request context."""
+    token = _request_db.set(_DbTime())
+    try:
+        with engine.connect() as connection:
+            statement = text("SELECT 1")
+            start = time.perf_counter()
+            for _ in range(n):
+                connection.execute(statement)
+            return (time.perf_counter() - start) / n
+    finally:
+        _request_db.reset(token)
+
+
+def best_of(repeat: int, *runs):
+    """Best time of each run, taking turns so drift affects them alike."""
+    best = [float("inf")] * len(runs)
+    for _ in range(repeat):
+        for i, run in enumerate(runs):
+            best[i] = min(best[i], run())
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--statements", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    def requests(app):
+        return lambda: asyncio.run(drive(app, args.requests))
+
+    plain, metrics_only, server_timing = best_of(
+        args.repeat,
+        requests(endpoint),
+        requests(MetricsMiddleware(endpoint, RequestMetrics(), server_timing=False)),
+        requests(MetricsMiddleware(endpoint, RequestMetrics(), server_timing=True)),
+    )
+    print(f"{'per request, metrics only':<34}{(metrics_only - plain) * 1e6:>7.2f} us")
+    print(
+        f"{'per request, with Server-Timing':<34}{(server_timing - plain) * 1e6:>7.2f} us"
+    )
+
+    bare = create_engine("sqlite://")
+    instrumented = create_engine("sqlite://")
+    instrument_engine(instrumented)
+    baseline, measured = best_of(
+        args.repeat,
+        lambda: per_statement(bare, args.statements),
+        lambda: per_statement(instrumented, args.statements),
+    )
+    print(
+        f"{'per SQL statement':<34}{(measured - baseline) * 1e6:>7.2f} us "
+        f"(SELECT 1 takes {baseline * 1e6:.1f} us uninstrumented)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Compare bulk columnar pose ingestion against per-row ORM inserts.
+
+Usage:
+    python -m benchmarks.bench_pose_ingest [--frames 1800] [--orm-frames 300]
+        [--database-url sqlite:///bench_pose.db]
+
+The ORM path mirrors the router's db.add() + commit() pattern, one frame at a
+time, and is run on fewer frames because it is orders of magnitude slower;
+both paths are reported as rows per second.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import (
+    ArmType,
+    ExerciseSet,
+    ExerciseType,
+    JointPosition,
+    JointType,
+    PoseFrame,
+    User,
+    WorkoutSession,
+)
+from app.pose.ingest import insert_pose_stream, pack_pose_stream
+from app.schemas import PoseStreamCreate
+
+
+def synthetic_stream(n_frames: int, fps: float = 30.0) -> PoseStreamCreate:
+    rng = np.random.default_rng(0)
+    joints = {}
+    for joint in JointType:
+        joints[joint] = {
+            "x": rng.random(n_frames).tolist(),
+            "y": rng.random(n_frames).tolist(),
+            "z": rng.random(n_frames).tolist(),
+            "confidence": rng.random(n_frames).tolist(),
+        }
+    return PoseStreamCreate(
+        timestamps=(np.arange(n_frames) / fps).tolist(), joints=joints
+    )
+
+
+def make_exercise_set(db) -> int:
+    user = User(email=f"bench_{time.time_ns()}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    session = WorkoutSession(user_id=user.id)
+    db.add(session)
+    db.flush()
+    exercise_set = ExerciseSet(
+        session_id=session.id,
+        exercise_type=ExerciseType.BICEP_CURL,
+        arm_used=ArmType.LEFT,
+        reps_completed=0,
+        set_number=1,
+    )
+    db.add(exercise_set)
+    db.commit()
+    return exercise_set.id
+
+
+def orm_per_row(db, exercise_set_id: int, stream: PoseStreamCreate, n_frames: int):
+    for i in range(n_frames):
+        frame = PoseFrame(
+            exercise_set_id=exercise_set_id,
+            timestamp=stream.timestamps[i],
+            frame_number=i,
+        )
+        db.add(frame)
+        db.commit()
+        db.refresh(frame)
+        for joint, series in stream.joints.items():
+            db.add(
+                JointPosition(
+                    frame_id=frame.id,
+                    joint_type=joint,
+                    x=series.x[i],
+                    y=series.y[i],
+                    z=series.z[i],
+                    confidence=series.confidence[i],
+                    created_at=frame.created_at,
+                )
+            )
+            db.commit()
+
+
+def bulk(db, exercise_set_id: int, stream: PoseStreamCreate):
+    packed = pack_pose_stream(stream)
+    insert_pose_stream(db, exercise_set_id, packed)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1800)
+    parser.add_argument("--orm-frames", type=int, default=300)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.database_url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench_pose.db')}"
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    stream = synthetic_stream(max(args.frames, args.orm_frames))
+    n_joints = len(stream.joints)
+
+    with SessionLocal() as db:
+        exercise_set_id = make_exercise_set(db)
+        start = time.perf_counter()
+        orm_per_row(db, exercise_set_id, stream, args.orm_frames)
+        orm_elapsed = time.perf_counter() - start
+
+    bulk_stream = synthetic_stream(args.frames)
+    with SessionLocal() as db:
+        exercise_set_id = make_exercise_set(db)
+        start = time.perf_counter()
+        bulk(db, exercise_set_id, bulk_stream)
+        bulk_elapsed = time.perf_counter() - start
+
+    orm_rows = args.orm_frames * (n_joints + 1)
+    bulk_rows = args.frames * (n_joints + 1)
+    print(f"database: {engine.dialect.name}, joints per frame: {n_joints}")
+    print(
+        f"per-row ORM: {orm_rows:>7} rows in {orm_elapsed:8.3f}s "
+        f"= {orm_rows / orm_elapsed:>10.0f} rows/s"
+    )
+    print(
+        f"bulk:        {bulk_rows:>7} rows in {bulk_elapsed:8.3f}s "
+        f"= {bulk_rows / bulk_elapsed:>10.0f} rows/s"
+    )
+    print(f"speedup: {(bulk_rows / bulk_elapsed) / (orm_rows / orm_elapsed):.1f}x")
+
+    engine.dispose()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
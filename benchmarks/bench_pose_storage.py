@@ -0,0 +1,96 @@
+"""Compare storage size and read latency of the "rows" and "blob" pose backends.
+
+Usage:
+    python -m benchmarks.bench_pose_storage [--frames 18000] [--repeat 20]
+        [--database-url postgresql://...]
+
+Without --database-url each backend gets its own temporary SQLite file and the
+size reported is the VACUUMed file size; on PostgreSQL it is the total relation
+size (heap + indexes + TOAST) of the tables each backend writes to.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import JointType
+from app.pose.ingest import pack_pose_stream
+from app.pose.storage import read_pose_stream, store_pose_stream
+from benchmarks.bench_pose_ingest import make_exercise_set, synthetic_stream
+
+TABLES = {"rows": ("pose_frames", "joint_positions"), "blob": ("pose_blobs",)}
+
+
+def storage_size(engine, storage: str) -> int:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return sum(
+                conn.execute(
+                    text("SELECT pg_total_relation_size(:t)"), {"t": table}
+                ).scalar()
+                for table in TABLES[storage]
+            )
+        conn.execute(text("VACUUM"))
+    return os.path.getsize(engine.url.database)
+
+
+def time_reads(SessionLocal, exercise_set_id, storage, repeat, **kwargs) -> float:
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            read_pose_stream(db, exercise_set_id, storage=storage, **kwargs)
+        return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=18000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    packed = pack_pose_stream(synthetic_stream(args.frames))
+    tmpdir = tempfile.TemporaryDirectory()
+    print(f"{args.frames} frames x {len(packed.joints)} joints")
+    print(f"{'backend':<8}{'size':>12}{'full read':>14}{'100 frames, 1 joint':>22}")
+
+    for storage in ("rows", "blob"):
+        url = args.database_url or (
+            f"sqlite:///{os.path.join(tmpdir.name, f'bench_{storage}.db')}"
+        )
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        with SessionLocal() as db:
+            exercise_set_id = make_exercise_set(db)
+            store_pose_stream(db, exercise_set_id, packed, storage)
+            db.commit()
+
+        size = storage_size(engine, storage)
+        full = time_reads(SessionLocal, exercise_set_id, storage, args.repeat)
+        middle = args.frames // 2
+        sliced = time_reads(
+            SessionLocal,
+            exercise_set_id,
+            storage,
+            args.repeat,
+            start_frame=middle,
+            end_frame=middle + 100,
+            joints=[JointType.ELBOW],
+        )
+        print(
+            f"{storage:<8}{size / 1024:>10.0f}KB{full * 1000:>12.2f}ms"
+            f"{sliced * 1000:>20.2f}ms"
+        )
+        engine.dispose()
+
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
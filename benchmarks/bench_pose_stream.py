@@ -0,0 +1,192 @@
+"""Measure sustained live pose ingestion through the WebSocket endpoint.
+
+Usage:
+    python -m benchmarks.bench_pose_stream [--streams 1 8 32] [--fps 30 60]
+        [--seconds 60] [--database-url URL]
+
+Runs the app in-process on one event loop, i.e. one worker. Each stream is a
+synthetic curl at ``--fps`` with every JointType, sent one message per
+1/30 s of video as fast as the server will take it, so the result is the
+frames/sec a worker sustains rather than what real-time clients need (30 or
+60 per stream). Messages are encoded up front; the client side costs only a
+queue put.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.auth.auth import create_user_token
+from app.database import get_db
+from app.main import app
+from app.models import (
+    ArmType,
+    Base,
+    ExerciseSet,
+    ExerciseType,
+    JointType,
+    PoseFrame,
+    User,
+    WorkoutSession,
+)
+
+# Messages a client may have in flight before it blocks, like a TCP window
+CLIENT_WINDOW = 32
+
+
+def curl_messages(fps: int, seconds: float, rep_seconds: float = 2.0):
+    """JSON text messages for a curl, ``fps // 30`` frames per message."""
+    rng = np.random.default_rng(0)
+    timestamps = np.arange(int(seconds * fps)) / fps
+    angle = np.radians(100 + 60 * np.cos(2 * np.pi * timestamps / rep_seconds))
+    n = timestamps.shape[0]
+    columns = {joint: (rng.random(n), rng.random(n)) for joint in JointType}
+    columns[JointType.SHOULDER] = (np.zeros(n), np.ones(n))
+    columns[JointType.ELBOW] = (np.zeros(n), np.zeros(n))
+    columns[JointType.WRIST] = (np.sin(angle), np.cos(angle))
+
+    step = max(fps // 30, 1)
+    messages = []
+    for start in range(0, n, step):
+        window = slice(start, start + step)
+        messages.append(
+            json.dumps(
+                {
+                    "timestamps": timestamps[window].tolist(),
+                    "joints": {
+                        joint.value: {
+                            "x": x[window].tolist(),
+                            "y": y[window].tolist(),
+                            "confidence": [0.9] * len(timestamps[window]),
+                        }
+                        for joint, (x, y) in columns.items()
+                    },
+                }
+            )
+        )
+    messages.append(json.dumps({"end": True}))
+    return messages
+
+
+async def stream(exercise_set_id: int, token: str, messages) -> dict:
+    """Drive one WebSocket connection through the ASGI app directly."""
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_WINDOW)
+    replies = []
+
+    async def send(message):
+        if message["type"] == "websocket.send":
+            replies.append(json.loads(message["text"]))
+
+    async def feed():
+        await inbox.put({"type": "websocket.connect"})
+        for text in messages:
+            await inbox.put({"type": "websocket.receive", "text": text})
+
+    path = f"/workouts/exercises/{exercise_set_id}/stream"
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "scheme": "ws",
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 0),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": f"token={token}".encode(),
+        "headers": [],
+        "subprotocols": [],
+    }
+    feeder = asyncio.create_task(feed())
+    await app(scope, inbox.get, send)
+    feeder.cancel()
+    return replies[-1]
+
+
+def make_streams(SessionLocal, n: int):
+    with SessionLocal() as db:
+        user = User(email=f"stream_{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        session = WorkoutSession(user_id=user.id)
+        db.add(session)
+        db.flush()
+        sets = [
+            ExerciseSet(
+                session_id=session.id,
+                exercise_type=ExerciseType.BICEP_CURL,
+                arm_used=ArmType.LEFT,
+                reps_completed=0,
+                set_number=i + 1,
+            )
+            for i in range(n)
+        ]
+        db.add_all(sets)
+        db.commit()
+        return create_user_token(user), [exercise_set.id for exercise_set in sets]
+
+
+async def run(SessionLocal, n_streams: int, messages):
+    token, set_ids = make_streams(SessionLocal, n_streams)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(stream(set_id, token, messages) for set_id in set_ids)
+    )
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--fps", type=int, nargs="+", default=[30, 60])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'stream.db')}"
+    connect_args = {"check_same_thread": False, "timeout": 60}
+    engine = create_engine(url, connect_args=connect_args if "sqlite" in url else {})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def bench_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_get_db
+
+    print(
+        f"database: {engine.dialect.name}, {len(JointType)} joints, "
+        f"{args.seconds:.0f}s of video per stream"
+    )
+    print(f"{'fps':>4} {'streams':>8} {'frames/s':>10} {'x real time':>12} {'reps':>5}")
+    for fps in args.fps:
+        messages = curl_messages(fps, args.seconds)
+        for n_streams in args.streams:
+            results, elapsed = asyncio.run(run(SessionLocal, n_streams, messages))
+            frames = sum(result["frames_stored"] for result in results)
+            print(
+                f"{fps:>4} {n_streams:>8} {frames / elapsed:>10.0f} "
+                f"{frames / elapsed / fps:>12.1f} {results[0]['reps']:>5}"
+            )
+
+    with SessionLocal() as db:
+        assert db.query(func.count(PoseFrame.id)).scalar() == sum(
+            int(args.seconds * fps) * n for fps in args.fps for n in args.streams
+        )
+    engine.dispose()
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Measure the per-request cost of rate limiting.
+
+Usage:
+    python -m benchmarks.bench_ratelimit [--requests 20000] [--keys 10000] [--repeat 5]
+
+Requests for ``GET /ping``, an async endpoint added for the benchmark (the
+app's own health checks run in the threadpool, whose noise would swamp the
+difference), go straight into the app with no server or database. It is built with rate limiting off, on but with no budget for the
+route, and with a budget it never exhausts, counted in process (token
+buckets) and in a shared store (sliding windows on LocalRedis, the
+in-process stand-in for Redis, so network round trips are not included).
+The differences to the first are the limiter's overhead. ``acquire()`` is
+also timed on its own, spread over ``--keys`` callers.
+"""
+
+import argparse
+import asyncio
+import time
+
+from config import Settings
+from app.kvstore import LocalRedis, RedisStore
+from app.main import create_app
+from app.ratelimit import Rate, SlidingWindowLimiter, TokenBucketLimiter
+
+NEVER_EXHAUSTED = "1000000000/second"
+
+
+def build(enabled: bool, budget: bool = False, shared: bool = False):
+    config = Settings(
+        database_url="sqlite://",
+        rate_limit_enabled=enabled,
+        rate_limits={"GET /ping": NEVER_EXHAUSTED} if budget else {},
+        server_timing=False,
+    )
+    app = create_app(config)
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    if shared:
+        app.state.rate_limits.limiter = SlidingWindowLimiter(RedisStore(LocalRedis()))
+    return app
+
+
+async def drive(app, n: int) -> float:
+    """Seconds per ``GET /ping`` through ``app``."""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+async def acquire_time(limiter, n: int, keys: int) -> float:
+    """Seconds per ``acquire()`` over ``keys`` distinct callers."""
+    rate = Rate(10**9, 1.0)
+    names = [f"GET /ping|ip:10.0.{i // 256}.{i % 256}" for i in range(keys)]
+    start = time.perf_counter()
+    for i in range(n):
+        await limiter.acquire(names[i % keys], rate)
+    return (time.perf_counter() - start) / n
+
+
+def best_of(repeat: int, *runs):
+    """Best time of each run, taking turns so drift affects them alike."""
+    best = [float("inf")] * len(runs)
+    for _ in range(repeat):
+        for i, run in enumerate(runs):
+            best[i] = min(best[i], run())
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def requests(app):
+        return lambda: asyncio.run(drive(app, args.requests))
+
+    off, no_budget, buckets, shared = best_of(
+        args.repeat,
+        requests(build(enabled=False)),
+        requests(build(enabled=True)),
+        requests(build(enabled=True, budget=True)),
+        requests(build(enabled=True, budget=True, shared=True)),
+    )
+    print(f"{'request with limiting off':<38}{off * 1e6:>8.2f} us")
+    for label, seconds in [
+        ("overhead, route without a budget", no_budget),
+        ("overhead, token bucket", buckets),
+        ("overhead, shared sliding window", shared),
+    ]:
+        print(f"{label:<38}{(seconds - off) * 1e6:>8.2f} us")
+
+    bucket_acquire, window_acquire = best_of(
+        args.repeat,
+        lambda: asyncio.run(
+            acquire_time(TokenBucketLimiter(), args.requests, args.keys)
+        ),
+        lambda: asyncio.run(
+            acquire_time(
+                SlidingWindowLimiter(RedisStore(LocalRedis())), args.requests, args.keys
+            )
+        ),
+    )
+    print(f"{'acquire(), token bucket':<38}{bucket_acquire * 1e6:>8.2f} us")
+    print(f"{'acquire(), shared sliding window':<38}{window_acquire * 1e6:>8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
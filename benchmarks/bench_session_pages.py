@@ -0,0 +1,119 @@
+"""Compare offset and keyset (cursor) pagination of session listings by depth.
+
+Usage:
+    python -m benchmarks.bench_session_pages [--sessions 1000000] [--limit 10]
+        [--repeat 20] [--database-url URL]
+
+Seeds ``--sessions`` workout sessions, half of them belonging to the user
+being paged, then times fetching one page at increasing depths with the
+offset listing (GET /sessions) and the keyset one (GET /sessions/page).
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, WorkoutSession
+from app.pagination import encode_cursor
+from app.routers.workouts import _get_user_sessions, session_page, sessions_query
+
+OTHER_USERS = 9
+BATCH = 50_000
+
+
+def seed(SessionLocal, n_sessions: int) -> int:
+    with SessionLocal() as db:
+        users = [
+            User(email=f"pages_{i}_{time.time_ns()}@example.com", hashed_password="x")
+            for i in range(OTHER_USERS + 1)
+        ]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+        start = datetime(2020, 1, 1)
+        for offset in range(0, n_sessions, BATCH):
+            db.execute(
+                insert(WorkoutSession),
+                [
+                    {
+                        # Every other session is the paged user's
+                        "user_id": user_ids[0 if i % 2 else 1 + i % OTHER_USERS],
+                        "session_date": start + timedelta(minutes=7 * i),
+                        "total_duration": 600.0,
+                    }
+                    for i in range(offset, min(offset + BATCH, n_sessions))
+                ],
+            )
+            db.commit()
+    return user_ids[0]
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of ``fn()`` in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'pages.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    start = time.perf_counter()
+    user_id = seed(SessionLocal, args.sessions)
+    print(
+        f"database: {engine.dialect.name}, seeded {args.sessions} sessions "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+    with SessionLocal() as db:
+        owned = sessions_query(db, user_id).count()
+        print(f"paging {owned} sessions, {args.limit} per page")
+        print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+        for fraction in (0.0, 0.01, 0.1, 0.5, 0.99):
+            skip = int(fraction * (owned - args.limit))
+            cursor = None
+            if skip:
+                previous = (
+                    sessions_query(db, user_id)
+                    .order_by(WorkoutSession.session_date, WorkoutSession.id)
+                    .offset(skip - 1)
+                    .first()
+                )
+                cursor = encode_cursor(previous.session_date, previous.id)
+
+            offset_ms = timed(
+                lambda: _get_user_sessions(db, user_id, skip, args.limit, None, None),
+                args.repeat,
+            )
+            keyset_ms = timed(
+                lambda: session_page(db, user_id, cursor, args.limit, "asc"),
+                args.repeat,
+            )
+            print(f"{skip // args.limit:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+    engine.dispose()
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
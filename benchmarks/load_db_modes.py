@@ -0,0 +1,167 @@
+"""Load-test the API with the sync and the async database layer.
+
+Usage:
+    python -m benchmarks.load_db_modes [--concurrency 64] [--duration 10]
+        [--database-url URL] [--modes sync async]
+
+Each mode starts its own uvicorn server (one worker) with DB_ASYNC set
+accordingly, registers a user, and then has ``--concurrency`` clients loop
+over a read-heavy mix of authenticated requests for ``--duration`` seconds.
+Reports requests/sec and p50/p99 latency per mode.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine
+
+from app.models import Base
+
+# (method, path) mix run by every client; {session} is the client's session
+REQUEST_MIX = (
+    ("GET", "/workouts/sessions"),
+    ("GET", "/workouts/sessions/{session}/exercises"),
+    ("GET", "/workouts/personal-bests"),
+    ("POST", "/workouts/sessions/{session}/exercises"),
+)
+
+EXERCISE = {
+    "exercise_type": "bicep_curl",
+    "arm_used": "left",
+    "reps_completed": 10,
+    "set_number": 1,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, db_async: bool, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url, DB_ASYNC=str(db_async).lower())
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.1)
+
+
+async def worker(client, headers, session_id, stop_at, latencies, errors):
+    i = 0
+    while time.monotonic() < stop_at:
+        method, path = REQUEST_MIX[i % len(REQUEST_MIX)]
+        i += 1
+        start = time.perf_counter()
+        response = await client.request(
+            method,
+            path.format(session=session_id),
+            headers=headers,
+            json=EXERCISE if method == "POST" else None,
+        )
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def run_load(base_url: str, concurrency: int, duration: float):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60.0
+    ) as client:
+        await wait_until_up(client)
+        email = f"load_{time.time_ns()}@example.com"
+        await client.post(
+            "/auth/register", json={"email": email, "password": "loadtest"}
+        )
+        token = (
+            await client.post(
+                "/auth/token", data={"username": email, "password": "loadtest"}
+            )
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        session_ids = [
+            (await client.post("/workouts/sessions", json={}, headers=headers)).json()[
+                "id"
+            ]
+            for _ in range(concurrency)
+        ]
+
+        latencies, errors = [], []
+        stop_at = time.monotonic() + duration
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(client, headers, session_id, stop_at, latencies, errors)
+                for session_id in session_ids
+            )
+        )
+        elapsed = time.perf_counter() - start
+    return np.array(latencies), len(errors), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--database-url")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'load.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    print(f"concurrency {args.concurrency}, {args.duration:.0f}s per mode")
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(url, mode == "async", port)
+        try:
+            latencies, errors, elapsed = asyncio.run(
+                run_load(f"http://127.0.0.1:{port}", args.concurrency, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+        print(
+            f"{mode:>5}: {len(latencies) / elapsed:8.1f} req/s"
+            f"  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  errors {errors}"
+        )
+
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
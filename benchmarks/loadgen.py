@@ -0,0 +1,526 @@
+"""Load-test every HTTP route of the API with a weighted request mix.
+
+Usage:
+    python -m benchmarks.loadgen [--concurrency 32] [--duration 30]
+        [--mix NAME=WEIGHT ...] [--database-url URL] [--base-url URL]
+        [--db-async] [--seed-users 200] [--rate-limits] [--output FILE]
+        [--baseline FILE] [--tolerance 0.2]
+
+Without ``--base-url``, starts a uvicorn server (one worker) on
+``--database-url``, or on a temporary SQLite database that benchmarks.seed
+fills with ``--seed-users`` users. Each of ``--concurrency`` virtual users
+logs in as a different seeded user when the database has them (registering
+a fresh one otherwise) and then runs scenarios, picked at random by weight,
+for ``--duration`` seconds. The server runs with rate limiting off unless
+``--rate-limits`` is given: every virtual user comes from one IP, so the
+login and register budgets would turn most of those requests into 429s.
+SCENARIOS holds the default, read-heavy weights;
+``--mix export=5 replay=0`` changes them.
+
+Prints throughput, p50/p95/p99 latency and errors per scenario and overall.
+``--output`` saves the run as JSON, e.g. as a baseline; ``--baseline``
+compares the run against one with benchmarks.regression and exits non-zero
+on a regression.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+
+from app.models import User, utcnow
+from benchmarks.load_db_modes import free_port, start_server, wait_until_up
+from benchmarks.regression import report
+from benchmarks.seed import SEED_EMAIL_PATTERN, SEED_PASSWORD, curl_stream, seed
+
+LOAD_PASSWORD = "load-password"
+
+EXERCISE = {
+    "exercise_type": "bicep_curl",
+    "arm_used": "left",
+    "reps_completed": 10,
+    "set_number": 1,
+    "duration": 25.0,
+    "form_quality_score": 0.85,
+}
+
+
+def pose_payload(seconds: float = 20.0) -> dict:
+    """A PoseStreamCreate body: ``seconds`` of every joint of a curl."""
+    packed = curl_stream(np.random.default_rng(0), round(seconds / 2.5), seconds)
+    return {
+        "timestamps": packed.timestamps.tolist(),
+        "joints": {
+            joint.value: {
+                "x": packed.positions[:, j, 0].tolist(),
+                "y": packed.positions[:, j, 1].tolist(),
+                "confidence": packed.positions[:, j, 3].tolist(),
+            }
+            for j, joint in enumerate(packed.joints)
+        },
+    }
+
+
+POSE = pose_payload()
+
+
+class Recorder:
+    """Latencies and error counts per scenario."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, scenario: str, seconds: float, ok: bool):
+        self.latencies[scenario].append(seconds)
+        if not ok:
+            self.errors[scenario] += 1
+
+
+class VirtualUser:
+    """One client session: its own account, token and workout data.
+
+    Scenarios time and record only the request they are about; the setup a
+    scenario needs (a fresh token after logout, a set to upload pose for)
+    goes through ``client`` directly and is not counted.
+    """
+
+    def __init__(self, client, email, password, recorder, rng, register=False):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.recorder = recorder
+        self.rng = rng
+        self.register = register
+        self.scenario = None
+        self.headers = {}
+        self.session_ids: List[int] = []
+        self.pose_set_id: Optional[int] = None
+
+    async def call(self, method: str, url: str, auth=True, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, url, headers=self.headers if auth else None, **kwargs
+            )
+        except httpx.TransportError:
+            self.recorder.record(self.scenario, time.perf_counter() - start, False)
+            return None
+        self.recorder.record(
+            self.scenario, time.perf_counter() - start, response.is_success
+        )
+        return response
+
+    async def login(self):
+        response = await self.client.post(
+            "/auth/token", data={"username": self.email, "password": self.password}
+        )
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def new_exercise_set(self) -> int:
+        response = await self.client.post(
+            f"/workouts/sessions/{self.session_ids[-1]}/exercises",
+            json=EXERCISE,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def setup(self):
+        if self.register:
+            response = await self.client.post(
+                "/auth/register", json={"email": self.email, "password": self.password}
+            )
+            response.raise_for_status()
+        await self.login()
+        page = await self.client.get(
+            "/workouts/sessions/page",
+            params={"order": "desc", "limit": 50},
+            headers=self.headers,
+        )
+        self.session_ids = [item["id"] for item in page.json()["items"]][::-1]
+        response = await self.client.post(
+            "/workouts/sessions", json={}, headers=self.headers
+        )
+        response.raise_for_status()
+        self.session_ids.append(response.json()["id"])
+        self.pose_set_id = await self.new_exercise_set()
+        response = await self.client.post(
+            f"/workouts/exercises/{self.pose_set_id}/pose",
+            json=POSE,
+            headers=self.headers,
+        )
+        response.raise_for_status()
+
+    async def run(self, scenario: str):
+        self.scenario = scenario
+        await SCENARIOS[scenario][0](self)
+
+    def any_session(self) -> int:
+        return self.rng.choice(self.session_ids)
+
+
+async def root(user):
+    await user.call("GET", "/", auth=False)
+
+
+async def health(user):
+    await user.call("GET", "/health", auth=False)
+
+
+async def health_pool(user):
+    await user.call("GET", "/health/pool", auth=False)
+
+
+async def health_cache(user):
+    await user.call("GET", "/health/cache", auth=False)
+
+
+async def metrics(user):
+    await user.call("GET", "/metrics", auth=False)
+
+
+async def register(user):
+    await user.call(
+        "POST",
+        "/auth/register",
+        auth=False,
+        json={"email": f"load-{uuid.uuid4().hex}@example.com", "password": "x"},
+    )
+
+
+async def token(user):
+    await user.call(
+        "POST",
+        "/auth/token",
+        auth=False,
+        data={"username": user.email, "password": user.password},
+    )
+
+
+async def me(user):
+    await user.call("GET", "/auth/me")
+
+
+async def logout(user):
+    # Revokes every token of the user, the virtual user's own included
+    await user.call("POST", "/auth/logout")
+    await user.login()
+
+
+async def change_password(user):
+    response = await user.call(
+        "POST",
+        "/auth/change-password",
+        json={"current_password": user.password, "new_password": user.password},
+    )
+    if response is not None and response.is_success:
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    else:
+        await user.login()
+
+
+async def create_session(user):
+    response = await user.call("POST", "/workouts/sessions", json={})
+    if response is not None and response.is_success:
+        user.session_ids.append(response.json()["id"])
+
+
+async def list_sessions(user):
+    skip = user.rng.randrange(max(len(user.session_ids) - 10, 1))
+    await user.call("GET", "/workouts/sessions", params={"skip": skip, "limit": 10})
+
+
+async def session_page(user):
+    order = user.rng.choice(["asc", "desc"])
+    await user.call(
+        "GET", "/workouts/sessions/page", params={"order": order, "limit": 20}
+    )
+
+
+async def history(user):
+    await user.call("GET", "/workouts/history", params={"limit": 10})
+
+
+async def export(user):
+    await user.call("GET", "/workouts/export")
+
+
+async def add_exercise(user):
+    await user.call(
+        "POST",
+        f"/workouts/sessions/{user.any_session()}/exercises",
+        json=dict(EXERCISE, set_number=user.rng.randint(1, 5)),
+    )
+
+
+async def add_exercises_batch(user):
+    await user.call(
+        "POST",
+        f"/workouts/sessions/{user.any_session()}/exercises/batch",
+        json=[dict(EXERCISE, set_number=n) for n in range(1, 4)],
+    )
+
+
+async def list_exercises(user):
+    await user.call("GET", f"/workouts/sessions/{user.any_session()}/exercises")
+
+
+async def personal_bests(user):
+    await user.call("GET", "/workouts/personal-bests")
+
+
+async def streak(user):
+    await user.call("GET", "/workouts/streak")
+
+
+async def progress(user):
+    since = utcnow() - timedelta(weeks=12)
+    await user.call("GET", "/workouts/progress", params={"from": since.isoformat()})
+
+
+async def pose_upload(user):
+    exercise_set_id = await user.new_exercise_set()
+    response = await user.call(
+        "POST", f"/workouts/exercises/{exercise_set_id}/pose", json=POSE
+    )
+    if response is not None and response.is_success:
+        user.pose_set_id = exercise_set_id
+
+
+async def replay(user):
+    await user.call(
+        "GET",
+        f"/workouts/exercises/{user.pose_set_id}/replay",
+        params={"max_frames": 300},
+    )
+
+
+async def analyze(user):
+    await user.call("POST", f"/workouts/exercises/{user.pose_set_id}/analyze")
+
+
+# name: (scenario, default weight). The pose WebSocket has its own benchmark,
+# benchmarks.bench_pose_stream.
+SCENARIOS = {
+    "root": (root, 0.25),
+    "health": (health, 0.5),
+    "health_pool": (health_pool, 0.25),
+    "health_cache": (health_cache, 0.25),
+    "metrics": (metrics, 0.25),
+    "register": (register, 1),
+    "token": (token, 2),
+    "me": (me, 4),
+    "logout": (logout, 0.5),
+    "change_password": (change_password, 0.5),
+    "create_session": (create_session, 3),
+    "list_sessions": (list_sessions, 8),
+    "session_page": (session_page, 8),
+    "history": (history, 6),
+    "export": (export, 0.5),
+    "add_exercise": (add_exercise, 4),
+    "add_exercises_batch": (add_exercises_batch, 2),
+    "list_exercises": (list_exercises, 8),
+    "personal_bests": (personal_bests, 10),
+    "streak": (streak, 5),
+    "progress": (progress, 5),
+    "pose_upload": (pose_upload, 1),
+    "replay": (replay, 3),
+    "analyze": (analyze, 1),
+}
+
+
+def parse_mix(overrides: List[str]) -> Dict[str, float]:
+    """Default weights with NAME=WEIGHT overrides applied; zeros dropped."""
+    mix = {name: weight for name, (_, weight) in SCENARIOS.items()}
+    for override in overrides:
+        name, _, weight = override.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(
+                f"Unknown scenario {name!r}; one of {', '.join(SCENARIOS)}"
+            )
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def run_load(
+    client, accounts, mix: Dict[str, float], duration: float, rng_seed: int = 0
+):
+    """Set up one virtual user per ``(email, password, register)`` account,
+    then run ``mix`` on all of them for ``duration`` seconds."""
+    recorder = Recorder()
+    users = [
+        VirtualUser(
+            client, email, password, recorder, random.Random(rng_seed + i), register
+        )
+        for i, (email, password, register) in enumerate(accounts)
+    ]
+    for user in users:
+        await user.setup()
+    names, weights = list(mix), list(mix.values())
+
+    async def loop(user):
+        while time.monotonic() < stop_at:
+            await user.run(user.rng.choices(names, weights)[0])
+
+    stop_at = time.monotonic() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(loop(user) for user in users))
+    return recorder, time.perf_counter() - start
+
+
+def stats(latencies: List[float], errors: int, elapsed: float) -> dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def summarize(recorder: Recorder, elapsed: float, config: dict) -> dict:
+    every = [s for latencies in recorder.latencies.values() for s in latencies]
+    return {
+        "config": config,
+        "elapsed": elapsed,
+        "total": stats(every, sum(recorder.errors.values()), elapsed),
+        "scenarios": {
+            name: stats(latencies, recorder.errors[name], elapsed)
+            for name, latencies in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def print_results(results: dict):
+    print(
+        f"{'scenario':<20}{'requests':>9}{'req/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    )
+    rows = list(results["scenarios"].items()) + [("total", results["total"])]
+    for name, row in rows:
+        print(
+            f"{name:<20}{row['requests']:>9}{row['rps']:>9.1f}{row['p50_ms']:>9.1f}"
+            f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['errors']:>8}"
+        )
+
+
+def seeded_emails(database_url: str, n: int) -> List[str]:
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            return (
+                connection.execute(
+                    select(User.email)
+                    .where(User.email.like(SEED_EMAIL_PATTERN))
+                    .order_by(func.random())
+                    .limit(n)
+                )
+                .scalars()
+                .all()
+            )
+    finally:
+        engine.dispose()
+
+
+async def drive(base_url: str, accounts, mix, duration: float, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60.0
+    ) as client:
+        await wait_until_up(client)
+        return await run_load(client, accounts, mix, duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", nargs="*", default=[], metavar="NAME=WEIGHT")
+    parser.add_argument("--database-url")
+    parser.add_argument("--base-url")
+    parser.add_argument("--db-async", action="store_true")
+    parser.add_argument("--seed-users", type=int, default=200)
+    parser.add_argument("--rate-limits", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    tmpdir = tempfile.TemporaryDirectory()
+    url = args.database_url
+    if url is None and args.base_url is None:
+        from app.create_tables import create_tables
+
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'load.db')}"
+        create_tables(url)
+        engine = create_engine(url)
+        seed(engine, users=args.seed_users, pose_sets=args.seed_users // 10)
+        engine.dispose()
+
+    emails = seeded_emails(url, args.concurrency) if url else []
+    accounts = [(email, SEED_PASSWORD, False) for email in emails]
+    accounts += [
+        (f"load-{uuid.uuid4().hex}@example.com", LOAD_PASSWORD, True)
+        for _ in range(args.concurrency - len(accounts))
+    ]
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        if not args.rate_limits:
+            os.environ["RATE_LIMIT_ENABLED"] = "false"
+        server = start_server(url, args.db_async, port)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        recorder, elapsed = asyncio.run(
+            drive(base_url, accounts, mix, args.duration, args.concurrency)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        tmpdir.cleanup()
+
+    results = summarize(
+        recorder,
+        elapsed,
+        {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "database": make_url(url).get_backend_name() if url else None,
+            "db_async": args.db_async,
+            "seeded_users": len(emails),
+            "rate_limits": args.rate_limits,
+            "mix": mix,
+        },
+    )
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            sys.exit(report(results, json.load(f), args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare a load generator run against a saved baseline run.
+
+Usage:
+    python -m benchmarks.regression RESULTS BASELINE [--tolerance 0.2]
+
+RESULTS and BASELINE are files written by ``benchmarks.loadgen --output``.
+A scenario (or the total) regresses when its p95 latency rose, or its
+throughput fell, by more than ``--tolerance`` of the baseline's, or when its
+error rate rose by more than a percentage point. Scenarios with fewer than
+MIN_REQUESTS requests in either run are too noisy to judge. Exits with
+status 1 on any regression.
+
+Baselines only compare like with like: same machine, database and options.
+Differences in the recorded configuration are printed as a warning.
+"""
+
+import argparse
+import json
+import sys
+from typing import List
+
+MIN_REQUESTS = 20
+MAX_ERROR_RATE_RISE = 0.01
+
+
+def error_rate(row: dict) -> float:
+    return row["errors"] / row["requests"] if row["requests"] else 0.0
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2) -> List[str]:
+    """The regressions of ``results`` against ``baseline``, one line each."""
+    pairs = [("total", results["total"], baseline["total"])]
+    pairs += [
+        (name, results["scenarios"].get(name), row)
+        for name, row in baseline["scenarios"].items()
+    ]
+    regressions = []
+    for name, current, base in pairs:
+        if current is None or min(current["requests"], base["requests"]) < MIN_REQUESTS:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms"
+            )
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {base['rps']:.1f} -> {current['rps']:.1f} req/s"
+            )
+        if error_rate(current) > error_rate(base) + MAX_ERROR_RATE_RISE:
+            regressions.append(
+                f"{name}: error rate {error_rate(base):.1%} -> "
+                f"{error_rate(current):.1%}"
+            )
+    return regressions
+
+
+def report(results: dict, baseline: dict, tolerance: float = 0.2) -> int:
+    """Print the comparison; returns the exit status (1 on a regression)."""
+    for key in sorted(set(results["config"]) | set(baseline["config"])):
+        ours, theirs = results["config"].get(key), baseline["config"].get(key)
+        if ours != theirs:
+            print(f"warning: {key} differs from the baseline ({ours} vs {theirs})")
+    regressions = compare(results, baseline, tolerance)
+    if not regressions:
+        print(f"No regressions beyond {tolerance:.0%} of the baseline.")
+        return 0
+    print(f"{len(regressions)} regression(s) beyond {tolerance:.0%} of the baseline:")
+    for line in regressions:
+        print(f"  {line}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results")
+    parser.add_argument("baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    with open(args.results) as f:
+        results = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    sys.exit(report(results, baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
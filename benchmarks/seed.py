@@ -0,0 +1,387 @@
+"""Seed a database with a realistic workout history at production volume.
+
+Usage:
+    python -m benchmarks.seed [--users 2000] [--weeks 52] [--pose-sets 500]
+        [--pose-storage rows] [--database-url URL] [--seed 0]
+
+Brings the schema up to date with the migrations, bulk-inserts users with
+their sessions and exercise sets, adds the pose data of a curl to
+``--pose-sets`` random sets (laid out as insert_pose_stream stores it, or as
+blobs), and rebuilds the derived tables (personal bests, weekly progress,
+streaks) as the write path would have left them. The defaults make about
+300k sessions, 770k exercise sets and 2.3M joint samples; scale with
+``--users``.
+
+Every user trains on their own schedule: a weekly frequency, a usual time of
+day, a favourite arm and a rep count that improves over the period, with
+later sets in a session tiring. They all log in with SEED_PASSWORD as
+``seed-<id>@example.com``, which is how benchmarks.loadgen finds them.
+Seeding into a database that already has data adds to it. To partition the
+pose tables on PostgreSQL, seed first and run ``python -m app.partitions
+partition`` afterwards, so the partitions cover the seeded months.
+"""
+
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.auth.auth import get_password_hash
+from app.crud import (
+    rebuild_exercise_progress,
+    rebuild_personal_bests,
+    rebuild_user_streaks,
+)
+from app.models import (
+    ArmType,
+    ExerciseSet,
+    ExerciseType,
+    JointPosition,
+    JointType,
+    PoseFrame,
+    User,
+    WorkoutSession,
+    utcnow,
+)
+from app.pose.ingest import PackedPoseStream
+from app.pose.storage import store_pose_stream
+
+SEED_PASSWORD = "seed-password"
+SEED_EMAIL = "seed-{}@example.com"
+SEED_EMAIL_PATTERN = "seed-%@example.com"
+
+ARMS = list(ArmType)
+ARM_ARRAY = np.array(ARMS, dtype=object)
+JOINTS = tuple(JointType)
+JOINT_ARRAY = np.array(JOINTS, dtype=object)
+FPS = 30
+REST_SECONDS = 90.0  # between sets
+BATCH = 200_000  # rows per insert round
+USERS_PER_REBUILD = 500
+# Inserted in this order, parents first; all but the last get explicit ids
+MODELS = (User, WorkoutSession, ExerciseSet, PoseFrame, JointPosition)
+EXPLICIT_IDS = MODELS[:-1]
+
+
+def next_ids(connection) -> dict:
+    """First free id of each table the seeder writes explicit ids into."""
+    return {
+        model.__tablename__: connection.execute(
+            select(func.coalesce(func.max(model.id), 0) + 1)
+        ).scalar()
+        for model in EXPLICIT_IDS
+    }
+
+
+def sync_sequences(connection) -> None:
+    """Move PostgreSQL's id sequences past the explicit ids just inserted."""
+    if connection.dialect.name != "postgresql":
+        return
+    for table in (model.__tablename__ for model in EXPLICIT_IDS):
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT max(id) FROM {table}))"
+        )
+
+
+def bulk_insert(connection, table, columns: dict) -> int:
+    """Insert column-wise rows through the driver: executemany, or COPY on
+    psycopg2. This skips SQLAlchemy's per-row parameter handling, most of
+    the cost of a Core executemany at this size; values still go through
+    their column's bind processor (enum names, SQLite's datetime strings)."""
+    dialect = connection.dialect
+    names = list(columns)
+    values = []
+    for name in names:
+        processor = table.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+        column = columns[name]
+        # Numbers need no processing. Other values mostly repeat (enum
+        # members, a set's created_at on every pose row): process each once.
+        if processor is not None and not isinstance(column[0], (int, float)):
+            processed = {}
+            column = [
+                (
+                    processed[v]
+                    if v in processed
+                    else processed.setdefault(v, processor(v))
+                )
+                for v in column
+            ]
+        values.append(column)
+    rows = list(zip(*values))
+
+    if dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+    else:
+        marker = "?" if dialect.paramstyle == "qmark" else "%s"
+        connection.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(names)}) "
+            f"VALUES ({', '.join([marker] * len(names))})",
+            rows,
+        )
+    return len(rows)
+
+
+def user_history(rng, user_id: int, start: datetime, days: int, ids: dict):
+    """One user's session and exercise set columns, as arrays; advances
+    ``ids``."""
+    per_week = rng.gamma(4.0, 0.75)  # three sessions a week on average
+    day = np.flatnonzero(rng.random(days) < min(per_week / 7, 1.0))
+    n = day.shape[0]
+    hour = np.clip(rng.normal(rng.normal(18, 2.5), 1, n), 5, 23)
+    session_date = np.datetime64(start, "us") + (
+        (day * 86400 + hour * 3600) * 1e6
+    ).astype("timedelta64[us]")
+
+    # Sets, with reps improving over the period and dropping with fatigue
+    n_sets = np.minimum(1 + rng.poisson(1.5, n), 6)
+    total = int(n_sets.sum())
+    first = np.cumsum(n_sets) - n_sets  # index of each session's first set
+    session = np.repeat(np.arange(n), n_sets)
+    set_number = np.arange(total) - first[session] + 1
+    base_reps, gain = rng.uniform(6, 14), rng.uniform(0, 6)
+    reps = base_reps + gain * day[session] / days + rng.normal(0, 1.5, total)
+    reps = np.clip(np.rint(reps - 0.8 * (set_number - 1)), 1, 40).astype(int)
+    speed = np.clip(rng.normal(rng.uniform(1.8, 3.2), 0.3, total), 1.0, None)
+    duration = reps * speed
+    angle_range = rng.normal(110, 12, total)
+    min_angle = rng.normal(38, 6, total)
+    arm = rng.choice(len(ARMS), total, p=rng.dirichlet(np.ones(len(ARMS))))
+
+    # Sets follow each other with a rest in between
+    ends = np.cumsum(duration + REST_SECONDS)
+    offset = ends - (duration + REST_SECONDS)
+    offset -= offset[first][session]
+    created_at = session_date[session] + (offset * 1e6).astype("timedelta64[us]")
+
+    sessions = {
+        "id": np.arange(ids["workout_sessions"], ids["workout_sessions"] + n),
+        "user_id": np.full(n, user_id),
+        "session_date": session_date,
+        "total_duration": offset[first + n_sets - 1] + duration[first + n_sets - 1],
+    }
+    sets = {
+        "id": np.arange(ids["exercise_sets"], ids["exercise_sets"] + total),
+        "session_id": sessions["id"][session],
+        "exercise_type": np.array([ExerciseType.BICEP_CURL] * total, dtype=object),
+        "arm_used": ARM_ARRAY[arm],
+        "reps_completed": reps,
+        "set_number": set_number,
+        "duration": duration,
+        "avg_angle_range": angle_range,
+        "form_quality_score": rng.beta(9, 2, total),
+        "rep_consistency_score": np.abs(rng.normal(6, 2, total)),
+        "avg_rep_speed": speed,
+        "min_angle_achieved": min_angle,
+        "max_angle_achieved": min_angle + angle_range,
+        "created_at": created_at,
+    }
+    ids["workout_sessions"] += n
+    ids["exercise_sets"] += total
+    return sessions, sets
+
+
+def curl_stream(rng, reps: int, duration: float) -> PackedPoseStream:
+    """Every joint of a seated curl: the wrist circles the elbow once per rep,
+    the rest hold still up to tracking jitter."""
+    n_frames = max(int(duration * FPS), 3)
+    timestamps = np.arange(n_frames) / FPS
+    angle = np.radians(100 + 60 * np.cos(2 * np.pi * timestamps * reps / duration))
+    resting = {
+        JointType.SHOULDER: (0.50, 0.30),
+        JointType.ELBOW: (0.50, 0.55),
+        JointType.HIP: (0.50, 0.75),
+        JointType.KNEE: (0.55, 0.85),
+        JointType.ANKLE: (0.55, 0.97),
+    }
+    positions = np.full((n_frames, len(JOINTS), 4), np.nan)
+    for j, joint in enumerate(JOINTS):
+        if joint == JointType.WRIST:
+            positions[:, j, 0] = 0.50 + 0.25 * np.sin(angle)
+            positions[:, j, 1] = 0.55 - 0.25 * np.cos(angle)
+        else:
+            positions[:, j, :2] = resting[joint]
+        positions[:, j, :2] += rng.normal(0, 0.004, (n_frames, 2))
+    positions[:, :, 3] = rng.uniform(0.8, 1.0, (n_frames, len(JOINTS)))
+    return PackedPoseStream(timestamps, np.arange(n_frames), JOINTS, positions)
+
+
+def pose_rows(packed: PackedPoseStream, set_id: int, created_at, ids: dict):
+    """``packed`` as pose_frames and joint_positions columns, the way
+    insert_pose_stream stores it; advances ``ids``."""
+    n_frames, n_joints = packed.n_frames, len(packed.joints)
+    frame_ids = np.arange(ids["pose_frames"], ids["pose_frames"] + n_frames)
+    ids["pose_frames"] += n_frames
+    flat = packed.positions.reshape(-1, 4)
+    frames = {
+        "id": frame_ids,
+        "exercise_set_id": np.full(n_frames, set_id),
+        "timestamp": packed.timestamps,
+        "frame_number": packed.frame_numbers,
+        "created_at": np.full(n_frames, np.datetime64(created_at, "us")),
+    }
+    joints = {
+        "frame_id": np.repeat(frame_ids, n_joints),
+        "joint_type": np.tile(JOINT_ARRAY, n_frames),
+        "x": flat[:, 0],
+        "y": flat[:, 1],
+        "confidence": flat[:, 3],
+        "created_at": np.full(n_frames * n_joints, np.datetime64(created_at, "us")),
+    }
+    return frames, joints
+
+
+def seed(
+    engine,
+    users: int = 2000,
+    weeks: int = 52,
+    pose_sets: int = 500,
+    pose_storage: str = "rows",
+    rng_seed: int = 0,
+) -> dict:
+    """Seed ``engine``'s database (schema already in place); returns the
+    number of rows written per table."""
+    rng = np.random.default_rng(rng_seed)
+    days = weeks * 7
+    today = utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days)
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    counts = {model.__tablename__: 0 for model in MODELS}
+    pending = {model.__tablename__: [] for model in MODELS}
+    pending_rows = 0
+
+    def add(table: str, columns: dict):
+        nonlocal pending_rows
+        pending[table].append(columns)
+        pending_rows += len(next(iter(columns.values())))
+        if pending_rows >= BATCH:
+            flush()
+
+    def flush():
+        nonlocal pending_rows
+        with engine.begin() as connection:
+            for model in MODELS:
+                chunks = pending[model.__tablename__]
+                if chunks:
+                    columns = {
+                        name: np.concatenate([c[name] for c in chunks]).tolist()
+                        for name in chunks[0]
+                    }
+                    counts[model.__tablename__] += bulk_insert(
+                        connection, model.__table__, columns
+                    )
+                    chunks.clear()
+        pending_rows = 0
+
+    with engine.begin() as connection:
+        ids = next_ids(connection)
+    first_user, first_set = ids["users"], ids["exercise_sets"]
+    for _ in range(users):
+        user_id = ids["users"]
+        ids["users"] += 1
+        sessions, sets = user_history(rng, user_id, start, days, ids)
+        joined = sessions["session_date"][0] if len(sets["id"]) else today
+        joined -= np.timedelta64(int(rng.uniform(0, 14 * 86400)), "s")
+        add(
+            "users",
+            {
+                "id": np.array([user_id]),
+                "email": np.array([SEED_EMAIL.format(user_id)], dtype=object),
+                "hashed_password": np.array([hashed_password], dtype=object),
+                "created_at": np.array([joined], dtype="datetime64[us]"),
+            },
+        )
+        add("workout_sessions", sessions)
+        add("exercise_sets", sets)
+    flush()
+
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with SessionLocal() as db:
+        chosen = db.execute(
+            select(
+                ExerciseSet.id,
+                ExerciseSet.reps_completed,
+                ExerciseSet.duration,
+                ExerciseSet.created_at,
+            )
+            .where(ExerciseSet.id >= first_set)
+            .order_by(func.random())
+            .limit(pose_sets)
+        ).all()
+        for set_id, reps, duration, created_at in chosen:
+            packed = curl_stream(rng, reps, duration)
+            if pose_storage == "blob":
+                store_pose_stream(db, set_id, packed, "blob")
+                counts["pose_blobs"] = counts.get("pose_blobs", 0) + 1
+                continue
+            frames, joints = pose_rows(packed, set_id, created_at, ids)
+            add("pose_frames", frames)
+            add("joint_positions", joints)
+        db.commit()
+    flush()
+    with engine.begin() as connection:
+        sync_sequences(connection)
+
+    with SessionLocal() as db:
+        user_ids = list(range(first_user, ids["users"]))
+        for i in range(0, len(user_ids), USERS_PER_REBUILD):
+            chunk = user_ids[i : i + USERS_PER_REBUILD]
+            rebuild_personal_bests(db, chunk)
+            rebuild_exercise_progress(db, chunk)
+            rebuild_user_streaks(db, chunk)
+            db.commit()
+    return counts
+
+
+def main():
+    from app.create_tables import create_tables
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--pose-sets", type=int, default=500)
+    parser.add_argument("--pose-storage", choices=["rows", "blob"], default="rows")
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(), "seed.db")
+        url = f"sqlite:///{path}"
+    create_tables(url)
+    engine = create_engine(url)
+    start = time.perf_counter()
+    counts = seed(
+        engine,
+        args.users,
+        args.weeks,
+        args.pose_sets,
+        args.pose_storage,
+        args.seed,
+    )
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    total = sum(counts.values())
+    for name, count in counts.items():
+        print(f"{name:<18}{count:>12,}")
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) -> {url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 # create_tables.py
 
-from app.database import engine
-from app.models import Base
+from app.create_tables import create_tables
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# Create all tables by running the migrations
+create_tables()
 
 print("Tables created successfully.")
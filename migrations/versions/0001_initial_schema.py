@@ -0,0 +1,216 @@
+"""Initial schema, as Base.metadata.create_all built it before migrations
+
+Secondary indexes for the hot queries are left to 0002, which also adds them
+to databases created with create_all. Such a database is brought under
+migrations with ``alembic stamp 0001`` followed by ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SQLAlchemy stores enum member names. Several tables share a type, so on
+# PostgreSQL the types are created once, up front, and not per table.
+ENUMS = {
+    "exercisetype": ("BICEP_CURL",),
+    "armtype": ("LEFT", "RIGHT", "BOTH"),
+    "jointtype": ("SHOULDER", "ELBOW", "WRIST", "HIP", "KNEE", "ANKLE"),
+}
+
+
+def enum(name):
+    return postgresql.ENUM(*ENUMS[name], name=name, create_type=False)
+
+
+def upgrade():
+    bind = op.get_bind()
+    for name, values in ENUMS.items():
+        sa.Enum(*values, name=name).create(bind, checkfirst=True)
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_id", "users", ["id"])
+
+    op.create_table(
+        "workout_sessions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("session_date", sa.DateTime(), nullable=True),
+        sa.Column("total_duration", sa.Float(), nullable=True),
+        sa.Column("notes", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_workout_sessions_id", "workout_sessions", ["id"])
+
+    op.create_table(
+        "exercise_sets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("exercise_type", enum("exercisetype"), nullable=False),
+        sa.Column("arm_used", enum("armtype"), nullable=False),
+        sa.Column("reps_completed", sa.Integer(), nullable=False),
+        sa.Column("set_number", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("avg_angle_range", sa.Float(), nullable=True),
+        sa.Column("form_quality_score", sa.Float(), nullable=True),
+        sa.Column("rep_consistency_score", sa.Float(), nullable=True),
+        sa.Column("avg_rep_speed", sa.Float(), nullable=True),
+        sa.Column("min_angle_achieved", sa.Float(), nullable=True),
+        sa.Column("max_angle_achieved", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["session_id"], ["workout_sessions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_exercise_sets_id", "exercise_sets", ["id"])
+
+    op.create_table(
+        "pose_frames",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("exercise_set_id", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.Float(), nullable=False),
+        sa.Column("frame_number", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["exercise_set_id"], ["exercise_sets.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_pose_frames_id", "pose_frames", ["id"])
+
+    op.create_table(
+        "joint_positions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("frame_id", sa.Integer(), nullable=False),
+        sa.Column("joint_type", enum("jointtype"), nullable=False),
+        sa.Column("x", sa.Float(), nullable=False),
+        sa.Column("y", sa.Float(), nullable=False),
+        sa.Column("z", sa.Float(), nullable=True),
+        sa.Column("confidence", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["frame_id"], ["pose_frames.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_joint_positions_id", "joint_positions", ["id"])
+
+    op.create_table(
+        "pose_blobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("exercise_set_id", sa.Integer(), nullable=False),
+        sa.Column("n_frames", sa.Integer(), nullable=False),
+        sa.Column("n_joints", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["exercise_set_id"], ["exercise_sets.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("exercise_set_id"),
+    )
+    op.create_index("ix_pose_blobs_id", "pose_blobs", ["id"])
+
+    op.create_table(
+        "personal_bests",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("exercise_type", enum("exercisetype"), nullable=False),
+        sa.Column("arm_used", enum("armtype"), nullable=False),
+        sa.Column("max_reps_single_set", sa.Integer(), nullable=True),
+        sa.Column("max_total_reps_session", sa.Integer(), nullable=True),
+        sa.Column("best_form_score", sa.Float(), nullable=True),
+        sa.Column("longest_session_duration", sa.Float(), nullable=True),
+        sa.Column("achieved_date", sa.DateTime(), nullable=True),
+        sa.Column("last_updated", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id",
+            "exercise_type",
+            "arm_used",
+            name="uq_personal_bests_user_exercise_arm",
+        ),
+    )
+    op.create_index("ix_personal_bests_id", "personal_bests", ["id"])
+
+    op.create_table(
+        "user_streaks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("current_streak", sa.Integer(), nullable=True),
+        sa.Column("longest_streak", sa.Integer(), nullable=True),
+        sa.Column("last_workout_date", sa.DateTime(), nullable=True),
+        sa.Column("streak_start_date", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id"),
+    )
+    op.create_index("ix_user_streaks_id", "user_streaks", ["id"])
+
+    op.create_table(
+        "exercise_progress",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("exercise_type", enum("exercisetype"), nullable=False),
+        sa.Column("arm_used", enum("armtype"), nullable=False),
+        sa.Column("week_start_date", sa.DateTime(), nullable=False),
+        sa.Column("total_reps", sa.Integer(), nullable=True),
+        sa.Column("total_sets", sa.Integer(), nullable=True),
+        sa.Column("total_duration", sa.Float(), nullable=True),
+        sa.Column("avg_form_score", sa.Float(), nullable=True),
+        sa.Column("workout_count", sa.Integer(), nullable=True),
+        sa.Column("form_score_sum", sa.Float(), nullable=True),
+        sa.Column("form_score_count", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id",
+            "exercise_type",
+            "arm_used",
+            "week_start_date",
+            name="uq_exercise_progress_user_exercise_arm_week",
+        ),
+    )
+    op.create_index("ix_exercise_progress_id", "exercise_progress", ["id"])
+
+    op.create_table(
+        "video_metadata",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("exercise_set_id", sa.Integer(), nullable=True),
+        sa.Column("frame_rate", sa.Float(), nullable=True),
+        sa.Column("resolution", sa.String(), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("video_url", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["exercise_set_id"], ["exercise_sets.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    for table in (
+        "video_metadata",
+        "exercise_progress",
+        "user_streaks",
+        "personal_bests",
+        "pose_blobs",
+        "joint_positions",
+        "pose_frames",
+        "exercise_sets",
+        "workout_sessions",
+        "users",
+    ):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for name, values in ENUMS.items():
+        sa.Enum(*values, name=name).drop(bind, checkfirst=True)
@@ -0,0 +1,63 @@
+"""Indexes matched to the hot queries' filter and sort columns
+
+Each index leads with the foreign key the queries filter or join on, followed
+by the column they order or range over, so a lookup is one index range scan.
+personal_bests.user_id and user_streaks.user_id are already served by their
+unique constraints' indexes. IF NOT EXISTS lets this run on databases where
+create_all already built some of them.
+
+On PostgreSQL the indexes are built CONCURRENTLY, so writes carry on while
+the pose tables are indexed.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    # Per-user session listings, ordered and paged by (session_date, id)
+    (
+        "ix_workout_sessions_user_date",
+        "workout_sessions",
+        ["user_id", "session_date", "id"],
+    ),
+    # A session's sets, in order
+    ("ix_exercise_sets_session_set", "exercise_sets", ["session_id", "set_number"]),
+    # A set's frames, or a frame range, in order
+    ("ix_pose_frames_set_frame", "pose_frames", ["exercise_set_id", "frame_number"]),
+    # A frame's joints
+    ("ix_joint_positions_frame", "joint_positions", ["frame_id"]),
+    # Per-user weekly progress, by week
+    (
+        "ix_exercise_progress_user_week",
+        "exercise_progress",
+        ["user_id", "week_start_date"],
+    ),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(
+                name, table_name=table, if_exists=True, postgresql_concurrently=True
+            )
@@ -0,0 +1,60 @@
+"""Store pose rows under their set's created_at; optionally partition them
+
+pose_frames.created_at becomes the set's created_at rather than the insert
+time, and joint_positions gets the same column, so both tables can be
+range-partitioned by month with a set's rows in one partition. With
+settings.pose_partitioning on PostgreSQL the tables are then converted to
+monthly partitions (app/partitions.py); that rewrites them, so run it in a
+maintenance window.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitions import is_partitioned, partition_pose_tables
+from config import settings
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("joint_positions") as batch_op:
+        batch_op.add_column(sa.Column("created_at", sa.DateTime(), nullable=True))
+
+    op.execute(
+        "UPDATE pose_frames SET created_at = COALESCE("
+        "(SELECT exercise_sets.created_at FROM exercise_sets "
+        "WHERE exercise_sets.id = pose_frames.exercise_set_id), "
+        "created_at, CURRENT_TIMESTAMP)"
+    )
+    op.execute(
+        "UPDATE joint_positions SET created_at = (SELECT pose_frames.created_at "
+        "FROM pose_frames WHERE pose_frames.id = joint_positions.frame_id)"
+    )
+    for table in ("pose_frames", "joint_positions"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                "created_at", existing_type=sa.DateTime(), nullable=False
+            )
+
+    bind = op.get_bind()
+    if settings.pose_partitioning and bind.dialect.name == "postgresql":
+        partition_pose_tables(bind)
+
+
+def downgrade():
+    if is_partitioned(op.get_bind()):
+        raise NotImplementedError(
+            "Copy the partitioned pose tables back into plain ones first"
+        )
+    with op.batch_alter_table("pose_frames") as batch_op:
+        batch_op.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
+    with op.batch_alter_table("joint_positions") as batch_op:
+        batch_op.drop_column("created_at")
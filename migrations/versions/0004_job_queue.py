@@ -0,0 +1,42 @@
+"""Jobs table for the derived-data queue
+
+Writes enqueue jobs here when settings.derived_data is "queue"; ``python -m
+app.worker`` claims them with SELECT ... FOR UPDATE SKIP LOCKED (see
+app/jobs.py) and deletes them once processed.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=True),
+        sa.Column("idempotency_key", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("idempotency_key"),
+    )
+    op.create_index("ix_jobs_user_id", "jobs", ["user_id"])
+    op.create_index("ix_jobs_run_after", "jobs", ["run_after"])
+
+
+def downgrade():
+    op.drop_table("jobs")
@@ -0,0 +1,104 @@
+# tests/conftest.py
+import os
+import uuid
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+# Cheap password hashes keep the suite fast; set before config is imported
+os.environ.setdefault("PASSWORD_ROUNDS", "1000")
+
+from config import Settings
+from app.database import Base, Database
+from app.kvstore import LocalRedis, RedisStore
+from app.main import create_app
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """A throwaway SQLite database with the full schema."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    session = sessionmaker(bind=db_engine, autocommit=False, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def local_redis(monkeypatch):
+    """Every RedisStore.from_url connected to one in-process LocalRedis, so
+    the redis backends run without a server."""
+    redis = LocalRedis()
+    monkeypatch.setattr(
+        RedisStore, "from_url", classmethod(lambda cls, url: cls(redis))
+    )
+    return redis
+
+
+def make_app(db_engine, **options):
+    """An app of its own for one test, serving the test database. It shares
+    no caches with other apps, so nothing cached outlives the test."""
+    config = Settings(database_url=str(db_engine.url), **options)
+    return create_app(config, database=Database(config, engine=db_engine))
+
+
+@pytest.fixture
+def test_app(db_engine):
+    app = make_app(db_engine)
+    yield app
+    app.state.password_hasher.shutdown()
+
+
+@pytest_asyncio.fixture
+async def client(test_app):
+    """An HTTP client for an app on the test database."""
+    async with AsyncClient(
+        transport=ASGITransport(app=test_app), base_url="http://test"
+    ) as ac:
+        yield ac
+
+
+@pytest.fixture
+def sync_client(test_app):
+    """A blocking client for the app, for WebSocket endpoints (httpx has no
+    WebSocket support)."""
+    with TestClient(test_app) as tc:
+        yield tc
+
+
+@pytest_asyncio.fixture
+async def async_client(db_engine):
+    """Like ``client``, but serving requests from an AsyncSession (aiosqlite)."""
+    app = make_app(db_engine, db_async=True)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+    app.state.password_hasher.shutdown()
+    await app.state.database.dispose()
+
+
+@pytest_asyncio.fixture
+async def auth_headers(client):
+    """Register a fresh user and return bearer headers for it."""
+    email = f"testuser_{uuid.uuid4().hex[:8]}@example.com"
+    password = "testpassword123"
+    await client.post("/auth/register", json={"email": email, "password": password})
+    response = await client.post(
+        "/auth/token", data={"username": email, "password": password}
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
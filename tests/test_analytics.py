@@ -0,0 +1,55 @@
+# tests/test_analytics.py
+import numpy as np
+import pytest
+
+from app.pose.analytics import compute_exercise_metrics, joint_angles
+
+
+def curl_arm(n_reps=8, fps=30.0, rep_seconds=2.0, low=40.0, high=160.0, noise=0.0):
+    """Shoulder/elbow/wrist positions for a bicep curl swinging between angles."""
+    rng = np.random.default_rng(1)
+    timestamps = np.arange(int(n_reps * rep_seconds * fps)) / fps
+    phase = 2 * np.pi * timestamps / rep_seconds
+    angle = np.radians(low + (high - low) * (1 + np.cos(phase)) / 2)
+    angle += np.radians(noise) * rng.standard_normal(timestamps.shape)
+
+    def joint(x, y):
+        return np.column_stack(
+            [x, y, np.full_like(timestamps, np.nan), np.full_like(timestamps, 0.9)]
+        )
+
+    zeros = np.zeros_like(timestamps)
+    shoulder = joint(zeros, zeros + 1.0)
+    elbow = joint(zeros, zeros)
+    wrist = joint(np.sin(angle), np.cos(angle))
+    return timestamps, shoulder, elbow, wrist
+
+
+def test_joint_angles():
+    vertex = np.zeros((2, 2))
+    proximal = np.array([[1.0, 0.0], [1.0, 0.0]])
+    distal = np.array([[0.0, 1.0], [-1.0, 0.0]])
+
+    np.testing.assert_allclose(joint_angles(proximal, vertex, distal), [90, 180])
+
+
+@pytest.mark.parametrize("noise", [0.0, 2.0])
+def test_compute_exercise_metrics(noise):
+    metrics = compute_exercise_metrics(*curl_arm(noise=noise))
+
+    assert metrics["reps_detected"] == 8
+    assert metrics["avg_rep_speed"] == pytest.approx(2.0, abs=0.1)
+    assert metrics["avg_angle_range"] == pytest.approx(120.0, abs=6.0)
+    assert metrics["min_angle_achieved"] == pytest.approx(40.0, abs=8.0)
+    assert metrics["max_angle_achieved"] == pytest.approx(160.0, abs=8.0)
+    assert 0.8 < metrics["form_quality_score"] <= 1.0
+
+
+def test_compute_exercise_metrics_without_movement():
+    timestamps, shoulder, elbow, wrist = curl_arm(low=90.0, high=95.0)
+
+    metrics = compute_exercise_metrics(timestamps, shoulder, elbow, wrist)
+
+    assert metrics["reps_detected"] == 0
+    assert metrics["avg_rep_speed"] is None
+    assert metrics["max_angle_achieved"] == pytest.approx(95.0, abs=0.5)
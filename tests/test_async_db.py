@@ -0,0 +1,78 @@
+# tests/test_async_db.py
+import pytest
+
+from tests.test_analytics import curl_arm
+from tests.test_derived import add_set, new_session
+
+
+async def register_and_login(client, email="async@example.com", password="pw123456"):
+    await client.post("/auth/register", json={"email": email, "password": password})
+    response = await client.post(
+        "/auth/token", data={"username": email, "password": password}
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_workout_flow_on_async_session(async_client):
+    headers = await register_and_login(async_client)
+
+    session_id = await new_session(async_client, headers)
+    await add_set(async_client, headers, session_id, reps_completed=12, duration=30.0)
+    await add_set(async_client, headers, session_id, set_number=2, duration=20.0)
+
+    sessions = (await async_client.get("/workouts/sessions", headers=headers)).json()
+    assert sessions[0]["total_duration"] == 50.0
+    bests = (await async_client.get("/workouts/personal-bests", headers=headers)).json()
+    assert bests[0]["max_total_reps_session"] == 22
+    streak = (await async_client.get("/workouts/streak", headers=headers)).json()
+    assert streak["current_streak"] == 1
+    history = (await async_client.get("/workouts/history", headers=headers)).json()
+    assert len(history["items"][0]["exercises"]) == 2
+
+    response = await async_client.get(
+        "/workouts/sessions/999/exercises", headers=headers
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_pose_ingest_and_analyze_on_async_session(async_client):
+    headers = await register_and_login(async_client)
+    session_id = await new_session(async_client, headers)
+    exercise_set_id = (await add_set(async_client, headers, session_id))["id"]
+
+    timestamps, *joints = curl_arm(n_reps=3)
+    stream = {
+        "timestamps": timestamps.tolist(),
+        "joints": {
+            name: {"x": joint[:, 0].tolist(), "y": joint[:, 1].tolist()}
+            for name, joint in zip(("shoulder", "elbow", "wrist"), joints)
+        },
+    }
+
+    response = await async_client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose", json=stream, headers=headers
+    )
+    assert response.status_code == 200
+    response = await async_client.post(
+        f"/workouts/exercises/{exercise_set_id}/analyze", headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["avg_angle_range"] > 0
+
+
+@pytest.mark.asyncio
+async def test_change_password_on_async_session(async_client):
+    headers = await register_and_login(async_client)
+
+    response = await async_client.post(
+        "/auth/change-password",
+        json={"current_password": "pw123456", "new_password": "newpw123"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert (await async_client.get("/auth/me", headers=headers)).status_code == 401
+    fresh = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await async_client.get("/auth/me", headers=fresh)).status_code == 200
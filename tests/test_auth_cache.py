@@ -0,0 +1,62 @@
+# tests/test_auth_cache.py
+import pytest
+from sqlalchemy import event
+
+from app.auth.auth import create_user_token
+from app.models import User
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_skip_user_lookup(client, auth_headers, db_engine):
+    await client.get("/auth/me", headers=auth_headers)  # warm the caches
+    statements = []
+    event.listen(
+        db_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    response = await client.get("/auth/me", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token(client, auth_headers):
+    assert (await client.get("/auth/me", headers=auth_headers)).status_code == 200
+
+    response = await client.post("/auth/logout", headers=auth_headers)
+
+    assert response.status_code == 204
+    assert (await client.get("/auth/me", headers=auth_headers)).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_change_password_revokes_old_tokens(client, auth_headers):
+    response = await client.post(
+        "/auth/change-password",
+        json={"current_password": "testpassword123", "new_password": "n3w-pass"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    new_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await client.get("/auth/me", headers=auth_headers)).status_code == 401
+    assert (await client.get("/auth/me", headers=new_headers)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_token_newer_than_the_cached_principal_is_accepted(
+    client, auth_headers, db_session
+):
+    assert (await client.get("/auth/me", headers=auth_headers)).status_code == 200
+    # Revoked by another worker: this one's cached principal is not dropped
+    user = db_session.query(User).one()
+    user.token_version += 1
+    db_session.commit()
+    new_headers = {"Authorization": f"Bearer {create_user_token(user)}"}
+
+    assert (await client.get("/auth/me", headers=new_headers)).status_code == 200
+    # The reload refreshed the cache, so the old token is now rejected
+    assert (await client.get("/auth/me", headers=auth_headers)).status_code == 401
@@ -0,0 +1,95 @@
+# tests/test_batch.py
+import pytest
+from sqlalchemy import event, text
+
+from app.crud import add_session_duration
+from app.models import User, WorkoutSession
+
+from tests.test_derived import new_session
+
+
+def exercise(**overrides):
+    return {
+        "exercise_type": "bicep_curl",
+        "arm_used": "left",
+        "reps_completed": 10,
+        "set_number": 1,
+        **overrides,
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_inserts_sets_in_one_statement(client, auth_headers, db_engine):
+    session_id = await new_session(client, auth_headers)
+    batch = [
+        exercise(set_number=1, reps_completed=8, duration=30.0),
+        exercise(set_number=2, reps_completed=12, duration=45.0),
+        exercise(set_number=1, arm_used="right", reps_completed=6),
+    ]
+    inserts = []
+    event.listen(
+        db_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: (
+            inserts.append(statement)
+            if statement.startswith("INSERT INTO exercise_sets")
+            else None
+        ),
+    )
+
+    response = await client.post(
+        f"/workouts/sessions/{session_id}/exercises/batch",
+        json=batch,
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    created = response.json()
+    assert [s["reps_completed"] for s in created] == [8, 12, 6]
+    assert len({s["id"] for s in created}) == 3
+    assert len(inserts) == 1
+
+    sessions = (await client.get("/workouts/sessions", headers=auth_headers)).json()
+    assert sessions[0]["total_duration"] == 75.0
+    bests = (await client.get("/workouts/personal-bests", headers=auth_headers)).json()
+    left = next(pb for pb in bests if pb["arm_used"] == "left")
+    assert left["max_reps_single_set"] == 12
+    assert left["max_total_reps_session"] == 20
+    progress = (await client.get("/workouts/progress", headers=auth_headers)).json()
+    left = next(p for p in progress if p["arm_used"] == "left")
+    assert (left["total_sets"], left["total_reps"], left["workout_count"]) == (2, 20, 1)
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_foreign_session_and_empty_list(client, auth_headers):
+    session_id = await new_session(client, auth_headers)
+
+    response = await client.post(
+        f"/workouts/sessions/{session_id + 1}/exercises/batch",
+        json=[exercise()],
+        headers=auth_headers,
+    )
+    assert response.status_code == 404
+    response = await client.post(
+        f"/workouts/sessions/{session_id}/exercises/batch",
+        json=[],
+        headers=auth_headers,
+    )
+    assert response.status_code == 422
+
+
+def test_session_duration_update_ignores_stale_reads(db_engine, db_session):
+    user = User(email="duration@example.com", hashed_password="x")
+    session = WorkoutSession(user=user, total_duration=30.0)
+    db_session.add(session)
+    db_session.commit()
+    assert session.total_duration == 30.0  # loaded, now possibly stale
+
+    # Another request adds to the total after we read it
+    with db_engine.begin() as conn:
+        conn.execute(text("UPDATE workout_sessions SET total_duration = 50.0"))
+
+    add_session_duration(db_session, session, 10.0)
+    db_session.commit()
+
+    assert session.total_duration == 60.0
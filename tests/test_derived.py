@@ -0,0 +1,239 @@
+# tests/test_derived.py
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.crud import (
+    rebuild_exercise_progress,
+    rebuild_personal_bests,
+    rebuild_user_streaks,
+    update_streak,
+    week_start,
+)
+from app.models import (
+    ExerciseProgress,
+    PersonalBest,
+    User,
+    UserStreak,
+    WorkoutSession,
+    utcnow,
+)
+
+
+async def add_set(client, headers, session_id, **overrides):
+    exercise = {
+        "exercise_type": "bicep_curl",
+        "arm_used": "left",
+        "reps_completed": 10,
+        "set_number": 1,
+        **overrides,
+    }
+    response = await client.post(
+        f"/workouts/sessions/{session_id}/exercises", json=exercise, headers=headers
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def new_session(client, headers):
+    response = await client.post("/workouts/sessions", json={}, headers=headers)
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_personal_bests_update_incrementally(client, auth_headers):
+    first = await new_session(client, auth_headers)
+    await add_set(client, auth_headers, first, reps_completed=8, duration=30.0)
+    await add_set(
+        client,
+        auth_headers,
+        first,
+        reps_completed=12,
+        set_number=2,
+        duration=40.0,
+        form_quality_score=0.7,
+    )
+    second = await new_session(client, auth_headers)
+    await add_set(
+        client, auth_headers, second, reps_completed=15, form_quality_score=0.6
+    )
+    await add_set(client, auth_headers, second, arm_used="right", reps_completed=5)
+
+    response = await client.get("/workouts/personal-bests", headers=auth_headers)
+
+    bests = {pb["arm_used"]: pb for pb in response.json()}
+    assert bests["left"]["max_reps_single_set"] == 15
+    assert bests["left"]["max_total_reps_session"] == 20
+    assert bests["left"]["best_form_score"] == pytest.approx(0.7)
+    assert bests["left"]["longest_session_duration"] == pytest.approx(70.0)
+    assert bests["right"]["max_reps_single_set"] == 5
+
+
+@pytest.mark.asyncio
+async def test_rebuild_personal_bests_matches_incremental(
+    client, auth_headers, db_session
+):
+    session_id = await new_session(client, auth_headers)
+    await add_set(client, auth_headers, session_id, reps_completed=9, duration=20.0)
+    await add_set(client, auth_headers, session_id, reps_completed=11, set_number=2)
+    incremental = [
+        (pb.max_reps_single_set, pb.max_total_reps_session, pb.longest_session_duration)
+        for pb in db_session.query(PersonalBest).all()
+    ]
+    db_session.query(PersonalBest).delete()
+    db_session.commit()
+
+    rebuild_personal_bests(db_session)
+    db_session.commit()
+
+    rebuilt = [
+        (pb.max_reps_single_set, pb.max_total_reps_session, pb.longest_session_duration)
+        for pb in db_session.query(PersonalBest).all()
+    ]
+    assert rebuilt == incremental == [(11, 20, 20.0)]
+
+
+@pytest.mark.asyncio
+async def test_weekly_progress_rollup(client, auth_headers, db_session):
+    for form_scores in ([0.5, 0.7], [0.9]):
+        session_id = await new_session(client, auth_headers)
+        for number, score in enumerate(form_scores, start=1):
+            await add_set(
+                client,
+                auth_headers,
+                session_id,
+                set_number=number,
+                duration=10.0,
+                form_quality_score=score,
+            )
+        await add_set(client, auth_headers, session_id, set_number=9)
+
+    response = await client.get(
+        "/workouts/progress",
+        params={"from": utcnow().isoformat(), "arm_used": "left"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    [week] = response.json()
+    assert week["week_start_date"] == week_start(utcnow()).isoformat()
+    assert week["total_reps"] == 50
+    assert week["total_sets"] == 5
+    assert week["total_duration"] == pytest.approx(30.0)
+    assert week["avg_form_score"] == pytest.approx(0.7)
+    assert week["workout_count"] == 2
+
+    db_session.query(ExerciseProgress).delete()
+    db_session.commit()
+    rebuild_exercise_progress(db_session)
+    db_session.commit()
+    rebuilt = await client.get("/workouts/progress", headers=auth_headers)
+    assert rebuilt.json()[0] | {"id": week["id"]} == week
+
+
+def add_sessions(db_session, user_id, dates):
+    tz = ZoneInfo("UTC")
+    for moment in dates:
+        session = WorkoutSession(user_id=user_id, session_date=moment)
+        db_session.add(session)
+        db_session.flush()
+        update_streak(db_session, session, tz)
+    db_session.commit()
+
+
+def test_streak_updates_and_rebuild(db_session):
+    user = User(email="streak@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.flush()
+    day = datetime(2026, 3, 2, 9, 0)
+    add_sessions(
+        db_session,
+        user.id,
+        [
+            day,
+            day + timedelta(days=1),
+            day + timedelta(days=1, hours=5),  # same day twice
+            day + timedelta(days=2),
+            day + timedelta(days=5),
+            day + timedelta(days=6),
+        ],
+    )
+
+    streak = db_session.query(UserStreak).one()
+    incremental = (
+        streak.current_streak,
+        streak.longest_streak,
+        streak.last_workout_date,
+        streak.streak_start_date,
+    )
+    assert incremental == (
+        2,
+        3,
+        day + timedelta(days=6),
+        day + timedelta(days=5),
+    )
+
+    db_session.query(UserStreak).delete()
+    db_session.commit()
+    rebuild_user_streaks(db_session)
+    db_session.commit()
+    streak = db_session.query(UserStreak).one()
+    assert (
+        streak.current_streak,
+        streak.longest_streak,
+        streak.last_workout_date,
+        streak.streak_start_date,
+    ) == incremental
+
+
+def test_streak_day_boundary_follows_timezone(db_session):
+    user = User(email="tz@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.flush()
+    # 23:30 and 00:30 UTC are the same day in New York
+    for moment in (datetime(2026, 3, 2, 23, 30), datetime(2026, 3, 3, 0, 30)):
+        session = WorkoutSession(user_id=user.id, session_date=moment)
+        db_session.add(session)
+        db_session.flush()
+        update_streak(db_session, session, ZoneInfo("America/New_York"))
+
+    assert db_session.query(UserStreak).one().current_streak == 1
+
+
+def test_timestamps_are_stored_in_utc_on_any_host(db_session, monkeypatch):
+    # A host clock far from UTC
+    monkeypatch.setenv("TZ", "Pacific/Kiritimati")
+    time.tzset()
+    try:
+        user = User(email="host@example.com", hashed_password="x")
+        db_session.add(user)
+        db_session.flush()
+        session = WorkoutSession(user_id=user.id)
+        db_session.add(session)
+        db_session.flush()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    utc = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert abs(session.session_date - utc) < timedelta(minutes=1)
+
+
+@pytest.mark.asyncio
+async def test_streak_endpoint(client, auth_headers):
+    assert (
+        await client.get("/workouts/streak", headers=auth_headers)
+    ).status_code == 404
+    await client.post(
+        "/workouts/sessions", json={"timezone": "Europe/Berlin"}, headers=auth_headers
+    )
+
+    response = await client.get(
+        "/workouts/streak", params={"timezone": "Europe/Berlin"}, headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["current_streak"] == 1
+    assert response.json()["longest_streak"] == 1
@@ -0,0 +1,91 @@
+# tests/test_export.py
+import csv
+import io
+import json
+
+import pytest
+
+from app.export import export_history
+from tests.test_derived import add_set, new_session
+from tests.test_pose import make_pose_stream
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson(client, auth_headers):
+    first = await new_session(client, auth_headers)
+    await add_set(client, auth_headers, first, reps_completed=8)
+    await add_set(client, auth_headers, first, set_number=2, duration=30.0)
+    empty = await new_session(client, auth_headers)
+
+    response = await client.get("/workouts/export", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "physiobuddy-history.ndjson" in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["session_id"], row["set_number"]) for row in rows] == [
+        (first, 1),
+        (first, 2),
+        (empty, None),
+    ]
+    assert rows[0]["exercise_type"] == "bicep_curl"
+    assert rows[0]["reps_completed"] == 8
+    assert rows[1]["duration"] == 30.0
+
+
+@pytest.mark.asyncio
+async def test_export_pose_csv_covers_both_storage_backends(client, auth_headers):
+    session_id = await new_session(client, auth_headers)
+    set_ids = []
+    for set_number, storage in ((1, "rows"), (2, "blob")):
+        exercise_set = await add_set(
+            client, auth_headers, session_id, set_number=set_number
+        )
+        set_ids.append(exercise_set["id"])
+        await client.post(
+            f"/workouts/exercises/{exercise_set['id']}/pose",
+            params={"storage": storage},
+            json=make_pose_stream(n_frames=30),
+            headers=auth_headers,
+        )
+
+    response = await client.get(
+        "/workouts/export", params={"format": "csv", "pose": True}, headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 2 * 30 * 3
+    for exercise_set_id in set_ids:
+        samples = [r for r in rows if r["exercise_set_id"] == str(exercise_set_id)]
+        assert [r["joint"] for r in samples[:3]] == ["shoulder", "elbow", "wrist"]
+        assert samples[-1]["frame_number"] == "29"
+        assert float(samples[3]["x"]) == pytest.approx(0.001)
+        assert samples[0]["z"] == ""
+
+
+@pytest.mark.asyncio
+async def test_export_parquet(client, auth_headers, db_engine):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    for _ in range(3):
+        session_id = await new_session(client, auth_headers)
+        for set_number in (1, 2, 3):
+            await add_set(client, auth_headers, session_id, set_number=set_number)
+
+    response = await client.get(
+        "/workouts/export", params={"format": "parquet"}, headers=auth_headers
+    )
+    user_id = (await client.get("/auth/me", headers=auth_headers)).json()["id"]
+    # Small batches: one row group per batch
+    chunks = list(export_history(db_engine, user_id, "parquet", False, batch_rows=4))
+
+    assert response.status_code == 200
+    table = parquet.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 9
+    assert table.column("set_number").to_pylist() == [1, 2, 3] * 3
+    assert table.column("arm_used").to_pylist() == ["left"] * 9
+    assert str(table.schema.field("session_date").type) == "timestamp[us]"
+    streamed = parquet.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert streamed.metadata.num_row_groups == 3
+    assert streamed.read().equals(table)
@@ -0,0 +1,72 @@
+# tests/test_hashing.py
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.auth.hashing import crypt_context
+from app.models import User
+from tests.conftest import make_app
+
+
+async def register(client, email="hash@example.com", password="pw123456"):
+    response = await client.post(
+        "/auth/register", json={"email": email, "password": password}
+    )
+    assert response.status_code == 200
+    return email, password
+
+
+async def login(client, email, password):
+    return await client.post(
+        "/auth/token", data={"username": email, "password": password}
+    )
+
+
+def client_for(app):
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def stored_hash(db_session, email):
+    db_session.expire_all()
+    return db_session.query(User).filter(User.email == email).one().hashed_password
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_when_rounds_change(client, db_engine, db_session):
+    email, password = await register(client)
+    old_hash = stored_hash(db_session, email)
+
+    # The same database, served with the new setting
+    async with client_for(make_app(db_engine, password_rounds=2000)) as upgraded:
+        assert (await login(upgraded, email, password)).status_code == 200
+
+        new_hash = stored_hash(db_session, email)
+        assert new_hash != old_hash
+        assert "rounds=2000" in new_hash
+        assert not crypt_context(("sha256_crypt",), 2000).needs_update(new_hash)
+        # Already current, so the next login leaves it alone
+        assert (await login(upgraded, email, password)).status_code == 200
+        assert stored_hash(db_session, email) == new_hash
+
+
+@pytest.mark.asyncio
+async def test_login_accepts_and_upgrades_deprecated_scheme(db_engine, db_session):
+    async with client_for(make_app(db_engine, password_schemes=["md5_crypt"])) as old:
+        email, password = await register(old)
+    assert stored_hash(db_session, email).startswith("$1$")
+
+    app = make_app(db_engine, password_schemes=["sha256_crypt", "md5_crypt"])
+    async with client_for(app) as client:
+        assert (await login(client, email, password)).status_code == 200
+        assert stored_hash(db_session, email).startswith("$5$")
+        assert (await login(client, email, "wrong")).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_saturated_hashing_pool_returns_503(client, test_app):
+    email, password = await register(client)
+    test_app.state.password_hasher.max_pending = 0
+
+    response = await login(client, email, password)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
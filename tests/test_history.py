@@ -0,0 +1,78 @@
+# tests/test_history.py
+import pytest
+from sqlalchemy import event
+
+from tests.test_derived import add_set, new_session
+
+
+async def seed_history(client, headers, n_sessions):
+    session_ids = []
+    for _ in range(n_sessions):
+        session_id = await new_session(client, headers)
+        await add_set(client, headers, session_id, reps_completed=8)
+        await add_set(client, headers, session_id, set_number=2, duration=30.0)
+        session_ids.append(session_id)
+    return session_ids
+
+
+async def count_history_queries(client, headers, db_engine, **params):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        response = await client.get("/workouts/history", params=params, headers=headers)
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    return response.json(), len(statements)
+
+
+@pytest.mark.asyncio
+async def test_history_loads_sessions_and_sets_in_two_queries(
+    client, auth_headers, db_engine
+):
+    session_ids = await seed_history(client, auth_headers, 3)
+
+    small, small_count = await count_history_queries(
+        client, auth_headers, db_engine, limit=1
+    )
+    page, count = await count_history_queries(client, auth_headers, db_engine)
+
+    assert count == small_count == 2
+    assert [s["id"] for s in page["items"]] == session_ids[::-1]
+    assert [len(s["exercises"]) for s in page["items"]] == [2, 2, 2]
+    assert page["items"][0]["exercises"][0]["exercise_type"] == "bicep_curl"
+    assert page["next_cursor"] is None
+    assert small["next_cursor"] is not None
+
+
+@pytest.mark.asyncio
+async def test_history_projects_exercise_fields(client, auth_headers, db_engine):
+    await seed_history(client, auth_headers, 2)
+
+    page, count = await count_history_queries(
+        client, auth_headers, db_engine, fields="reps_completed,duration"
+    )
+
+    assert count == 2
+    exercises = page["items"][0]["exercises"]
+    assert exercises[0] == {
+        "id": exercises[0]["id"],
+        "reps_completed": 8,
+        "duration": None,
+    }
+    assert exercises[1]["duration"] == 30.0
+
+
+@pytest.mark.asyncio
+async def test_history_rejects_unknown_fields(client, auth_headers):
+    response = await client.get(
+        "/workouts/history",
+        params={"fields": "reps_completed,password"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 422
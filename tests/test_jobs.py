@@ -0,0 +1,170 @@
+# tests/test_jobs.py
+import pytest
+
+from app import jobs
+from app.jobs import enqueue, queue_stats, run_once
+from app.kvstore import RedisStore
+from app.models import ExerciseSet, Job, PersonalBest, User, utcnow
+from app.worker import run_worker
+from tests.conftest import make_app
+from tests.test_derived import add_set, new_session
+from tests.test_analytics import curl_arm
+
+
+@pytest.fixture
+def test_app(db_engine, local_redis):
+    # The worker's invalidations reach the API through the shared cache
+    return make_app(
+        db_engine,
+        derived_data="queue",
+        response_cache_backend="redis",
+        redis_url="redis://localhost",
+    )
+
+
+def test_queued_derived_data_needs_a_shared_response_cache(db_engine, test_app):
+    with pytest.raises(ValueError, match="response_cache_backend='redis'"):
+        make_app(db_engine, derived_data="queue")
+    # The cache the app uses is the one its settings name
+    assert isinstance(test_app.state.response_cache.store, RedisStore)
+
+
+@pytest.mark.asyncio
+async def test_the_worker_needs_a_shared_response_cache(db_engine):
+    database = make_app(db_engine).state.database
+    with pytest.raises(ValueError, match="response_cache_backend='redis'"):
+        await run_worker(database, 100, 0.0, once=True)
+
+
+@pytest.mark.asyncio
+async def test_writes_are_recomputed_once_per_user(
+    client, auth_headers, test_app, db_session
+):
+    sessions = [await new_session(client, auth_headers) for _ in range(2)]
+    await add_set(client, auth_headers, sessions[0], reps_completed=8)
+    await add_set(client, auth_headers, sessions[1], reps_completed=12)
+    await client.post(
+        f"/workouts/sessions/{sessions[1]}/exercises/batch",
+        json=[
+            {
+                "exercise_type": "bicep_curl",
+                "arm_used": "left",
+                "reps_completed": 9,
+                "set_number": n,
+            }
+            for n in (2, 3)
+        ],
+        headers=auth_headers,
+    )
+
+    # Nothing derived until the worker runs
+    response = await client.get("/workouts/personal-bests", headers=auth_headers)
+    assert response.json() == []
+    assert (await client.get("/health/queue")).json()["depth"] == 5
+    metrics = (await client.get("/metrics")).text
+    assert "physiobuddy_job_queue_depth 5" in metrics
+
+    assert await run_worker(test_app.state.database, 100, 0.0, once=True) == 5
+
+    # The worker invalidated the cached empty list
+    response = await client.get("/workouts/personal-bests", headers=auth_headers)
+    (best,) = response.json()
+    assert best["max_reps_single_set"] == 12
+    assert best["max_total_reps_session"] == 30
+    response = await client.get("/workouts/streak", headers=auth_headers)
+    assert response.json()["current_streak"] == 1
+    assert queue_stats(db_session) == {
+        "depth": 0,
+        "ready": 0,
+        "retrying": 0,
+        "oldest_age_seconds": 0.0,
+    }
+
+
+def test_a_queued_key_is_not_queued_again(db_session):
+    user = User(email="jobs@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.flush()
+    for _ in range(2):
+        enqueue(db_session, "derived", user.id, "session:1")
+    enqueue(db_session, "derived", user.id, "session:2")
+    db_session.commit()
+
+    assert db_session.query(Job).count() == 2
+    assert run_once(db_session) == {user.id: 2}
+    # Done jobs are deleted, so the key can be queued again
+    enqueue(db_session, "derived", user.id, "session:1")
+    assert db_session.query(Job).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_pose_uploads_are_analyzed_before_the_rebuild(
+    client, auth_headers, db_session
+):
+    session_id = await new_session(client, auth_headers)
+    exercise_set = await add_set(client, auth_headers, session_id)
+    timestamps, shoulder, elbow, wrist = curl_arm(n_reps=5)
+    stream = {
+        "timestamps": timestamps.tolist(),
+        "joints": {
+            name: {
+                "x": joint[:, 0].tolist(),
+                "y": joint[:, 1].tolist(),
+                "confidence": joint[:, 3].tolist(),
+            }
+            for name, joint in (
+                ("shoulder", shoulder),
+                ("elbow", elbow),
+                ("wrist", wrist),
+            )
+        },
+    }
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set['id']}/pose",
+        json=stream,
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    assert sorted(job.kind for job in db_session.query(Job)) == [
+        "analyze",
+        "derived",
+        "derived",
+    ]
+    assert sum(run_once(db_session).values()) == 3
+    analyzed = db_session.get(ExerciseSet, exercise_set["id"])
+    assert analyzed.form_quality_score > 0.8
+    # The bests include the score computed in the same batch
+    (best,) = db_session.query(PersonalBest).all()
+    assert best.best_form_score == analyzed.form_quality_score
+
+
+def test_failing_jobs_are_retried_later_without_holding_back_others(
+    db_session, monkeypatch
+):
+    users = [User(email=f"u{i}@example.com", hashed_password="x") for i in range(2)]
+    db_session.add_all(users)
+    db_session.flush()
+    failing, healthy = users[0].id, users[1].id
+    for user_id in (failing, healthy):
+        enqueue(db_session, "derived", user_id, f"user:{user_id}")
+    db_session.commit()
+
+    rebuild = jobs.rebuild_user_streaks
+
+    def rebuild_user_streaks(db, user_ids):
+        if failing in user_ids:
+            raise RuntimeError("boom")
+        return rebuild(db, user_ids)
+
+    monkeypatch.setattr(jobs, "rebuild_user_streaks", rebuild_user_streaks)
+
+    assert run_once(db_session) == {failing: 0, healthy: 1}
+    (job,) = db_session.query(Job).all()
+    assert job.user_id == failing and job.attempts == 1
+    assert job.run_after > utcnow()
+    assert "boom" in job.last_error
+    stats = queue_stats(db_session)
+    assert (stats["depth"], stats["ready"], stats["retrying"]) == (1, 0, 1)
+    # Not ready yet
+    assert run_once(db_session) == {}
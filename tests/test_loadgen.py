@@ -0,0 +1,76 @@
+# tests/test_loadgen.py
+import random
+
+import pytest
+from sqlalchemy import func
+
+from app.models import ExerciseSet, PersonalBest, PoseFrame, User, WorkoutSession
+from benchmarks.loadgen import SCENARIOS, Recorder, VirtualUser, summarize
+from benchmarks.regression import compare
+from benchmarks.seed import SEED_EMAIL, SEED_PASSWORD, seed
+
+
+def test_seed_builds_a_consistent_history(db_engine, db_session):
+    counts = seed(db_engine, users=3, weeks=4, pose_sets=2)
+
+    assert counts["users"] == db_session.query(User).count() == 3
+    assert counts["workout_sessions"] == db_session.query(WorkoutSession).count()
+    assert counts["exercise_sets"] == db_session.query(ExerciseSet).count()
+    for session in db_session.query(WorkoutSession):
+        sets = db_session.query(ExerciseSet).filter_by(session_id=session.id).all()
+        assert sorted(s.set_number for s in sets) == list(range(1, len(sets) + 1))
+        assert min(s.created_at for s in sets) == session.session_date
+        assert session.total_duration >= sum(s.duration for s in sets)
+    posed = db_session.query(PoseFrame.exercise_set_id).distinct().count()
+    assert posed == 2
+    frame_keys = (
+        db_session.query(func.count())
+        .select_from(PoseFrame)
+        .join(ExerciseSet)
+        .filter(PoseFrame.created_at != ExerciseSet.created_at)
+        .scalar()
+    )
+    assert frame_keys == 0
+    users_with_sets = db_session.query(
+        func.count(func.distinct(WorkoutSession.user_id))
+    ).scalar()
+    users_with_bests = db_session.query(
+        func.count(func.distinct(PersonalBest.user_id))
+    ).scalar()
+    assert users_with_bests == users_with_sets
+
+
+@pytest.mark.asyncio
+async def test_every_scenario_succeeds(client, db_engine):
+    seed(db_engine, users=1, weeks=4, pose_sets=0)
+    recorder = Recorder()
+    user = VirtualUser(
+        client, SEED_EMAIL.format(1), SEED_PASSWORD, recorder, random.Random(0)
+    )
+    await user.setup()
+
+    for scenario in SCENARIOS:
+        await user.run(scenario)
+
+    assert sorted(recorder.latencies) == sorted(SCENARIOS)
+    assert dict(recorder.errors) == {}
+
+
+def test_compare_flags_regressions():
+    recorder = Recorder()
+    for _ in range(100):
+        recorder.record("history", 0.010, True)
+        recorder.record("token", 0.100, True)
+    baseline = summarize(recorder, 10.0, {})
+    for _ in range(100):
+        recorder.record("history", 0.050, True)
+        recorder.record("token", 0.100, False)
+    results = summarize(recorder, 20.0, {})
+
+    assert compare(baseline, baseline) == []
+    regressions = compare(results, baseline, tolerance=0.2)
+    assert regressions == [
+        "total: error rate 0.0% -> 25.0%",
+        "history: p95 10.0 -> 50.0 ms",
+        "token: error rate 0.0% -> 50.0%",
+    ]
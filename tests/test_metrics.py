@@ -0,0 +1,90 @@
+# tests/test_metrics.py
+import re
+
+import pytest
+
+from httpx import ASGITransport, AsyncClient
+
+from app.metrics import instrument_engine, request_metrics
+from tests.conftest import make_app
+from tests.test_derived import add_set, new_session
+
+
+@pytest.fixture
+def metrics(db_engine):
+    """Request metrics from a clean slate, counting the test database's SQL."""
+    instrument_engine(db_engine)
+    request_metrics.reset()
+    yield request_metrics
+    request_metrics.reset()
+
+
+@pytest.fixture
+def test_app(db_engine):
+    """Server-Timing is opt-in; the app under test turns it on."""
+    return make_app(db_engine, server_timing=True)
+
+
+def samples(text):
+    """{'name{labels}': value} for every sample line of a metrics page."""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if not line.startswith("#")
+    }
+
+
+@pytest.mark.asyncio
+async def test_metrics_per_route_template(client, auth_headers, metrics):
+    session_id = await new_session(client, auth_headers)
+    for set_number in (1, 2):
+        await add_set(client, auth_headers, session_id, set_number=set_number)
+    await client.get("/workouts/sessions/999999/exercises", headers=auth_headers)
+    await client.get("/no/such/path")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    values = samples(response.text)
+    labels = 'method="POST",route="/workouts/sessions/{session_id}/exercises"'
+    assert values[f'physiobuddy_http_requests_total{{{labels},status="200"}}'] == 2
+    assert values[f"physiobuddy_http_request_duration_seconds_count{{{labels}}}"] == 2
+    assert (
+        values[
+            f'physiobuddy_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'
+        ]
+        == 2
+    )
+    assert values[f"physiobuddy_db_statements_total{{{labels}}}"] >= 2
+    assert values[f"physiobuddy_db_duration_seconds_total{{{labels}}}"] > 0
+    listing = 'method="GET",route="/workouts/sessions/{session_id}/exercises"'
+    assert values[f'physiobuddy_http_requests_total{{{listing},status="404"}}'] == 1
+    unmatched = 'method="GET",route="<unmatched>",status="404"'
+    assert values[f"physiobuddy_http_requests_total{{{unmatched}}}"] == 1
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(client, auth_headers, metrics):
+    response = await client.get("/workouts/sessions", headers=auth_headers)
+
+    match = re.fullmatch(
+        r'app;dur=([\d.]+), db;dur=([\d.]+);desc="(\d+) queries"',
+        response.headers["server-timing"],
+    )
+    assert match
+    app_ms, db_ms, queries = match.groups()
+    assert int(queries) >= 1
+    assert 0 < float(db_ms) <= float(app_ms)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_is_off_by_default(db_engine):
+    app = make_app(db_engine)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/health")
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
@@ -0,0 +1,121 @@
+# tests/test_partitions.py
+from datetime import datetime
+
+import pytest
+
+from app.models import ExerciseSet, JointPosition, PoseFrame
+from app.partitions import create_partition_sql, months, partition_sql, rotate
+from tests.test_pose import create_exercise_set, make_pose_stream
+
+
+async def set_with_pose(client, headers):
+    exercise_set_id = await create_exercise_set(client, headers)
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        params={"storage": "rows"},
+        json=make_pose_stream(n_frames=30),
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return exercise_set_id
+
+
+def backdate(db, exercise_set_id, created_at):
+    """Move a set and its pose rows to an earlier month."""
+    frame_ids = db.query(PoseFrame.id).filter(
+        PoseFrame.exercise_set_id == exercise_set_id
+    )
+    db.query(JointPosition).filter(JointPosition.frame_id.in_(frame_ids)).update(
+        {"created_at": created_at}, synchronize_session=False
+    )
+    db.query(PoseFrame).filter(PoseFrame.exercise_set_id == exercise_set_id).update(
+        {"created_at": created_at}, synchronize_session=False
+    )
+    db.query(ExerciseSet).filter(ExerciseSet.id == exercise_set_id).update(
+        {"created_at": created_at}, synchronize_session=False
+    )
+    db.commit()
+
+
+def test_partition_sql():
+    assert [
+        m.strftime("%Y-%m")
+        for m in months(datetime(2025, 11, 30), datetime(2026, 2, 1))
+    ] == [
+        "2025-11",
+        "2025-12",
+        "2026-01",
+        "2026-02",
+    ]
+    assert create_partition_sql("pose_frames", datetime(2025, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS pose_frames_y2025m12 PARTITION OF pose_frames "
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+    )
+    statements = partition_sql(datetime(2025, 12, 5), datetime(2026, 1, 5))
+    assert create_partition_sql("joint_positions", datetime(2026, 1, 1)) in statements
+    assert statements.index("DROP TABLE joint_positions_unpartitioned") < (
+        statements.index("DROP TABLE pose_frames_unpartitioned")
+    )
+
+
+@pytest.mark.asyncio
+async def test_pose_rows_carry_their_set_created_at(client, auth_headers, db_session):
+    exercise_set_id = await set_with_pose(client, auth_headers)
+
+    created_at = db_session.get(ExerciseSet, exercise_set_id).created_at
+    frame_keys = {
+        key
+        for (key,) in db_session.query(PoseFrame.created_at).filter(
+            PoseFrame.exercise_set_id == exercise_set_id
+        )
+    }
+    joint_keys = {
+        key
+        for (key,) in db_session.query(JointPosition.created_at)
+        .join(PoseFrame)
+        .filter(PoseFrame.exercise_set_id == exercise_set_id)
+    }
+    assert frame_keys == joint_keys == {created_at}
+
+
+@pytest.mark.asyncio
+async def test_rotate_deletes_expired_rows_without_partitions(
+    client, auth_headers, db_session, db_engine
+):
+    expired = await set_with_pose(client, auth_headers)
+    kept = await set_with_pose(client, auth_headers)
+    backdate(db_session, expired, datetime(2025, 10, 31, 23, 59))
+    backdate(db_session, kept, datetime(2025, 11, 1))
+
+    with db_engine.begin() as connection:
+        result = rotate(connection, today=datetime(2026, 10, 18), retention_months=12)
+
+    assert result == {"created": [], "dropped": [], "frames_deleted": 30}
+    assert db_session.query(JointPosition).count() == 30 * 3
+    expired_replay = await client.get(
+        f"/workouts/exercises/{expired}/replay", headers=auth_headers
+    )
+    kept_replay = await client.get(
+        f"/workouts/exercises/{kept}/replay", headers=auth_headers
+    )
+    assert expired_replay.status_code == 404
+    assert kept_replay.json()["frames_in_range"] == 30
+
+
+@pytest.mark.asyncio
+async def test_sets_past_retention_take_no_pose_rows(
+    client, auth_headers, db_session, test_app
+):
+    test_app.state.settings.pose_retention_months = 12
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+    backdate(db_session, exercise_set_id, datetime(2020, 1, 1))
+
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        params={"storage": "rows"},
+        json=make_pose_stream(n_frames=30),
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 410
+    assert db_session.query(PoseFrame).count() == 0
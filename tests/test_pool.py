@@ -0,0 +1,50 @@
+# tests/test_pool.py
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from config import Settings
+from app.main import create_app
+from app.pool import pool_status, timed_pool_class
+
+
+def test_timed_pool_records_checkouts_holds_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=timed_pool_class(QueuePool),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        assert pool_status(engine)["checked_out"] == 1
+
+    status = pool_status(engine)
+    assert status["pool"] == "TimedQueuePool"
+    assert status["checkouts"] == 1
+    assert status["timeouts"] == 1
+    assert status["wait_ms_max"] >= 50
+    assert status["hold_ms_max"] >= 50
+    assert status["checked_out"] == 0
+
+    # Stats belong to the pool class, so they survive dispose()
+    engine.dispose()
+    assert pool_status(engine)["checkouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_health_endpoint(db_engine):
+    # An app that creates its own engine, with the configured (timed) pool
+    app = create_app(Settings(database_url=str(db_engine.url)))
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/health/pool")
+    await app.state.database.dispose()
+
+    assert response.status_code == 200
+    assert {"pool", "checkouts", "wait_ms_p99"} <= response.json()["sync"].keys()
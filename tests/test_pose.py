@@ -0,0 +1,252 @@
+# tests/test_pose.py
+import numpy as np
+import pytest
+
+from app.models import JointPosition, JointType, PoseBlob, PoseFrame
+from app.pose.storage import read_pose_stream
+from tests.test_analytics import curl_arm
+
+
+def make_pose_stream(n_frames=90, joints=("shoulder", "elbow", "wrist")):
+    timestamps = [i / 30 for i in range(n_frames)]
+    return {
+        "timestamps": timestamps,
+        "joints": {
+            joint: {
+                "x": [0.1 * j + 0.001 * i for i in range(n_frames)],
+                "y": [0.2 * j for _ in range(n_frames)],
+                "confidence": [0.9] * n_frames,
+            }
+            for j, joint in enumerate(joints)
+        },
+    }
+
+
+async def create_exercise_set(client, headers):
+    session = await client.post("/workouts/sessions", json={}, headers=headers)
+    exercise = await client.post(
+        f"/workouts/sessions/{session.json()['id']}/exercises",
+        json={
+            "exercise_type": "bicep_curl",
+            "arm_used": "left",
+            "reps_completed": 10,
+            "set_number": 1,
+        },
+        headers=headers,
+    )
+    return exercise.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_pose_stream(client, auth_headers, db_session):
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        json=make_pose_stream(),
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "exercise_set_id": exercise_set_id,
+        "frames_inserted": 90,
+        "joint_positions_inserted": 270,
+    }
+    assert db_session.query(PoseFrame).count() == 90
+    joint = db_session.query(JointPosition).order_by(JointPosition.id).first()
+    assert joint.frame.frame_number == 0
+    assert joint.z is None
+    assert joint.confidence == pytest.approx(0.9)
+
+
+@pytest.mark.asyncio
+async def test_ingest_pose_stream_rejects_ragged_columns(client, auth_headers):
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+    stream = make_pose_stream()
+    stream["joints"]["elbow"]["x"].pop()
+
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        json=stream,
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 422
+    assert "elbow.x" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_pose_stream_rejects_frame_numbers_beyond_int32(
+    client, auth_headers
+):
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+    stream = make_pose_stream(n_frames=2)
+    stream["frame_numbers"] = [0, 2**31]
+
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        params={"storage": "blob"},
+        json=stream,
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_ingest_pose_stream_requires_ownership(client, auth_headers):
+    response = await client.post(
+        "/workouts/exercises/999/pose",
+        json=make_pose_stream(),
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_pose_storage_is_the_apps_setting(
+    client, auth_headers, db_session, test_app
+):
+    test_app.state.settings.pose_storage = "blob"
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        json=make_pose_stream(n_frames=30),
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert db_session.query(PoseBlob).count() == 1
+    assert db_session.query(PoseFrame).count() == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("storage", ["rows", "blob"])
+async def test_ingest_pose_stream_rejects_a_second_upload(
+    client, auth_headers, db_session, storage
+):
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+    for expected in (200, 409):
+        response = await client.post(
+            f"/workouts/exercises/{exercise_set_id}/pose",
+            params={"storage": storage},
+            json=make_pose_stream(n_frames=30),
+            headers=auth_headers,
+        )
+        assert response.status_code == expected
+
+    assert db_session.query(PoseFrame).count() == (30 if storage == "rows" else 0)
+
+
+@pytest.mark.asyncio
+async def test_blob_and_row_storage_read_back_the_same_slice(
+    client, auth_headers, db_session
+):
+    stream = make_pose_stream()
+    set_ids = {}
+    for storage in ("rows", "blob"):
+        set_ids[storage] = await create_exercise_set(client, auth_headers)
+        response = await client.post(
+            f"/workouts/exercises/{set_ids[storage]}/pose",
+            params={"storage": storage},
+            json=stream,
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+    rows = read_pose_stream(
+        db_session, set_ids["rows"], 10, 20, [JointType.ELBOW], storage="rows"
+    )
+    blob = read_pose_stream(db_session, set_ids["blob"], 10, 20, [JointType.ELBOW])
+
+    assert blob.joints == rows.joints == (JointType.ELBOW,)
+    assert (
+        blob.frame_numbers.tolist()
+        == rows.frame_numbers.tolist()
+        == list(range(10, 20))
+    )
+    np.testing.assert_allclose(blob.timestamps, rows.timestamps, rtol=1e-6)
+    np.testing.assert_allclose(blob.positions, rows.positions, rtol=1e-6)
+    assert np.isnan(blob.positions[:, :, 2]).all()
+
+
+def curl_stream(n_reps=5):
+    """A synthetic curl as one upload, with the joints analyze needs."""
+    timestamps, shoulder, elbow, wrist = curl_arm(n_reps=n_reps)
+    return {
+        "timestamps": timestamps.tolist(),
+        "joints": {
+            name: {
+                "x": joint[:, 0].tolist(),
+                "y": joint[:, 1].tolist(),
+                "confidence": joint[:, 3].tolist(),
+            }
+            for name, joint in (
+                ("shoulder", shoulder),
+                ("elbow", elbow),
+                ("wrist", wrist),
+            )
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_analyze_exercise_set_fills_metrics(client, auth_headers):
+    exercise_set_id = await create_exercise_set(client, auth_headers)
+    await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        params={"storage": "blob"},
+        json=curl_stream(),
+        headers=auth_headers,
+    )
+
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/analyze", headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["avg_rep_speed"] == pytest.approx(2.0, abs=0.1)
+    assert body["avg_angle_range"] == pytest.approx(120.0, abs=6.0)
+    assert body["form_quality_score"] > 0.8
+    assert body["reps_completed"] == 10  # client-reported value is left alone
+
+
+@pytest.mark.asyncio
+async def test_analyze_updates_progress_and_personal_best(client, auth_headers):
+    session = await client.post("/workouts/sessions", json={}, headers=auth_headers)
+    exercise = {
+        "exercise_type": "bicep_curl",
+        "arm_used": "left",
+        "reps_completed": 10,
+        "set_number": 1,
+    }
+    set_ids = []
+    for score in (0.2, 0.4):
+        response = await client.post(
+            f"/workouts/sessions/{session.json()['id']}/exercises",
+            json={**exercise, "form_quality_score": score},
+            headers=auth_headers,
+        )
+        set_ids.append(response.json()["id"])
+    await client.post(
+        f"/workouts/exercises/{set_ids[0]}/pose",
+        json=curl_stream(),
+        headers=auth_headers,
+    )
+
+    response = await client.post(
+        f"/workouts/exercises/{set_ids[0]}/analyze", headers=auth_headers
+    )
+
+    score = response.json()["form_quality_score"]
+    assert score > 0.8
+    (progress,) = (await client.get("/workouts/progress", headers=auth_headers)).json()
+    assert progress["avg_form_score"] == pytest.approx((score + 0.4) / 2)
+    (best,) = (
+        await client.get("/workouts/personal-bests", headers=auth_headers)
+    ).json()
+    assert best["best_form_score"] == pytest.approx(score)
@@ -0,0 +1,228 @@
+# tests/test_pose_stream.py
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.models import PoseFrame
+from app.pose.analytics import RepCounter
+from app.pose.stream import run_pose_stream
+from tests.test_analytics import curl_arm
+
+PASSWORD = "testpassword123"
+
+
+def curl_chunks(fps, frames_per_chunk, n_reps=8):
+    """A synthetic curl, as the messages an on-device client would send."""
+    timestamps, shoulder, elbow, wrist = curl_arm(n_reps=n_reps, fps=fps)
+    for start in range(0, timestamps.shape[0], frames_per_chunk):
+        window = slice(start, start + frames_per_chunk)
+        yield {
+            "timestamps": timestamps[window].tolist(),
+            "joints": {
+                name: {
+                    "x": joint[window, 0].tolist(),
+                    "y": joint[window, 1].tolist(),
+                    "confidence": joint[window, 3].tolist(),
+                }
+                for name, joint in (
+                    ("shoulder", shoulder),
+                    ("elbow", elbow),
+                    ("wrist", wrist),
+                )
+            },
+        }
+
+
+def login(client):
+    email = f"testuser_{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/auth/register", json={"email": email, "password": PASSWORD})
+    response = client.post(
+        "/auth/token", data={"username": email, "password": PASSWORD}
+    )
+    return response.json()["access_token"]
+
+
+def create_exercise_set(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    session = client.post("/workouts/sessions", json={}, headers=headers)
+    exercise = client.post(
+        f"/workouts/sessions/{session.json()['id']}/exercises",
+        json={
+            "exercise_type": "bicep_curl",
+            "arm_used": "left",
+            "reps_completed": 8,
+            "set_number": 1,
+        },
+        headers=headers,
+    )
+    return exercise.json()["id"]
+
+
+@pytest.mark.parametrize("fps,frames_per_chunk", [(30, 1), (60, 2)])
+def test_rep_counter_matches_batch_detection(fps, frames_per_chunk):
+    timestamps, shoulder, elbow, wrist = curl_arm(fps=fps, noise=2.0)
+    counter = RepCounter()
+    counts = [
+        counter.update(
+            timestamps[i : i + frames_per_chunk],
+            shoulder[i : i + frames_per_chunk],
+            elbow[i : i + frames_per_chunk],
+            wrist[i : i + frames_per_chunk],
+        )
+        for i in range(0, timestamps.shape[0], frames_per_chunk)
+    ]
+
+    assert counts[-1] == 8
+    assert (np.diff(counts) >= 0).all()
+
+
+@pytest.mark.parametrize("fps,frames_per_chunk", [(30, 1), (60, 2)])
+def test_stream_pose(sync_client, db_session, fps, frames_per_chunk):
+    token = login(sync_client)
+    exercise_set_id = create_exercise_set(sync_client, token)
+    chunks = list(curl_chunks(fps, frames_per_chunk))
+
+    with sync_client.websocket_connect(
+        f"/workouts/exercises/{exercise_set_id}/stream?token={token}"
+    ) as websocket:
+        for chunk in chunks:
+            websocket.send_json(chunk)
+        websocket.send_json({"end": True})
+        messages = []
+        while not messages or messages[-1]["type"] != "done":
+            messages.append(websocket.receive_json())
+
+    n_frames = 8 * 2 * fps
+    reps = [message["reps"] for message in messages if message["type"] == "reps"]
+    assert reps == list(range(1, 9))
+    assert messages[-1] == {
+        "type": "done",
+        "frames_received": n_frames,
+        "frames_stored": n_frames,
+        "reps": 8,
+    }
+    frame_numbers = [
+        number
+        for (number,) in db_session.query(PoseFrame.frame_number)
+        .filter(PoseFrame.exercise_set_id == exercise_set_id)
+        .order_by(PoseFrame.frame_number)
+    ]
+    assert frame_numbers == list(range(n_frames))
+
+
+def test_stream_pose_rejects_bad_chunks(sync_client):
+    token = login(sync_client)
+    exercise_set_id = create_exercise_set(sync_client, token)
+    first, second, *_ = curl_chunks(30, 10)
+
+    with sync_client.websocket_connect(
+        f"/workouts/exercises/{exercise_set_id}/stream",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as websocket:
+        websocket.send_json(first)
+        websocket.send_json(first)  # replays timestamps already sent
+        error = websocket.receive_json()
+        websocket.send_json(second)
+        websocket.send_json({"end": True})
+        done = websocket.receive_json()
+
+    assert error == {
+        "type": "error",
+        "detail": "timestamps must increase across chunks",
+    }
+    assert done["frames_stored"] == 20
+
+
+def test_stream_pose_closes_on_binary_frames(sync_client, db_session):
+    token = login(sync_client)
+    exercise_set_id = create_exercise_set(sync_client, token)
+    first, *_ = curl_chunks(30, 10)
+
+    with sync_client.websocket_connect(
+        f"/workouts/exercises/{exercise_set_id}/stream",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as websocket:
+        websocket.send_json(first)
+        websocket.send_bytes(b"\x00\x01")
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            websocket.receive_json()
+
+    assert excinfo.value.code == 1003
+    assert (
+        db_session.query(PoseFrame)
+        .filter(PoseFrame.exercise_set_id == exercise_set_id)
+        .count()
+        == 10
+    )
+
+
+def test_stream_pose_requires_owner(sync_client):
+    exercise_set_id = create_exercise_set(sync_client, login(sync_client))
+    other_token = login(sync_client)
+
+    for query in ("", "?token=invalid", f"?token={other_token}"):
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            with sync_client.websocket_connect(
+                f"/workouts/exercises/{exercise_set_id}/stream{query}"
+            ):
+                pass
+        assert excinfo.value.code == 1008
+
+
+class FakeWebSocket:
+    def __init__(self, messages, delay=0.0):
+        self.messages = list(messages)
+        self.delay = delay
+        self.received = 0
+        self.sent = []
+
+    async def receive_json(self):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        return self.messages.pop(0)
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_run_pose_stream_applies_backpressure():
+    chunks = list(curl_chunks(30, 10))
+    websocket = FakeWebSocket(chunks + [{"end": True}])
+    lag = []
+
+    async def slow_store(packed):
+        # Chunks read but not yet stored
+        lag.append(websocket.received - len(lag))
+        await asyncio.sleep(0.005)
+        return packed.n_frames
+
+    result = await run_pose_stream(
+        websocket, slow_store, batch_frames=10, batch_seconds=60, max_pending_batches=1
+    )
+
+    assert result["frames_stored"] == 480
+    # One batch being written, one queued and one waiting to be queued
+    assert max(lag) <= 3
+
+
+@pytest.mark.asyncio
+async def test_run_pose_stream_flushes_on_time():
+    websocket = FakeWebSocket(list(curl_chunks(30, 5))[:4] + [{"end": True}], 0.02)
+    batches = []
+
+    async def store(packed):
+        batches.append(packed.n_frames)
+        return packed.n_frames
+
+    await run_pose_stream(
+        websocket, store, batch_frames=1000, batch_seconds=0.01, max_pending_batches=4
+    )
+
+    assert batches == [5, 5, 5, 5]
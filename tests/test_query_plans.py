@@ -0,0 +1,117 @@
+# tests/test_query_plans.py
+import re
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, event
+
+from app.create_tables import create_tables
+from app.models import Base
+from tests.test_derived import add_set, new_session
+from tests.test_pose import make_pose_stream
+
+# A full table scan in SQLite's EXPLAIN QUERY PLAN output; index scans read
+# "SCAN <table> USING [COVERING] INDEX ..." and lookups "SEARCH <table> ..."
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """The test database, built by the migrations rather than create_all."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    with engine.connect() as connection:
+        create_tables(connection=connection)
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_match_models(db_engine):
+    with db_engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+    assert diff == []
+
+
+async def exercise_routes(client, headers):
+    """Call every route that reads or writes the database at least once."""
+    sessions = [await new_session(client, headers) for _ in range(3)]
+    exercise_set = await add_set(client, headers, sessions[0], form_quality_score=0.8)
+    await client.post(
+        f"/workouts/sessions/{sessions[1]}/exercises/batch",
+        json=[
+            {
+                "exercise_type": "bicep_curl",
+                "arm_used": "right",
+                "reps_completed": 8,
+                "set_number": n,
+                "duration": 30.0,
+            }
+            for n in (1, 2)
+        ],
+        headers=headers,
+    )
+    blob_set = await add_set(client, headers, sessions[2])
+    for set_id, storage in ((exercise_set["id"], "rows"), (blob_set["id"], "blob")):
+        await client.post(
+            f"/workouts/exercises/{set_id}/pose",
+            params={"storage": storage},
+            json=make_pose_stream(n_frames=60),
+            headers=headers,
+        )
+        for params in ({"start_frame": 10, "end_frame": 40}, {"max_frames": 20}):
+            await client.get(
+                f"/workouts/exercises/{set_id}/replay", params=params, headers=headers
+            )
+        await client.post(f"/workouts/exercises/{set_id}/analyze", headers=headers)
+
+    first_page = await client.get(
+        "/workouts/sessions/page", params={"limit": 2}, headers=headers
+    )
+    for path, params in (
+        ("/auth/me", {}),
+        ("/workouts/sessions", {"from": "2000-01-01T00:00:00"}),
+        ("/workouts/sessions/page", {"cursor": first_page.json()["next_cursor"]}),
+        ("/workouts/history", {"limit": 2}),
+        ("/workouts/export", {}),
+        ("/workouts/export", {"format": "csv", "pose": True}),
+        (f"/workouts/sessions/{sessions[1]}/exercises", {}),
+        ("/workouts/personal-bests", {}),
+        ("/workouts/streak", {}),
+        ("/workouts/progress", {"arm_used": "left"}),
+    ):
+        response = await client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, path
+
+
+@pytest.mark.asyncio
+async def test_route_queries_use_indexes(client, auth_headers, db_engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        await exercise_routes(client, auth_headers)
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+
+    tables = set(Base.metadata.tables)
+    full_scans = []
+    with db_engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            for *_, step in plan:
+                match = FULL_SCAN.match(step)
+                if match and match.group(1) in tables:
+                    full_scans.append(f"{step}: {statement}")
+
+    assert len(statements) > 50
+    assert full_scans == []
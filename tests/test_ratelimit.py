@@ -0,0 +1,133 @@
+# tests/test_ratelimit.py
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from config import Settings
+from app.database import Database
+from app.kvstore import LocalRedis, RedisStore
+from app.main import create_app
+from app.ratelimit import (
+    Rate,
+    SlidingWindowLimiter,
+    TokenBucketLimiter,
+    parse_rate,
+)
+
+
+def limited_app(db_engine, **rate_limits):
+    config = Settings(database_url=str(db_engine.url), rate_limits=rate_limits)
+    return create_app(config, database=Database(config, engine=db_engine))
+
+
+def client_for(app, ip="10.0.0.1"):
+    return AsyncClient(
+        transport=ASGITransport(app=app, client=(ip, 50000)), base_url="http://test"
+    )
+
+
+@pytest.mark.asyncio
+async def test_login_is_limited_per_client_ip(db_engine):
+    app = limited_app(db_engine, **{"POST /auth/token": "3/minute"})
+    attempt = {"username": "nobody@example.com", "password": "wrong"}
+
+    async with client_for(app) as client:
+        for _ in range(3):
+            response = await client.post("/auth/token", data=attempt)
+            assert response.status_code == 401
+        response = await client.post("/auth/token", data=attempt)
+        assert response.status_code == 429
+        assert 1 <= int(response.headers["Retry-After"]) <= 20
+        # Routes without a budget are not limited
+        assert (await client.get("/health")).status_code == 200
+    async with client_for(app, ip="10.0.0.2") as client:
+        response = await client.post("/auth/token", data=attempt)
+        assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_are_limited_per_user(db_engine):
+    app = limited_app(db_engine, **{"POST /workouts/sessions": "2/hour"})
+
+    async with client_for(app) as client:
+        tokens = []
+        for email in ("a@example.com", "b@example.com"):
+            credentials = {"email": email, "password": "secret123"}
+            await client.post("/auth/register", json=credentials)
+            response = await client.post(
+                "/auth/token", data={"username": email, "password": "secret123"}
+            )
+            tokens.append(
+                {"Authorization": f"Bearer {response.json()['access_token']}"}
+            )
+
+        for _ in range(2):
+            response = await client.post(
+                "/workouts/sessions", json={}, headers=tokens[0]
+            )
+            assert response.status_code == 200
+        response = await client.post("/workouts/sessions", json={}, headers=tokens[0])
+        assert response.status_code == 429
+        # Same IP, another user
+        response = await client.post("/workouts/sessions", json={}, headers=tokens[1])
+        assert response.status_code == 200
+        metrics = (await client.get("/metrics")).text
+        assert 'route="/workouts/sessions",status="429"} 1' in metrics
+
+
+def test_unknown_routes_are_rejected(db_engine):
+    app = limited_app(db_engine, **{"POST /auth/nope": "1/second"})
+
+    with pytest.raises(ValueError, match="unknown route"):
+        app.build_middleware_stack()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills_at_the_budget_rate():
+    limiter = TokenBucketLimiter()
+    rate = Rate(2, 60.0)
+
+    assert await limiter.acquire("k", rate) == 0.0
+    assert await limiter.acquire("k", rate) == 0.0
+    # One token refills in 60 / 2 seconds
+    assert 29.0 < await limiter.acquire("k", rate) <= 30.0
+    assert await limiter.acquire("other", rate) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_eviction_keeps_partly_used_buckets():
+    limiter = TokenBucketLimiter(max_keys=2)
+    refilled, slow = Rate(2, 0.01), Rate(2, 60.0)
+
+    assert await limiter.acquire("refilled", refilled) == 0.0
+    assert await limiter.acquire("slow", slow) == 0.0
+    time.sleep(0.02)
+    # Full again, so it is the one dropped
+    assert await limiter.acquire("new", slow) == 0.0
+    assert list(limiter._buckets) == ["slow", "new"]
+
+    # With none full, the oldest goes; "new" keeps its one token left
+    assert await limiter.acquire("newer", slow) == 0.0
+    assert await limiter.acquire("new", slow) == 0.0
+    assert await limiter.acquire("new", slow) > 0.0
+
+
+@pytest.mark.asyncio
+async def test_shared_sliding_window_holds_across_workers():
+    store = RedisStore(LocalRedis())
+    workers = [SlidingWindowLimiter(store), SlidingWindowLimiter(store)]
+    rate = Rate(3, 3600.0)
+
+    assert [await workers[i % 2].acquire("k", rate) for i in range(3)] == [0.0] * 3
+    assert 0.0 < await workers[1].acquire("k", rate) <= 3600.0
+    # Rejected requests are not counted
+    assert await store.get(f"rl:k:{int(time.time() // 3600)}") == b"3"
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == Rate(10, 60.0)
+    assert parse_rate("5/0.5") == Rate(5, 0.5)
+    for spec in ("ten/minute", "10/fortnight", "0/second"):
+        with pytest.raises(ValueError):
+            parse_rate(spec)
@@ -0,0 +1,163 @@
+# tests/test_replay.py
+import numpy as np
+import pytest
+from sqlalchemy import event
+
+from app.pose.blob import decode_pose_blob
+from app.pose.replay import lttb_indices
+from tests.test_pose import create_exercise_set
+from tests.test_pose_stream import curl_chunks
+
+N_FRAMES = 480  # 8 reps of 2 s at 30 fps
+
+
+async def stored_curl(client, headers, storage):
+    exercise_set_id = await create_exercise_set(client, headers)
+    (stream,) = curl_chunks(30, N_FRAMES)
+    response = await client.post(
+        f"/workouts/exercises/{exercise_set_id}/pose",
+        params={"storage": storage},
+        json=stream,
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return exercise_set_id, stream
+
+
+def test_lttb_keeps_turning_points():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(2 * np.pi * x / 250)
+
+    index = lttb_indices(x, y, 40)
+
+    assert index.shape == (40,)
+    assert index[0] == 0 and index[-1] == 999
+    assert (np.diff(index) > 0).all()
+    assert y[index].max() > 0.99 and y[index].min() < -0.99
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("storage", ["rows", "blob"])
+async def test_replay_ranges(client, auth_headers, storage):
+    exercise_set_id, stream = await stored_curl(client, auth_headers, storage)
+    url = f"/workouts/exercises/{exercise_set_id}/replay"
+
+    full = (await client.get(url, headers=auth_headers)).json()
+    frames = (
+        await client.get(
+            url, params={"start_frame": 30, "end_frame": 60}, headers=auth_headers
+        )
+    ).json()
+    seconds = (
+        await client.get(
+            url,
+            params={"start_time": 1.0, "end_time": 2.0, "start_frame": 40},
+            headers=auth_headers,
+        )
+    ).json()
+
+    assert full["frames_in_range"] == N_FRAMES
+    assert full["frame_numbers"] == list(range(N_FRAMES))
+    np.testing.assert_allclose(
+        full["joints"]["wrist"]["x"], stream["joints"]["wrist"]["x"], atol=1e-6
+    )
+    assert full["joints"]["wrist"]["z"] == [None] * N_FRAMES
+    assert frames["frame_numbers"] == list(range(30, 60))
+    assert seconds["frame_numbers"] == list(range(40, 60))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("storage", ["rows", "blob"])
+async def test_replay_of_nothing_is_not_found(client, auth_headers, storage):
+    exercise_set_id, _ = await stored_curl(client, auth_headers, storage)
+    url = f"/workouts/exercises/{exercise_set_id}/replay"
+
+    for params in (
+        {"start_frame": N_FRAMES},
+        {"start_frame": 20, "end_frame": 10},
+        {"start_time": 100.0},
+        {"joints": "hip"},
+    ):
+        response = await client.get(url, params=params, headers=auth_headers)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "No pose data for exercise set"
+
+
+@pytest.mark.asyncio
+async def test_replay_downsampling(client, auth_headers):
+    exercise_set_id, _ = await stored_curl(client, auth_headers, "rows")
+    url = f"/workouts/exercises/{exercise_set_id}/replay"
+
+    nth = (await client.get(url, params={"every": 4}, headers=auth_headers)).json()
+    lttb = (
+        await client.get(
+            url, params={"max_frames": 50, "joints": "wrist"}, headers=auth_headers
+        )
+    ).json()
+    both = await client.get(
+        url, params={"every": 4, "max_frames": 50}, headers=auth_headers
+    )
+
+    assert nth["frame_numbers"] == list(range(0, N_FRAMES, 4))
+    assert lttb["frames_in_range"] == N_FRAMES
+    assert len(lttb["frame_numbers"]) == 50
+    assert lttb["frame_numbers"][0] == 0 and lttb["frame_numbers"][-1] == N_FRAMES - 1
+    assert list(lttb["joints"]) == ["wrist"]
+    # The elbow swings between 40 and 160 degrees; LTTB keeps frames near
+    # both ends. With the shoulder straight above the elbow at the origin,
+    # the angle is arccos of the wrist's y.
+    angles = np.degrees(np.arccos(lttb["joints"]["wrist"]["y"]))
+    assert angles.min() < 45 and angles.max() > 155
+    assert both.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_replay_binary(client, auth_headers):
+    exercise_set_id, stream = await stored_curl(client, auth_headers, "rows")
+
+    response = await client.get(
+        f"/workouts/exercises/{exercise_set_id}/replay",
+        params={"format": "binary", "every": 2},
+        headers=auth_headers,
+    )
+
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["x-frames-in-range"] == str(N_FRAMES)
+    packed = decode_pose_blob(response.content)
+    assert packed.n_frames == N_FRAMES // 2
+    np.testing.assert_allclose(
+        packed.timestamps, stream["timestamps"][::2], rtol=1e-6, atol=1e-6
+    )
+
+
+@pytest.mark.asyncio
+async def test_replay_reads_frames_with_index_scans(client, auth_headers, db_engine):
+    exercise_set_id, _ = await stored_curl(client, auth_headers, "rows")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        if "FROM pose_frames JOIN joint_positions" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        response = await client.get(
+            f"/workouts/exercises/{exercise_set_id}/replay",
+            params={"start_frame": 100, "end_frame": 200},
+            headers=auth_headers,
+        )
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    ((statement, parameters),) = statements
+    with db_engine.connect() as conn:
+        plan = [
+            row[-1]
+            for row in conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+    assert any("USING INDEX ix_pose_frames_set_frame" in step for step in plan)
+    assert any("USING INDEX ix_joint_positions_frame" in step for step in plan)
+    assert not any(step.startswith("SCAN") for step in plan)
@@ -0,0 +1,98 @@
+# tests/test_replicas.py
+import asyncio
+import sqlite3
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from config import Settings
+from app.database import Database
+from app.main import create_app
+
+
+def replicate(primary_engine, replica_path):
+    """Copy the primary SQLite database over the replica, like replication
+    catching up."""
+    source = sqlite3.connect(primary_engine.url.database)
+    target = sqlite3.connect(replica_path)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+
+@pytest.fixture
+def replica_path(tmp_path):
+    return str(tmp_path / "replica.db")
+
+
+@pytest.fixture
+def replica_app(db_engine, replica_path):
+    config = Settings(
+        database_url=str(db_engine.url),
+        db_replica_urls=[f"sqlite:///{replica_path}"],
+        db_replica_sticky_seconds=0.2,
+    )
+    return create_app(config, database=Database(config, engine=db_engine))
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_the_replica_after_the_sticky_window(
+    replica_app, db_engine, replica_path
+):
+    async with AsyncClient(
+        transport=ASGITransport(app=replica_app), base_url="http://test"
+    ) as client:
+        credentials = {"email": "reader@example.com", "password": "secret123"}
+        await client.post("/auth/register", json=credentials)
+        response = await client.post(
+            "/auth/token",
+            data={"username": credentials["email"], "password": "secret123"},
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        first = await client.post("/workouts/sessions", json={}, headers=headers)
+        replicate(db_engine, replica_path)
+        second = await client.post("/workouts/sessions", json={}, headers=headers)
+        second_exercises = f"/workouts/sessions/{second.json()['id']}/exercises"
+
+        # Just wrote, so reads see the primary
+        response = await client.get(second_exercises, headers=headers)
+        assert response.status_code == 200
+
+        await asyncio.sleep(0.3)
+        # The replica has not caught up with the second session
+        response = await client.get(second_exercises, headers=headers)
+        assert response.status_code == 404
+        response = await client.get(
+            f"/workouts/sessions/{first.json()['id']}/exercises", headers=headers
+        )
+        assert response.status_code == 200
+        response = await client.get("/health/pool")
+        assert response.json()["replica0"]["checked_in"] == 1
+
+    await replica_app.state.database.dispose()
+
+
+def test_replica_selection(tmp_path):
+    urls = [f"sqlite:///{tmp_path / f'replica{i}.db'}" for i in range(2)]
+    database = Database(Settings(database_url="sqlite://", db_replica_urls=urls))
+    first, second = database.replicas
+
+    assert [database.replica() for _ in range(3)] == [first, second, first]
+    assert first.config.database_url == urls[0] and first.replicas == []
+
+    database = Database(
+        Settings(
+            database_url="sqlite://",
+            db_replica_urls=urls,
+            db_replica_selection="least_connections",
+        )
+    )
+    first, second = database.replicas
+    first.in_use = 1
+    assert {database.replica() for _ in range(3)} == {second}
+    second.in_use = 1
+    assert {database.replica() for _ in range(2)} == {first, second}
+
+    database = Database(Settings(database_url="sqlite://"))
+    assert database.replica() is database
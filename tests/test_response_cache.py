@@ -0,0 +1,136 @@
+# tests/test_response_cache.py
+import time
+
+import pytest
+from sqlalchemy import event
+
+from httpx import ASGITransport, AsyncClient
+
+from app.kvstore import RedisStore
+from tests.conftest import make_app
+from tests.test_derived import add_set, new_session
+
+
+def count_statements(db_engine):
+    statements = []
+    event.listen(
+        db_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_repeat_reads_are_served_from_cache(
+    client, auth_headers, db_engine, test_app
+):
+    await new_session(client, auth_headers)
+    first = await client.get("/workouts/sessions", headers=auth_headers)
+    statements = count_statements(db_engine)
+
+    second = await client.get("/workouts/sessions", headers=auth_headers)
+
+    assert statements == []
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert "last-modified" in second.headers
+    assert test_app.state.response_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_304(client, auth_headers, test_app):
+    for path in ("/workouts/sessions", "/workouts/personal-bests", "/auth/me"):
+        response = await client.get(path, headers=auth_headers)
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            path, headers={**auth_headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get(
+            path,
+            headers={
+                **auth_headers,
+                "If-Modified-Since": response.headers["last-modified"],
+            },
+        )
+        assert response.status_code == 304
+    assert test_app.state.response_cache.stats()["not_modified"] == 6
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_the_users_entries(client, auth_headers):
+    session_id = await new_session(client, auth_headers)
+    before = await client.get("/workouts/personal-bests", headers=auth_headers)
+    assert before.json() == []
+
+    await add_set(client, auth_headers, session_id)
+    after = await client.get(
+        "/workouts/personal-bests",
+        headers={**auth_headers, "If-None-Match": before.headers["etag"]},
+    )
+
+    assert after.status_code == 200
+    assert len(after.json()) == 1
+    assert after.headers["etag"] != before.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_a_write_within_the_same_second_is_not_modified_since(
+    client, auth_headers, monkeypatch
+):
+    # Freeze the clock mid-second, after the versions already set: the
+    # reads and writes below all share that second
+    now = (time.time_ns() // 10**9 + 1) * 10**9 + 400_000_000
+    monkeypatch.setattr(time, "time_ns", lambda: now)
+    session_id = await new_session(client, auth_headers)
+    before = await client.get("/workouts/personal-bests", headers=auth_headers)
+
+    await add_set(client, auth_headers, session_id)
+    after = await client.get(
+        "/workouts/personal-bests",
+        headers={**auth_headers, "If-Modified-Since": before.headers["last-modified"]},
+    )
+
+    assert after.status_code == 200
+    assert len(after.json()) == 1
+    # The ETag still tells the versions apart
+    response = await client.get(
+        "/workouts/personal-bests",
+        headers={**auth_headers, "If-None-Match": after.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_redis_backend(db_engine, local_redis):
+    app = make_app(
+        db_engine, response_cache_backend="redis", redis_url="redis://localhost"
+    )
+    assert isinstance(app.state.response_cache.store, RedisStore)
+    credentials = {"email": "redis@example.com", "password": "secret123"}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.post("/auth/register", json=credentials)
+        response = await client.post(
+            "/auth/token",
+            data={"username": credentials["email"], "password": "secret123"},
+        )
+        auth_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await new_session(client, auth_headers)
+
+        first = await client.get("/workouts/sessions", headers=auth_headers)
+        second = await client.get(
+            "/workouts/sessions",
+            headers={**auth_headers, "If-None-Match": first.headers["etag"]},
+        )
+        await new_session(client, auth_headers)
+        third = await client.get("/workouts/sessions", headers=auth_headers)
+
+    assert second.status_code == 304
+    assert len(third.json()) == 2
@@ -0,0 +1,87 @@
+# tests/test_sessions.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import WorkoutSession
+
+
+async def seed_sessions(client, headers, db_session, count=7):
+    """Sessions on consecutive days, with a tie on the third day."""
+    user_id = (await client.get("/auth/me", headers=headers)).json()["id"]
+    start = datetime(2024, 3, 1, 9, 0)
+    dates = [start + timedelta(days=i) for i in range(count - 1)]
+    dates.insert(3, dates[2])
+    db_session.add_all(
+        WorkoutSession(user_id=user_id, session_date=d, notes=str(i))
+        for i, d in enumerate(dates)
+    )
+    db_session.commit()
+    return (
+        db_session.query(WorkoutSession)
+        .filter(WorkoutSession.user_id == user_id)
+        .order_by(WorkoutSession.session_date, WorkoutSession.id)
+        .all()
+    )
+
+
+async def all_pages(client, headers, **params):
+    ids, cursor = [], None
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(
+            "/workouts/sessions/page", params=params, headers=headers
+        )
+        assert response.status_code == 200
+        page = response.json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_session_once(client, auth_headers, db_session):
+    sessions = await seed_sessions(client, auth_headers, db_session)
+    expected = [s.id for s in sessions]
+
+    assert await all_pages(client, auth_headers, limit=2) == expected
+    assert await all_pages(client, auth_headers, limit=3, order="desc") == (
+        expected[::-1]
+    )
+
+
+@pytest.mark.asyncio
+async def test_session_listings_filter_by_date(client, auth_headers, db_session):
+    sessions = await seed_sessions(client, auth_headers, db_session)
+    window = {"from": "2024-03-03T00:00:00", "to": "2024-03-04T23:59:59"}
+    expected = [s.id for s in sessions[2:5]]
+
+    assert await all_pages(client, auth_headers, limit=2, **window) == expected
+    response = await client.get(
+        "/workouts/sessions", params=window, headers=auth_headers
+    )
+    assert [s["id"] for s in response.json()] == expected
+
+
+@pytest.mark.asyncio
+async def test_offset_listing_is_ordered(client, auth_headers, db_session):
+    sessions = await seed_sessions(client, auth_headers, db_session)
+
+    response = await client.get(
+        "/workouts/sessions", params={"skip": 2, "limit": 3}, headers=auth_headers
+    )
+
+    assert [s["id"] for s in response.json()] == [s.id for s in sessions[2:5]]
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(client, auth_headers):
+    response = await client.get(
+        "/workouts/sessions/page",
+        params={"cursor": "not-a-cursor"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+# tests/test_startup.py
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Generous, so a slow CI machine does not fail them; they catch an eager
+# import of the whole app creeping back in, not small regressions
+IMPORT_BUDGET_SECONDS = 3.0
+BUILD_BUDGET_SECONDS = 5.0
+
+
+def import_profile(statement):
+    """(total import seconds, imported module names) for ``statement`` run in
+    a new interpreter, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us, modules = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        # Top-level imports (no indent) include everything under them
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1e6, modules
+
+
+def test_importing_the_app_module_imports_no_dependencies():
+    elapsed, modules = import_profile("import app.main")
+
+    for module in ("sqlalchemy", "passlib", "jose", "numpy", "app.models"):
+        assert module not in modules
+    assert elapsed < IMPORT_BUDGET_SECONDS
+
+
+def test_building_the_app_defers_engines_and_hashing():
+    elapsed, modules = import_profile("from app.main import app")
+
+    assert "app.routers.workouts" in modules
+    # No engine or password hash context until the first request needs one
+    assert "passlib" not in modules
+    assert "psycopg2" not in modules
+    assert "sqlalchemy.ext.asyncio" not in modules
+    assert elapsed < BUILD_BUDGET_SECONDS